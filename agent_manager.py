@@ -2,95 +2,161 @@
 
 import asyncio
 import logging
+import time
 from dotenv import load_dotenv
+from alert_audio import AlertAudioCache, default_tts
+from connectivity_manager import ConnectivityManager
 from drowsiness_monitor import DrowsinessModel
-from hadi_agent import HadiAgent, entrypoint as hadi_entrypoint
-from huda_agent import HudaAgent, entrypoint as huda_entrypoint
+from hadi_agent import HadiAgent
+from http_client import http
+from huda_agent import HudaAgent
+from huda_prompt import SESSION_INSTRUCTION_HUDA
+from intent_router import IntentRouter
+from lazy_plugins import build_realtime_model, load_plugins
+from local_memory import MEMORY_TOP_K, get_memory_client
+from log_setup import setup_logging
+from mail_queue import shutdown_mail_queue
+from memory_context import build_memory_context
+from memory_writer import MemoryWriter
+from metrics import counter
+from startup_timing import StartupTimer
+from worker import prewarmed, session_started, worker_options
 
 # Optional LiveKit setup (fallback-safe)
 HAS_LIVEKIT = False
 AgentSession = None
 try:
     from livekit import agents  # type: ignore
-    from livekit.agents import AgentSession, RoomInputOptions  # type: ignore
-    from livekit.plugins import noise_cancellation  # type: ignore
+    from livekit.agents import AgentSession, ChatContext, RoomInputOptions  # type: ignore
     HAS_LIVEKIT = True
 except ImportError:
     print("LiveKit not installed - install with: pip install livekit-agents")
     agents = None
     AgentSession = None
 
-from typing import Any, Optional
+from typing import Any, Dict, Optional
 
 # Setup logging
 load_dotenv()
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+setup_logging()
+
+ROUTING_DECISIONS = counter("agent_routing_total", "Utterances routed, by the router's pick (none = kept current agent)", ["agent"])
+PERSONA_SWITCHES = counter("agent_switches_total", "Persona switches in the shared session", ["to", "mode"])
 
 
 # -------------------------------------------------------------------
 # AGENT ROUTER LOGIC
 # -------------------------------------------------------------------
 class AgentManager:
-    """Routes between Hadi (technical) and Huda (emotional) and handles events like drowsiness."""
+    """Routes between Hadi (technical) and Huda (emotional) and handles events like drowsiness.
+
+    Both personas share one AgentSession and one realtime model per room.
+    Agents are built on first use and cached; switching persona updates the
+    live agent's instructions and tools so the realtime connection stays up,
+    and only falls back to a session handoff if the model cannot do that.
+    """
 
-    def __init__(self):
+    def __init__(
+        self,
+        connectivity: Optional[ConnectivityManager] = None,
+        realtime_model: Optional[Any] = None,
+        router: Optional[IntentRouter] = None,
+    ):
         self.last_active_agent = "HUDA"
         self.user_name = "Ayan"
-        self.hadi = HadiAgent()
-        self.huda = HudaAgent()
+        self.connectivity = connectivity or ConnectivityManager()
         self.session: Optional[Any] = None
+        self.router = router or IntentRouter()
+        self.active_persona: Optional[str] = None
+        self.live_agent: Optional[Any] = None  # LiveKit Agent currently running in the session
+        self._realtime_model = realtime_model
+        self.alert_audio: Optional[AlertAudioCache] = None
+        self._agents: Dict[str, Any] = {}
+
+    @property
+    def realtime_model(self) -> Any:
+        if self._realtime_model is None:
+            self._realtime_model = build_realtime_model(voice="Aoede")
+        return self._realtime_model
+
+    def get_agent(self, name: str, chat_ctx: Optional[Any] = None) -> Any:
+        """Cached HadiAgent / HudaAgent; `chat_ctx` only applies on first construction."""
+        agent = self._agents.get(name)
+        if agent is None:
+            if name == "HADI":
+                agent = HadiAgent(chat_ctx=chat_ctx, llm=self.realtime_model)
+            else:
+                agent = HudaAgent(chat_ctx=chat_ctx, connectivity=self.connectivity, llm=self.realtime_model)
+            agent.session = self.session
+            agent.alert_audio = self.alert_audio
+            self._agents[name] = agent
+        return agent
+
+    @property
+    def hadi(self) -> HadiAgent:
+        return self.get_agent("HADI")
+
+    @property
+    def huda(self) -> HudaAgent:
+        return self.get_agent("HUDA")
+
+    def attach_session(self, session: Any, live_agent: Any, persona: str) -> None:
+        self.session = session
+        self.live_agent = live_agent
+        self.active_persona = persona
+        for agent in self._agents.values():
+            agent.session = session
+
+    def use_alert_audio(self, alert_audio: AlertAudioCache) -> None:
+        self.alert_audio = alert_audio
+        for agent in self._agents.values():
+            agent.alert_audio = alert_audio
 
     def detect_agent(self, text: str) -> str:
         """Decide which agent should handle this query."""
-        text_lower = text.lower()
-
-        hadi_keywords = [
-            "engine", "fuel", "temperature", "route", "map", "location",
-            "battery", "speed", "system", "diagnostic", "pressure",
-            "check", "sensor", "status", "data", "report", "navigation",
-            "drive", "tire", "oil", "brake"
-        ]
-
-        huda_keywords = [
-            "hi", "hello", "hey", "how are you", "tired", "music", "song",
-            "mood", "talk", "relax", "funny", "joke", "story", "who are you",
-            "who is hadi", "friend", "laugh", "good morning", "good night"
-        ]
-
-        if any(k in text_lower for k in hadi_keywords):
-            self.last_active_agent = "HADI"
-        elif any(k in text_lower for k in huda_keywords):
-            self.last_active_agent = "HUDA"
+        # Utterances with no intent signal ("okay", "yes") stay with the current agent
+        selected = self.router.route(text)
+        ROUTING_DECISIONS.labels(selected or "none").inc()
+        if selected is not None:
+            self.last_active_agent = selected
         return self.last_active_agent
 
-    async def dispatch(self, ctx, user_text: str):
-        """Send user message to correct agent."""
+    async def switch_agent(self, name: str) -> None:
+        """Make `name` the active persona of the shared session."""
+        if self.session is None or self.live_agent is None or name == self.active_persona:
+            return
+        persona = self.get_agent(name)
+        try:
+            await self.live_agent.update_instructions(persona.instructions)
+            await self.live_agent.update_tools(list(persona.tools))
+            PERSONA_SWITCHES.labels(name, "update").inc()
+        except Exception as e:
+            logging.info(f"Persona update unavailable ({e}); handing the session to {name}.")
+            self.session.update_agent(persona._agent)
+            self.live_agent = persona._agent
+            PERSONA_SWITCHES.labels(name, "handoff").inc()
+        self.active_persona = name
+
+    async def dispatch(self, user_text: str) -> str:
+        """Switch the shared session to the agent that should handle this message."""
         selected = self.detect_agent(user_text)
-        if selected == "HADI":
-            logging.info("Routing to Hadi for technical response.")
-            await hadi_entrypoint(ctx)
-        else:
-            logging.info("Routing to Huda for emotional response.")
-            await huda_entrypoint(ctx)
+        logging.info(f"Routing to {selected.title()}.")
+        await self.switch_agent(selected)
+        return selected
 
     async def on_hadi_alert(self):
         """Hadi attempts to wake up the driver."""
         logging.warning("🚨 Hadi: Attempting to wake up driver...")
-        
-        # Ensure Hadi has session access
-        if self.session and hasattr(self.hadi, 'session'):
-            self.hadi.session = self.session  # type: ignore
-        
-        await self.hadi.alert_driver()
+        # The cached clip needs neither Hadi's persona nor the model, so it starts
+        # playing now and the persona switch happens while the driver hears it
+        played = bool(self.alert_audio and self.alert_audio.play(self.session, "hadi_wake"))
+        await self.switch_agent("HADI")
+        await self.hadi.alert_driver(clip_played=played)
     
     async def on_huda_conversation(self):
         """Huda starts conversation after driver wakes up."""
         logging.info("💖 Huda: Starting post-drowsiness conversation...")
-        
-        # Ensure Huda has session access
-        if self.session and hasattr(self.huda, 'session'):
-            self.huda.session = self.session  # type: ignore
-        
+        await self.switch_agent("HUDA")
         await self.huda.check_wellbeing()
 
 
@@ -103,22 +169,67 @@ async def entrypoint(ctx):
         print("❌ LiveKit not installed. Run: pip install livekit-agents mem0ai python-dotenv")
         return
 
-    manager = AgentManager()
-    await ctx.connect()
+    manager = AgentManager(
+        realtime_model=prewarmed(ctx, "realtime_model"),
+        router=prewarmed(ctx, "intent_router"),
+    )
+    timer = StartupTimer("CO-PILOT")
+    memory_client = get_memory_client()
+    initial_ctx = ChatContext()
+    skip_ids = []  # the injected memory summary is not itself a memory
+
+    async def build_first_agent() -> HudaAgent:
+        results = await timer.phase("memory", memory_client.search(
+            f"{manager.user_name}'s mood, preferences, car and driving", user_id=manager.user_name, top_k=MEMORY_TOP_K
+        ))
+        memory_str, stats = build_memory_context(results or [], manager.user_name)
+        if memory_str:
+            message = initial_ctx.add_message(role="assistant", content=memory_str)
+            skip_ids.append(getattr(message, "id", None))
+            logging.info(f"🧠 Loaded memory context {stats}.")
+        with timer.measure("agent"):
+            return manager.get_agent("HUDA", chat_ctx=initial_ctx)
 
-    # Shared session for both agents
-    if AgentSession and HAS_LIVEKIT:
-        session = AgentSession()
-        manager.session = session
-        if hasattr(manager.hadi, "session"):
-            manager.hadi.session = session
-        if hasattr(manager.huda, "session"):
-            manager.huda.session = session
+    huda, _ = await asyncio.gather(build_first_agent(), timer.phase("connect", ctx.connect()))
 
+    # One session and one realtime connection for both agents; Huda speaks first
+    session = AgentSession()
+    manager.attach_session(session, huda._agent, "HUDA")
+    _, noise_cancellation = load_plugins()
+    await timer.phase("session", session.start(
+        room=ctx.room,
+        agent=huda._agent,
+        room_input_options=RoomInputOptions(
+            audio_enabled=True,
+            video_enabled=True,
+            noise_cancellation=noise_cancellation.BVC()
+        ),
+    ))
+    session_started(ctx, fallback_start=time.time() - timer.elapsed())
     logging.info("🎧 HADI–HUDA Co-Pilot Voice Agent is active and listening...")
+    # Build Hadi now so a drowsiness alert never pays for agent construction
+    manager.get_agent("HADI")
 
-    # Start Huda’s LiveKit session concurrently with drowsiness detection
-    huda_task = asyncio.create_task(huda_entrypoint(ctx))
+    # Render (or load) the fixed alert lines in the background so a drowsiness alert never waits on the model
+    alert_audio = AlertAudioCache(manager.user_name, voice="Aoede", tts=default_tts("Aoede"))
+    manager.use_alert_audio(alert_audio)
+    alert_audio_task = asyncio.create_task(alert_audio.prepare())
+    try:
+        await timer.phase("greeting", session.generate_reply(instructions=SESSION_INSTRUCTION_HUDA))
+    except Exception as e:
+        logging.error(f"❌ Co-Pilot failed to generate greeting: {e}")
+    timer.log()
+
+    memory_writer = MemoryWriter(
+        memory_client, manager.user_name,
+        get_items=lambda: getattr(manager.live_agent.chat_ctx, "items", []),
+        skip_ids=skip_ids,
+        name="CO-PILOT",
+    )
+    memory_writer.start()
+    ctx.add_shutdown_callback(memory_writer.aclose)
+    ctx.add_shutdown_callback(http.aclose)
+    ctx.add_shutdown_callback(shutdown_mail_queue)
 
     async def run_drowsiness_monitor():
         model = DrowsinessModel(alarm_path="alarm.wav")
@@ -127,14 +238,13 @@ async def entrypoint(ctx):
             huda_callback=manager.on_huda_conversation,
         )
 
-    drowsy_task = asyncio.create_task(run_drowsiness_monitor())
-
-    # Keep both running until one finishes or system stops
+    # Keep the monitor running alongside the session until the job stops
     try:
-        await asyncio.gather(huda_task, drowsy_task)
+        await run_drowsiness_monitor()
     except asyncio.CancelledError:
         logging.info("🛑 Tasks cancelled, shutting down gracefully.")
     finally:
+        alert_audio_task.cancel()
         logging.info("💤 System stopped cleanly.")
 
 # -------------------------------------------------------------------
@@ -143,7 +253,8 @@ async def entrypoint(ctx):
 if __name__ == "__main__":
     if HAS_LIVEKIT and agents and hasattr(agents, "cli"):
         logging.info("🚀 Launching Hadi–Huda Co-Pilot (LiveKit + Drowsiness Integration)")
-        agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
+        load_plugins()  # register plugins in the main process for `download-files`
+        agents.cli.run_app(worker_options(entrypoint))
     else:
         print("Running without LiveKit for testing purposes...\n")
 
@@ -0,0 +1,140 @@
+# alert_audio.py - Pre-rendered alert phrases played straight into the room without model latency
+import asyncio
+import logging
+import os
+import re
+import wave
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ALERT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "alerts")
+
+# Fixed lines spoken the instant an event fires; the model follows up afterwards
+ALERT_PHRASES: Dict[str, str] = {
+    "hadi_wake": "{name}! You're losing focus. Keep your eyes open and stay alert!",
+    "huda_wellbeing": "Hey {name}, you seem tired. Let's take care of you for a moment.",
+}
+
+FRAME_MS = 20
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9_-]+", "-", value.lower()).strip("-") or "default"
+
+
+def default_tts(voice: str) -> Optional[Any]:
+    """Google Cloud TTS in the Chirp 3 HD voice matching the realtime voice, if the plugin is usable."""
+    try:
+        from livekit.plugins import google  # type: ignore
+        return google.TTS(voice_name=f"en-US-Chirp3-HD-{voice}")
+    except Exception as e:  # plugin missing or no Google Cloud credentials
+        logger.info(f"No TTS for alert pre-rendering ({e}); only alerts already on disk will play")
+        return None
+
+
+class AlertAudioCache:
+    """
+    16-bit PCM for each alert phrase, per user and voice, held in memory.
+
+    `prepare()` loads `<directory>/<user>/<voice>/<key>-<crc>.wav` (the crc
+    covers the phrase text, so editing a phrase re-renders it) and renders
+    missing phrases with `tts`, saving them for the next session. `play()`
+    hands the audio to `session.say`, so the first frame goes out without a
+    model round-trip; phrases that are not ready return False and the
+    caller falls back to generating speech.
+    """
+
+    def __init__(
+        self,
+        user_name: str,
+        voice: str,
+        tts: Optional[Any] = None,
+        directory: str = DEFAULT_ALERT_DIR,
+        phrases: Optional[Dict[str, str]] = None,
+    ):
+        self.user_name = user_name
+        self.voice = voice
+        self.tts = tts
+        self.directory = os.path.join(directory, _slug(user_name), _slug(voice))
+        self.phrases = {key: text.format(name=user_name) for key, text in (phrases or ALERT_PHRASES).items()}
+        self._audio: Dict[str, Tuple[bytes, int, int]] = {}  # key -> (pcm, sample_rate, channels)
+
+    def path_for(self, key: str) -> str:
+        crc = zlib.crc32(self.phrases[key].encode()) & 0xFFFFFFFF
+        return os.path.join(self.directory, f"{key}-{crc:08x}.wav")
+
+    def has(self, key: str) -> bool:
+        return key in self._audio
+
+    async def prepare(self) -> None:
+        """Load or render every phrase; failures leave that phrase on the generated path."""
+        for key in self.phrases:
+            if key in self._audio:
+                continue
+            try:
+                audio = await asyncio.to_thread(self._load, self.path_for(key))
+                if audio is None and self.tts is not None:
+                    audio = await self._render(self.phrases[key])
+                    await asyncio.to_thread(self._save, self.path_for(key), audio)
+                if audio is not None:
+                    self._audio[key] = audio
+            except Exception as e:
+                logger.warning(f"Alert '{key}' not pre-rendered: {e}")
+        logger.info(f"Alert audio ready for {sorted(self._audio)} ({self.voice})")
+
+    def chunks(self, key: str) -> Iterator[Tuple[bytes, int, int, int]]:
+        """(pcm, sample_rate, channels, samples_per_channel) in FRAME_MS slices."""
+        pcm, rate, channels = self._audio[key]
+        samples = rate * FRAME_MS // 1000
+        step = samples * channels * 2
+        for start in range(0, len(pcm), step):
+            chunk = pcm[start:start + step]
+            yield chunk, rate, channels, len(chunk) // (channels * 2)
+
+    async def frames(self, key: str) -> AsyncIterator[Any]:
+        from livekit import rtc  # type: ignore
+
+        for chunk, rate, channels, samples in self.chunks(key):
+            yield rtc.AudioFrame(data=chunk, sample_rate=rate, num_channels=channels, samples_per_channel=samples)
+
+    def play(self, session: Any, key: str) -> bool:
+        """Queue the pre-rendered phrase on `session`; False if it is not available."""
+        if session is None or key not in self._audio:
+            return False
+        session.say(self.phrases[key], audio=self.frames(key), allow_interruptions=False)
+        return True
+
+    # ---------- rendering / storage ----------
+    async def _render(self, text: str) -> Tuple[bytes, int, int]:
+        pcm = bytearray()
+        rate, channels = 24000, 1
+        stream = self.tts.synthesize(text)
+        try:
+            async for event in stream:
+                frame = event.frame
+                rate, channels = frame.sample_rate, frame.num_channels
+                pcm.extend(bytes(frame.data))
+        finally:
+            await stream.aclose()
+        return bytes(pcm), rate, channels
+
+    @staticmethod
+    def _load(path: str) -> Optional[Tuple[bytes, int, int]]:
+        if not os.path.exists(path):
+            return None
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"{path}: expected 16-bit PCM")
+            return wav.readframes(wav.getnframes()), wav.getframerate(), wav.getnchannels()
+
+    @staticmethod
+    def _save(path: str, audio: Tuple[bytes, int, int]) -> None:
+        pcm, rate, channels = audio
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(channels)
+            wav.setsampwidth(2)
+            wav.setframerate(rate)
+            wav.writeframes(pcm)
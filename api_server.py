@@ -1,14 +1,36 @@
 # api_server.py - FastAPI backend for React frontend
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
 import asyncio
-import json
+import logging
+import os
 from agent_manager import AgentManager
 from drowsiness_monitor import DrowsinessModel
 from connectivity_manager import ConnectivityManager
+from frame_stream import MJPEG_BOUNDARY
+from http_client import http
+from log_setup import setup_logging, shutdown_logging
+from metrics import CONTENT_TYPE, REGISTRY
+from synthetic_monitor import SyntheticMonitor
+from ws_codec import accept, sender
+from ws_hub import MonitorHub
 
-app = FastAPI(title="Hadi-Huda API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    yield
+    # Stop camera monitors, release pooled upstream connections and the response cache
+    await hub.aclose()
+    await http.aclose()
+    await connectivity.aclose()
+    shutdown_logging()
+
+app = FastAPI(title="Hadi-Huda API", version="1.0.0", lifespan=lifespan)
 
 # Enable CORS for React frontend
 app.add_middleware(
@@ -23,56 +45,92 @@ class YouTubeRequest(BaseModel):
     video_id: str
 
 # Global manager instances
-manager = AgentManager()
 connectivity = ConnectivityManager()
+manager = AgentManager(connectivity=connectivity)
+
+# MONITOR_SOURCE=synthetic replaces the cameras with generated telemetry (load tests, demos)
+MONITOR_SOURCE = os.getenv("MONITOR_SOURCE", "camera").lower()
+# Exposes /api/test/* endpoints such as synthetic drowsiness injection
+ENABLE_TEST_ENDPOINTS = os.getenv("ENABLE_TEST_ENDPOINTS") == "1"
+
+def make_monitor(camera: int):
+    if MONITOR_SOURCE == "synthetic":
+        return SyntheticMonitor(camera_index=camera)
+    return DrowsinessModel(alarm_path="alarm.wav", camera_index=camera)
+
+# One detection pipeline per camera, shared by every connected dashboard
+hub = MonitorHub(make_monitor)
+
+REGISTRY.on_collect(hub.export_metrics)
+REGISTRY.on_collect(connectivity.export_metrics)
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    print("WebSocket connected")
-    
-    # Start drowsiness monitoring
-    model = DrowsinessModel(alarm_path="alarm.wav")
-    
-    async def send_alert(alert_type: str, message: str):
-        try:
-            await websocket.send_text(json.dumps({
-                "type": alert_type,
-                "message": message,
-                "timestamp": asyncio.get_event_loop().time()
-            }))
-        except Exception as e:
-            print(f"Failed to send alert: {e}")
-    
-    async def hadi_callback():
-        await send_alert("hadi_alert", "⚠️ WAKE UP! Stay alert and focused!")
-    
-    async def huda_callback():
-        await send_alert("huda_conversation", "💖 Hey! You seem tired. Need music, snacks, or a rest stop?")
-    
-    # Start monitoring in background
-    monitor_task = asyncio.create_task(model.start(
-        hadi_callback=hadi_callback,
-        huda_callback=huda_callback
-    ))
-    
+async def websocket_endpoint(websocket: WebSocket, camera: int = 0):
+    # JSON text frames by default; ?encoding=msgpack|orjson or a matching subprotocol for the fast paths
+    codec = await accept(websocket)
+    if codec is None:
+        return
+    logger.info("WebSocket connected (%s)", codec.name)
+    subscriber = await hub.subscribe(sender(websocket, codec), close=websocket.close, camera=camera, codec=codec)
+
     try:
         while True:
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            data = await websocket.receive()
+            if data.get("type") == "websocket.disconnect":
+                raise WebSocketDisconnect(data.get("code", 1000))
+            message = codec.decode(data["bytes"] if data.get("bytes") is not None else data["text"])
             
             if message["type"] == "user_message":
                 # Route to appropriate agent
                 agent_type = manager.detect_agent(message["text"])
                 response = f"{agent_type}: Processing '{message['text']}'"
-                await send_alert("agent_response", response)
+                subscriber.offer_event({
+                    "type": "agent_response",
+                    "message": response,
+                    "timestamp": asyncio.get_event_loop().time()
+                })
                 
     except WebSocketDisconnect:
-        print("WebSocket disconnected")
-        monitor_task.cancel()
+        logger.info("WebSocket disconnected")
     except Exception as e:
-        print(f"WebSocket error: {e}")
-        monitor_task.cancel()
+        logger.warning("WebSocket error: %s", e)
+    finally:
+        await hub.unsubscribe(subscriber)
+
+@app.get("/api/video")
+async def video_stream(request: Request, camera: int = 0):
+    """Annotated monitor view as MJPEG (usable directly as an <img> src)."""
+    stream = await hub.open_stream(camera)
+    name = f"mjpeg:{request.client.host if request.client else '?'}"
+
+    async def body():
+        try:
+            async for frame in stream.frames(name):
+                if await request.is_disconnected():
+                    break
+                yield frame.part
+        finally:
+            await hub.close_stream(camera)
+
+    return StreamingResponse(body(), media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}")
+
+@app.websocket("/ws/video")
+async def video_websocket(websocket: WebSocket, camera: int = 0):
+    """Annotated monitor view, one binary JPEG message per frame."""
+    await websocket.accept()
+    stream = await hub.open_stream(camera)
+    name = f"ws:{websocket.client.host if websocket.client else '?'}"
+    try:
+        async for frame in stream.frames(name):
+            await websocket.send_bytes(frame.jpeg)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        await hub.close_stream(camera)
+
+@app.get("/api/video/stats")
+async def video_stats():
+    return {"streams": hub.stream_stats()}
 
 @app.post("/api/bluetooth/connect")
 async def connect_bluetooth():
@@ -81,28 +139,29 @@ async def connect_bluetooth():
 @app.post("/api/youtube/play")
 async def play_youtube(request: YouTubeRequest):
     # Simulate YouTube integration
-    print(f"Playing YouTube video: {request.video_id}")
+    logger.info("Playing YouTube video: %s", request.video_id)
     return {"status": "playing", "video_id": request.video_id, "title": "Relaxing Music"}
 
 @app.get("/api/maps/nearby")
-async def get_nearby_places(type: str = "gas_station"):
-    places_data = {
-        "gas_station": [
-            {"name": "Shell Station", "distance": "0.5 miles", "rating": 4.2},
-            {"name": "BP Gas", "distance": "0.8 miles", "rating": 4.0},
-            {"name": "Exxon", "distance": "1.2 miles", "rating": 4.1}
-        ],
-        "restaurant": [
-            {"name": "McDonald's", "distance": "0.3 miles", "rating": 3.8},
-            {"name": "Starbucks", "distance": "0.6 miles", "rating": 4.3},
-            {"name": "Subway", "distance": "0.9 miles", "rating": 4.0}
-        ],
-        "rest_stop": [
-            {"name": "Highway Rest Area", "distance": "2.1 miles", "rating": 3.9},
-            {"name": "Travel Center", "distance": "3.5 miles", "rating": 4.2}
-        ]
-    }
-    return {"places": places_data.get(type, [])}
+async def get_nearby_places(type: str = "gas_station", lat: float = 40.7128, lng: float = -74.0060):
+    places = await connectivity.get_nearby_places(lat, lng, type)
+    return {"places": places}
+
+if ENABLE_TEST_ENDPOINTS:
+    @app.post("/api/test/drowsiness")
+    async def inject_drowsiness(camera: int = 0, kind: str = "hadi"):
+        """Fire a Hadi or Huda escalation on a synthetic monitor, as if the driver had dozed off."""
+        monitor = hub.monitor(camera)
+        if kind not in ("hadi", "huda"):
+            raise HTTPException(status_code=400, detail="kind must be 'hadi' or 'huda'")
+        if monitor is None or not hasattr(monitor, "inject"):
+            raise HTTPException(status_code=409, detail="No synthetic monitor running for this camera")
+        monitor.inject(kind)
+        return {"status": "injected", "kind": kind, "subscribers": hub.subscriber_count(camera)}
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
 
 @app.get("/api/status")
 async def get_status():
@@ -0,0 +1,134 @@
+# async_cache.py - Bounded TTL cache with request coalescing for async lookups
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTTLCache:
+    """
+    LRU cache of async results with a time-to-live.
+
+    - Entries younger than `ttl` are returned straight away.
+    - Entries younger than `ttl + stale_ttl` are returned straight away too, and
+      a background refresh is started (stale-while-revalidate).
+    - Concurrent misses for the same key share one upstream call (single-flight).
+    - Failed fetches are never cached; every waiter sees the exception.
+
+    `on_lookup`, if given, is called with "hit", "stale" or "miss" for every
+    `get_or_fetch`, e.g. to increment a metrics counter.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        maxsize: int = 256,
+        stale_ttl: float = 0.0,
+        name: str = "cache",
+        on_lookup: Optional[Callable[[str], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.name = name
+        self.on_lookup = on_lookup
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()  # key -> (stored_at, value)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for `key`, calling `fetch()` only when needed."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            age = self._clock() - stored_at
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._lookup("hit")
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                self._lookup("stale")
+                self._refresh_in_background(key, fetch)
+                return value
+
+        self.misses += 1
+        self._lookup("miss")
+        # shield: one caller being cancelled must not cancel the shared fetch
+        return await asyncio.shield(self._fetch_once(key, fetch))
+
+    def peek(self, key: Hashable, allow_stale: bool = True) -> Optional[Any]:
+        """Return a cached value without fetching, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        limit = self.ttl + (self.stale_ttl if allow_stale else 0.0)
+        return value if self._clock() - stored_at < limit else None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (self._clock(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "inflight": len(self._inflight),
+        }
+
+    # ---------- internals ----------
+    def _lookup(self, result: str) -> None:
+        if self.on_lookup is not None:
+            self.on_lookup(result)
+
+    def _fetch_once(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch_and_store(key, fetch))
+            self._inflight[key] = future
+
+            def _on_done(f, key=key):
+                if self._inflight.get(key) is f:
+                    del self._inflight[key]
+
+            future.add_done_callback(_on_done)
+        return future
+
+    async def _fetch_and_store(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        value = await fetch()
+        self.set(key, value)
+        return value
+
+    def _refresh_in_background(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._inflight:
+            return
+        future = self._fetch_once(key, fetch)
+
+        def _log_failure(f):
+            if not f.cancelled() and f.exception() is not None:
+                logger.warning(f"{self.name}: background refresh of {key!r} failed: {f.exception()}")
+
+        future.add_done_callback(_log_failure)
@@ -0,0 +1,60 @@
+# bench_intent_router.py - Time the compiled intent router against the old substring scan
+import argparse
+import random
+import timeit
+
+from intent_router import DEFAULT_INTENTS, IntentRouter
+
+SAMPLES = [
+    "What's the engine temperature?",
+    "Find me a route to Boston and check the traffic",
+    "Hello Huda, how are you today?",
+    "Play some music, I'm feeling tired",
+    "This highway is long and boring",
+    "Okay",
+]
+
+
+def substring_scan(text, hadi, huda):
+    """The previous AgentManager.detect_agent logic."""
+    text_lower = text.lower()
+    if any(k in text_lower for k in hadi):
+        return "HADI"
+    if any(k in text_lower for k in huda):
+        return "HUDA"
+    return None
+
+
+def synthetic_intents(n_agents, phrases_per_agent, seed=0):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return {
+        f"AGENT{i}": {"".join(rng.choice(letters) for _ in range(rng.randint(4, 10))): 1.0 for _ in range(phrases_per_agent)}
+        for i in range(n_agents)
+    }
+
+
+def bench(label, fn, number):
+    per_call = min(timeit.repeat(fn, number=number, repeat=5)) / number / len(SAMPLES)
+    print(f"{label:<40} {per_call * 1e6:8.2f} us/utterance")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark intent routing")
+    parser.add_argument("--number", type=int, default=2000, help="iterations per repeat")
+    parser.add_argument("--agents", type=int, default=300, help="agents in the synthetic intent set")
+    parser.add_argument("--phrases", type=int, default=10, help="phrases per synthetic agent")
+    args = parser.parse_args()
+
+    hadi, huda = list(DEFAULT_INTENTS["HADI"]), list(DEFAULT_INTENTS["HUDA"])
+    router = IntentRouter()
+    bench("substring scan (old detect_agent)", lambda: [substring_scan(t, hadi, huda) for t in SAMPLES], args.number)
+    bench("IntentRouter (default intents)", lambda: [router.route(t) for t in SAMPLES], args.number)
+
+    intents = dict(DEFAULT_INTENTS, **synthetic_intents(args.agents, args.phrases))
+    big = IntentRouter(intents)
+    bench(f"IntentRouter ({len(intents)} agents)", lambda: [big.route(t) for t in SAMPLES], args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# bench_ws_codec.py - Messages per second per core for each WebSocket encoding, single events vs per-tick batches
+import argparse
+import random
+import time
+
+from ws_codec import CODECS
+
+
+def telemetry(i, rng):
+    return {
+        "type": "telemetry",
+        "eyes": rng.choice(["open", "closed"]),
+        "closed_for": round(rng.random() * 5, 2),
+        "faces": [[rng.randint(0, 640), rng.randint(0, 480), 120, 120]],
+        "hadi_active": False,
+        "alarm": False,
+        "timestamp": 1000.0 + i * 0.033,
+    }
+
+
+def bench(label, fn, count, seconds):
+    """Run `fn` until `seconds` have passed; `fn` handles `count` events per call."""
+    calls, size = 0, 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        size += len(fn())
+        calls += 1
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {calls * count / elapsed:12,.0f} events/s  {size / calls / count:7.1f} B/event")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WebSocket event encodings")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time per measurement")
+    parser.add_argument("--batch", type=int, default=8, help="events per tick in the batched case")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    events = [telemetry(i, rng) for i in range(args.batch)]
+    print(f"codecs available: {', '.join(sorted(CODECS))}")
+    for name, codec in sorted(CODECS.items()):
+        bench(f"{name} single event", lambda: codec.encode_frame(events[:1]), 1, args.seconds)
+        bench(f"{name} batch of {args.batch}", lambda: codec.encode_frame(events), args.batch, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
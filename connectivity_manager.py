@@ -1,41 +1,107 @@
 # connectivity_manager.py - Unified connectivity for WiFi, Bluetooth, YouTube, Maps
 import asyncio
-import subprocess
 import json
-import requests
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import platform
 import os
+import tempfile
+import time
 from dotenv import load_dotenv
+from geo_cache import GeoPlacesCache, geohash_block, geohash_encode, haversine_km, rank_by_distance
+from http_client import http
+from poi_index import get_poi_index
+from persistent_cache import DEFAULT_CACHE_PATH, PersistentCache
+from resilience import (
+    CIRCUIT_STATE_VALUES, UPSTREAM_CIRCUIT, Upstream, UpstreamClientError, UpstreamError,
+)
+from route_prefetch import RoutePrefetcher
+from wifi_scanner import WifiScanner, run_command
 
 load_dotenv()
 
+# Places API has no "rest area" type; these types are searched by keyword instead
+PLACE_KEYWORDS = {
+    "rest_stop": "rest area",
+}
+
+# Offline POI results further away than this are no use to a driver
+OFFLINE_POI_RADIUS_KM = float(os.getenv("OFFLINE_POI_RADIUS_KM", "25"))
+
+# The shared car position is rewritten only once the car has moved this far or
+# this long has passed, well inside its car_position TTL
+POSITION_WRITE_MIN_KM = 0.1
+POSITION_WRITE_INTERVAL = 30.0
+
+# Google API statuses meaning the service is overloaded or out of quota; these
+# count against the circuit breaker. Any other non-success status is a problem
+# with the request itself and is surfaced to the caller as UpstreamClientError.
+QUOTA_STATUSES = {"OVER_QUERY_LIMIT", "OVER_DAILY_LIMIT", "UNKNOWN_ERROR"}
+# YouTube reports quota exhaustion as HTTP 403 with one of these reasons
+QUOTA_REASONS = {"quotaExceeded", "rateLimitExceeded", "userRateLimitExceeded", "dailyLimitExceeded"}
+
+
+def _raise_for_status(response, api: str) -> None:
+    """5xx, 429 and quota 403s are upstream failures; other 4xx are client errors"""
+    code = response.status_code
+    if 400 <= code < 500 and code != 429:
+        if code == 403 and _quota_reasons(response) & QUOTA_REASONS:
+            raise UpstreamError(f"{api} quota exceeded (HTTP 403)")
+        raise UpstreamClientError(f"{api} rejected the request (HTTP {code})")
+    response.raise_for_status()
+
+
+def _quota_reasons(response) -> set:
+    try:
+        errors = response.json().get("error", {}).get("errors", [])
+        return {error.get("reason") for error in errors}
+    except Exception:
+        return set()
+
+
+def _check_api_status(data: Dict, api: str, ok_statuses: Tuple[str, ...]) -> None:
+    status = data.get("status")
+    if status is None or status in ok_statuses:
+        return
+    if status in QUOTA_STATUSES:
+        raise UpstreamError(f"{api} status {status}")
+    message = data.get("error_message")
+    raise UpstreamClientError(f"{api} status {status}" + (f": {message}" if message else ""))
+
 class ConnectivityManager:
     def __init__(self):
         self.wifi_connected = False
         self.bluetooth_devices = {}
         self.youtube_api_key = os.getenv('YOUTUBE_API_KEY')
         self.maps_api_key = os.getenv('GOOGLE_MAPS_API_KEY')
+        # Overridable so load tests can point at local stub upstreams
+        self.youtube_api_base = os.getenv('YOUTUBE_API_BASE_URL', 'https://www.googleapis.com').rstrip('/')
+        self.maps_api_base = os.getenv('MAPS_API_BASE_URL', 'https://maps.googleapis.com').rstrip('/')
         self.gemini_api_key = os.getenv('GEMINI_API_KEY')
         self.livekit_url = os.getenv('LIVEKIT_URL')
         self.livekit_api_key = os.getenv('LIVEKIT_API_KEY')
         self.livekit_api_secret = os.getenv('LIVEKIT_API_SECRET')
+        self.places_cache = GeoPlacesCache(self._fetch_places_cell)
+        self.route_prefetcher = RoutePrefetcher(self.places_cache)
+        self.last_position: Optional[Tuple[float, float]] = None
+        self._position_written: Optional[Tuple[float, float, float]] = None  # lat, lng, monotonic time
+        self.wifi_scanner = WifiScanner()
+        # Per-API rate limits and circuit breakers: during an outage or quota
+        # exhaustion calls fall back to cached/offline/mock data immediately.
+        # Neighbour-cell warming and route prefetch leave half the places burst
+        # to lookups the driver is waiting on.
+        self.upstreams = {
+            "youtube": Upstream("youtube", rate=2.0, burst=5),
+            "places": Upstream("places", rate=5.0, burst=10, background_reserve=5),
+            "directions": Upstream("directions", rate=2.0, burst=5),
+        }
+        # YouTube searches and routes barely change: keep them across restarts
+        self.response_cache = PersistentCache(os.getenv('RESPONSE_CACHE_PATH', DEFAULT_CACHE_PATH))
         
     # WiFi Management
     async def scan_wifi(self) -> List[Dict]:
-        """Scan available WiFi networks"""
+        """Scan available WiFi networks (cached briefly; concurrent callers share one scan)"""
         try:
-            if platform.system() == "Windows":
-                result = subprocess.run(
-                    ["netsh", "wlan", "show", "profiles"], 
-                    capture_output=True, text=True
-                )
-                networks = []
-                for line in result.stdout.split('\n'):
-                    if "All User Profile" in line:
-                        ssid = line.split(':')[1].strip()
-                        networks.append({"ssid": ssid, "signal": "Unknown"})
-                return networks
+            return await self.wifi_scanner.scan()
         except Exception as e:
             print(f"WiFi scan error: {e}")
             return []
@@ -70,13 +136,29 @@ class ConnectivityManager:
     </MSM>
 </WLANProfile>'''
                 
-                with open(f"{ssid}.xml", "w") as f:
-                    f.write(profile_xml)
-                
-                subprocess.run(["netsh", "wlan", "add", "profile", f"filename={ssid}.xml"])
-                result = subprocess.run(["netsh", "wlan", "connect", f"name={ssid}"])
-                self.wifi_connected = result.returncode == 0
-                return self.wifi_connected
+                # The profile holds the key in clear text: private temp file, removed once imported
+                fd, profile_path = tempfile.mkstemp(suffix=".xml")
+                try:
+                    with os.fdopen(fd, "w") as f:
+                        f.write(profile_xml)
+                    await run_command("netsh", "wlan", "add", "profile", f"filename={profile_path}")
+                finally:
+                    os.remove(profile_path)
+                returncode, _, _ = await run_command("netsh", "wlan", "connect", f"name={ssid}")
+                self.wifi_connected = returncode == 0
+            elif platform.system() == "Linux":
+                # --ask reads the password from stdin, so it never shows up in the process list
+                returncode, _, err = await run_command(
+                    "nmcli", "--ask", "device", "wifi", "connect", ssid,
+                    input=password + "\n", timeout=30.0,
+                )
+                if returncode != 0:
+                    print(f"WiFi connection error: {err.strip()}")
+                self.wifi_connected = returncode == 0
+            else:
+                return False
+            self.wifi_scanner.invalidate()
+            return self.wifi_connected
         except Exception as e:
             print(f"WiFi connection error: {e}")
             return False
@@ -108,34 +190,43 @@ class ConnectivityManager:
     # YouTube Integration
     async def search_youtube(self, query: str, max_results: int = 5) -> List[Dict]:
         """Search YouTube videos"""
+        cache_params = {"q": query, "max_results": max_results}
         try:
             # Using YouTube Data API v3
             if not self.youtube_api_key:
                 return self._mock_youtube_results(query)
-            
-            url = "https://www.googleapis.com/youtube/v3/search"
-            params = {
-                "part": "snippet",
-                "q": query,
-                "type": "video",
-                "maxResults": max_results,
-                "key": self.youtube_api_key
-            }
-            
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                data = response.json()
-                return [
-                    {
-                        "video_id": item["id"]["videoId"],
-                        "title": item["snippet"]["title"],
-                        "thumbnail": item["snippet"]["thumbnails"]["default"]["url"]
-                    }
-                    for item in data.get("items", [])
-                ]
+            cached = await self.response_cache.get("youtube_search", cache_params)
+            if cached is not None:
+                return cached
+            results = await self.upstreams["youtube"].call(lambda: self._fetch_youtube(query, max_results))
+            await self.response_cache.set("youtube_search", cache_params, results)
+            return results
         except Exception as e:
             print(f"YouTube search error: {e}")
-            return self._mock_youtube_results(query)
+            stale = await self._stale_response("youtube_search", cache_params)
+            return stale if stale is not None else self._mock_youtube_results(query)
+
+    async def _fetch_youtube(self, query: str, max_results: int) -> List[Dict]:
+        url = f"{self.youtube_api_base}/youtube/v3/search"
+        params = {
+            "part": "snippet",
+            "q": query,
+            "type": "video",
+            "maxResults": max_results,
+            "key": self.youtube_api_key
+        }
+
+        response = await http.get(url, params=params)
+        _raise_for_status(response, "YouTube API")
+        data = response.json()
+        return [
+            {
+                "video_id": item["id"]["videoId"],
+                "title": item["snippet"]["title"],
+                "thumbnail": item["snippet"]["thumbnails"]["default"]["url"]
+            }
+            for item in data.get("items", [])
+        ]
     
     def _mock_youtube_results(self, query: str) -> List[Dict]:
         """Mock YouTube results for demo"""
@@ -147,35 +238,74 @@ class ConnectivityManager:
     
     # Maps Integration
     async def get_nearby_places(self, lat: float, lng: float, place_type: str = "gas_station") -> List[Dict]:
-        """Get nearby places using Google Maps API"""
+        """Get nearby places using Google Maps API (served from the geohash cell cache when warm)"""
         try:
+            await self.report_position(lat, lng)
             if not self.maps_api_key:
-                return self._mock_places_data(place_type)
-            
-            url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-            params = {
-                "location": f"{lat},{lng}",
-                "radius": 5000,
-                "type": place_type,
-                "key": self.maps_api_key
-            }
-            
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                data = response.json()
-                return [
-                    {
-                        "name": place["name"],
-                        "rating": place.get("rating", 0),
-                        "distance": "Unknown",
-                        "address": place.get("vicinity", "")
-                    }
-                    for place in data.get("results", [])[:5]
-                ]
+                return self._offline_places(lat, lng, place_type)
+            return await self.places_cache.query(lat, lng, place_type)
         except Exception as e:
             print(f"Maps API error: {e}")
+            return self._offline_places(lat, lng, place_type)
+
+    def _offline_places(self, lat: float, lng: float, place_type: str) -> List[Dict]:
+        """Places within OFFLINE_POI_RADIUS_KM from the offline POI index (tunnels, rural areas, no key)"""
+        index = get_poi_index()
+        if not len(index):
             return self._mock_places_data(place_type)
-    
+        places = index.within(lat, lng, OFFLINE_POI_RADIUS_KM, place_type, limit=5)
+        # The extract may be out of date: say so rather than present it as live
+        return [dict(place, offline=True, approximate=True) for place in places]
+
+    async def _fetch_places_cell(
+        self, lat: float, lng: float, place_type: str, radius_m: int, background: bool = False
+    ) -> List[Dict]:
+        """Fetch one geohash cell worth of places, from the shared cache or the Places API"""
+        # Shared on disk so other processes (the voice agent) and restarts reuse what this one warmed
+        cache_params = {"cell": geohash_encode(lat, lng, self.places_cache.precision), "type": place_type}
+        try:
+            cached = await self.response_cache.get("places_cell", cache_params)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            print(f"Response cache error: {e}")
+        places = await self.upstreams["places"].call(
+            lambda: self._request_places(lat, lng, place_type, radius_m), background=background
+        )
+        try:
+            await self.response_cache.set("places_cell", cache_params, places)
+        except Exception as e:
+            print(f"Response cache error: {e}")
+        return places
+
+    async def _request_places(self, lat: float, lng: float, place_type: str, radius_m: int) -> List[Dict]:
+        url = f"{self.maps_api_base}/maps/api/place/nearbysearch/json"
+        params = {
+            "location": f"{lat},{lng}",
+            "radius": radius_m,
+            "key": self.maps_api_key
+        }
+        if place_type in PLACE_KEYWORDS:
+            params["keyword"] = PLACE_KEYWORDS[place_type]
+        else:
+            params["type"] = place_type
+
+        response = await http.get(url, params=params)
+        _raise_for_status(response, "Places API")
+        data = response.json()
+        _check_api_status(data, "Places API", ("OK", "ZERO_RESULTS"))
+        return [
+            {
+                "place_id": place.get("place_id"),
+                "name": place["name"],
+                "rating": place.get("rating", 0),
+                "address": place.get("vicinity", ""),
+                "lat": place["geometry"]["location"]["lat"],
+                "lng": place["geometry"]["location"]["lng"]
+            }
+            for place in data.get("results", [])
+        ]
+
     def _mock_places_data(self, place_type: str) -> List[Dict]:
         """Mock places data for demo"""
         places_data = {
@@ -200,24 +330,132 @@ class ConnectivityManager:
                     "steps": ["Head north on Main St", "Turn right on Highway 101"]
                 }
             
-            url = "https://maps.googleapis.com/maps/api/directions/json"
-            params = {
-                "origin": origin,
-                "destination": destination,
-                "mode": "driving",
-                "key": self.maps_api_key
-            }
-            
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                data = response.json()
-                if data["routes"]:
-                    route = data["routes"][0]["legs"][0]
-                    return {
-                        "distance": route["distance"]["text"],
-                        "duration": route["duration"]["text"],
-                        "steps": [step["html_instructions"] for step in route["steps"][:5]]
-                    }
+            cache_params = {"origin": origin, "destination": destination}
+            result = await self.response_cache.get("directions", cache_params)
+            if result is None:
+                try:
+                    data = await self.upstreams["directions"].call(
+                        lambda: self._request_directions(origin, destination)
+                    )
+                except UpstreamClientError as e:
+                    print(f"Directions request rejected: {e}")
+                    return {"error": str(e)}
+                except Exception as e:
+                    # Short-circuited, out of quota or unreachable: an expired route beats none
+                    print(f"Directions unavailable: {e}")
+                    result = await self._stale_response("directions", cache_params)
+                    if result is None:
+                        return {"error": "Directions are temporarily unavailable"}
+                else:
+                    if not data["routes"]:
+                        return {"error": "No route found"}
+                    result = self._summarise_route(data["routes"][0])
+                    await self.response_cache.set("directions", cache_params, result)
+
+            if result.get("polyline"):
+                # Warm rest stops / fuel / food along the way before anyone asks
+                self.route_prefetcher.prefetch(result["polyline"])
+            return result
         except Exception as e:
             print(f"Directions error: {e}")
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
+
+    def _summarise_route(self, route: Dict) -> Dict:
+        leg = route["legs"][0]
+        return {
+            "distance": leg["distance"]["text"],
+            "duration": leg["duration"]["text"],
+            "steps": [step["html_instructions"] for step in leg["steps"][:5]],
+            "polyline": route.get("overview_polyline", {}).get("points", "")
+        }
+
+    async def _request_directions(self, origin: str, destination: str) -> Dict:
+        url = f"{self.maps_api_base}/maps/api/directions/json"
+        params = {
+            "origin": origin,
+            "destination": destination,
+            "mode": "driving",
+            "key": self.maps_api_key
+        }
+
+        response = await http.get(url, params=params)
+        _raise_for_status(response, "Directions API")
+        data = response.json()
+        _check_api_status(data, "Directions API", ("OK", "ZERO_RESULTS", "NOT_FOUND"))
+        return data
+
+    async def _stale_response(self, endpoint: str, params: Dict) -> Optional[object]:
+        """Expired cache entry as an outage fallback, or None"""
+        try:
+            return await self.response_cache.get(endpoint, params, allow_stale=True)
+        except Exception as e:
+            print(f"Response cache error: {e}")
+            return None
+
+    async def aclose(self) -> None:
+        """Release the on-disk response cache"""
+        await self.response_cache.close()
+
+    def upstream_status(self) -> Dict[str, Dict]:
+        """Circuit breaker state per upstream API"""
+        return {name: upstream.status() for name, upstream in self.upstreams.items()}
+
+    def export_metrics(self) -> None:
+        """Metrics collector: breaker state is time-dependent, so it is read at scrape time"""
+        for name, status in self.upstream_status().items():
+            UPSTREAM_CIRCUIT.labels(name).set(CIRCUIT_STATE_VALUES[status["state"]])
+
+    async def report_position(self, lat: float, lng: float) -> None:
+        """Record where the car is now, for this process and (via the shared cache) the others"""
+        self.last_position = (lat, lng)
+        now = time.monotonic()
+        if self._position_written is not None:
+            last_lat, last_lng, written_at = self._position_written
+            moved_km = float(haversine_km(lat, lng, last_lat, last_lng))
+            if moved_km < POSITION_WRITE_MIN_KM and now - written_at < POSITION_WRITE_INTERVAL:
+                return
+        try:
+            await self.response_cache.set("car_position", {}, {"lat": lat, "lng": lng})
+            self._position_written = (lat, lng, now)
+        except Exception as e:
+            print(f"Response cache error: {e}")
+
+    async def current_position(self) -> Optional[Tuple[float, float]]:
+        """Last reported car position from any process, or None if it is older than the car_position TTL"""
+        try:
+            position = await self.response_cache.get("car_position", {})
+        except Exception as e:
+            print(f"Response cache error: {e}")
+            return None
+        return (position["lat"], position["lng"]) if position else None
+
+    async def nearest_cached_stop(self, lat: Optional[float] = None, lng: Optional[float] = None) -> Optional[Dict]:
+        """
+        Closest cached rest stop, fuel or food near the car — never touches the network.
+
+        Without an explicit position the most recent one reported by any process
+        is used, and nothing is suggested if there is none. Cells warmed by
+        another process are read from the shared on-disk cache.
+        """
+        position = (lat, lng) if lat is not None and lng is not None else await self.current_position()
+        if position is None:
+            return None
+        for place_type in ("rest_stop", "gas_station", "restaurant"):
+            places = self.places_cache.cached_places(position[0], position[1], place_type)
+            if places is None:
+                places = await self._shared_cached_places(position[0], position[1], place_type)
+            ranked = rank_by_distance(position[0], position[1], places, radius_km=15.0, limit=1)
+            if ranked:
+                return dict(ranked[0], type=place_type)
+        return None
+
+    async def _shared_cached_places(self, lat: float, lng: float, place_type: str) -> List[Dict]:
+        block = geohash_block(geohash_encode(lat, lng, self.places_cache.precision))
+        places: List[Dict] = []
+        for cell in block:
+            try:
+                places.extend(await self.response_cache.get("places_cell", {"cell": cell, "type": place_type}) or [])
+            except Exception as e:
+                print(f"Response cache error: {e}")
+                break
+        return places
@@ -2,11 +2,20 @@
 import cv2
 import time
 import asyncio
+import logging
 import threading
 from playsound import playsound
+from metrics import counter, gauge, histogram
+
+logger = logging.getLogger(__name__)
+
+MONITOR_FRAMES = counter("monitor_frames_total", "Camera frames processed", ["camera"])
+MONITOR_FPS = gauge("monitor_fps", "Frames processed per second, over the last second", ["camera"])
+MONITOR_STAGE_SECONDS = histogram("monitor_stage_seconds", "Time per frame-loop stage", ["camera", "stage"])
+MONITOR_ALERTS = counter("monitor_alerts_total", "Drowsiness escalations", ["camera", "kind"])
 
 class DrowsinessModel:
-    def __init__(self, alarm_path="alarm.wav"):
+    def __init__(self, alarm_path="alarm.wav", camera_index=0):
         # Load Haar cascades (with fallback)
         try:
             face_cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'  # type: ignore
@@ -18,6 +27,7 @@ class DrowsinessModel:
         self.face_cascade = cv2.CascadeClassifier(face_cascade_path)
         self.eye_cascade = cv2.CascadeClassifier(eye_cascade_path)
         self.alarm_path = alarm_path
+        self.camera_index = camera_index
 
         # state flags
         self.eyes_closed_start = None
@@ -35,6 +45,9 @@ class DrowsinessModel:
         # track background agent tasks so we don't spawn duplicates
         self._background_tasks = set()
 
+        # optional callable receiving each annotated frame (e.g. FrameStream.submit); must not block
+        self.frame_sink = None
+
     # ---------- alarm control ----------
     def _alarm_loop(self):
         """Loop the alarm sound until stop event is set."""
@@ -44,7 +57,7 @@ class DrowsinessModel:
                     playsound(self.alarm_path)
                 except Exception as e:
                     # playsound may raise if audio device busy — at least keep trying
-                    print(f"⚠️ playsound error: {e}")
+                    logger.warning("⚠️ playsound error: %s", e)
                 # small sleep to check stop event frequently
                 if self._alarm_stop_event.wait(timeout=0.2):
                     break
@@ -86,31 +99,46 @@ class DrowsinessModel:
                     return
                 exc = t.exception()
                 if exc:
-                    print(f"⚠️ Background task exception: {exc}")
+                    logger.error("⚠️ Background task exception: %s", exc)
 
             task.add_done_callback(_on_done)
             return task
         except Exception as e:
-            print(f"⚠️ Failed to schedule background task: {e}")
+            logger.error("⚠️ Failed to schedule background task: %s", e)
             return None
 
     # ---------- main async monitor ----------
-    async def start(self, hadi_callback=None, huda_callback=None):
-        """Start video-based drowsiness monitoring with enhanced agent workflow."""
+    async def start(self, hadi_callback=None, huda_callback=None, telemetry_callback=None):
+        """Start video-based drowsiness monitoring with enhanced agent workflow.
+
+        `telemetry_callback`, if given, is called synchronously once per frame
+        with the eye state and face boxes; it must not block.
+        """
         self.running = True
-        print("👁️  Enhanced Drowsiness Monitor Started (press ESC to stop)")
+        logger.info("👁️  Enhanced Drowsiness Monitor Started on camera %s (press ESC to stop)", self.camera_index)
 
-        cap = cv2.VideoCapture(0)
+        cap = cv2.VideoCapture(self.camera_index)
         if not cap.isOpened():
-            print("❌ Camera not accessible.")
+            logger.error("❌ Camera %s not accessible.", self.camera_index)
             return
 
+        camera = self.camera_index
+        frames = MONITOR_FRAMES.labels(camera)
+        fps = MONITOR_FPS.labels(camera)
+        capture_time = MONITOR_STAGE_SECONDS.labels(camera, "capture")
+        detect_time = MONITOR_STAGE_SECONDS.labels(camera, "detect")
+        render_time = MONITOR_STAGE_SECONDS.labels(camera, "render")
+        fps_window_start, fps_window_frames = time.perf_counter(), 0
+
         try:
             while self.running:
+                t0 = time.perf_counter()
                 ret, frame = cap.read()
                 if not ret:
                     await asyncio.sleep(0.05)
                     continue
+                t1 = time.perf_counter()
+                capture_time.observe(t1 - t0)
 
                 gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
                 faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
@@ -123,6 +151,8 @@ class DrowsinessModel:
                         eyes_detected = True
                         break
 
+                t2 = time.perf_counter()
+                detect_time.observe(t2 - t1)
                 current_time = time.time()
 
                 if eyes_detected:
@@ -136,6 +166,7 @@ class DrowsinessModel:
                         # schedule huda callback in background so we don't block frame loop
                         if huda_callback:
                             self._schedule_background(huda_callback())
+                        MONITOR_ALERTS.labels(camera, "huda").inc()
 
                         self.was_drowsy = False
                         self.hadi_alerted = False
@@ -158,35 +189,57 @@ class DrowsinessModel:
                         if current_time - self.last_alert_time > self.cooldown:
                             self.hadi_alerted = True
                             self.was_drowsy = True
-                            print("🚨 2s threshold! Scheduling Hadi wake-up (background task)...")
+                            logger.warning("🚨 2s threshold! Scheduling Hadi wake-up (background task)...")
                             if hadi_callback:
                                 # schedule the callback — do NOT await
                                 self._schedule_background(hadi_callback())
+                            MONITOR_ALERTS.labels(camera, "hadi").inc()
 
                     # Step 2: physical alarm at ~5 seconds (looping alarm until eyes open)
                     if closed_duration > 5.0 and not self.alarm_triggered:
                         self.alarm_triggered = True
                         self.last_alert_time = current_time
-                        print("🔔 5s threshold! Starting physical alarm (looping)...")
+                        logger.warning("🔔 5s threshold! Starting physical alarm (looping)...")
                         self.start_alarm()
+                        MONITOR_ALERTS.labels(camera, "alarm").inc()
 
                 # Display status overlay
                 if self.hadi_alerted and not eyes_detected:
                     status_text += " - HADI ACTIVE"
 
+                if telemetry_callback:
+                    telemetry_callback({
+                        "eyes": "open" if eyes_detected else "closed",
+                        "closed_for": round(current_time - self.eyes_closed_start, 2) if self.eyes_closed_start else 0.0,
+                        "faces": [[int(v) for v in face] for face in faces],
+                        "hadi_active": self.hadi_alerted,
+                        "alarm": self.alarm_triggered,
+                    })
+
                 cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+                if self.frame_sink is not None:
+                    self.frame_sink(frame)
                 cv2.imshow("Enhanced Fatigue Detection", frame)
 
                 # ESC to exit
                 if cv2.waitKey(1) & 0xFF == 27:
                     self.running = False
 
+                t3 = time.perf_counter()
+                render_time.observe(t3 - t2)
+                frames.inc()
+                fps_window_frames += 1
+                if t3 - fps_window_start >= 1.0:
+                    fps.set(fps_window_frames / (t3 - fps_window_start))
+                    fps_window_start, fps_window_frames = t3, 0
+
                 # small sleep so loop yields to asyncio
                 await asyncio.sleep(0.05)
         finally:
             # cleanup on exit
             if self.alarm_triggered:
                 self.stop_alarm()
+            fps.set(0)
             cap.release()
             cv2.destroyAllWindows()
-            print("🛑 Enhanced Drowsiness Monitor Stopped.")
+            logger.info("🛑 Enhanced Drowsiness Monitor Stopped.")
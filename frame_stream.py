@@ -0,0 +1,177 @@
+# frame_stream.py - Annotated monitor frames JPEG-encoded once off the detection loop and shared by every viewer
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JPEG_QUALITY = int(os.getenv("STREAM_JPEG_QUALITY", "70"))
+MAX_WIDTH = int(os.getenv("STREAM_MAX_WIDTH", "640"))  # 0 keeps the camera resolution
+
+MJPEG_BOUNDARY = "frame"
+
+
+def jpeg_encoder(quality: int = JPEG_QUALITY, max_width: int = MAX_WIDTH) -> Callable[[Any], bytes]:
+    """Downscale to `max_width` and JPEG-encode a BGR frame with OpenCV."""
+    import cv2
+
+    params = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+
+    def encode(frame: Any) -> bytes:
+        height, width = frame.shape[:2]
+        if max_width and width > max_width:
+            frame = cv2.resize(frame, (max_width, height * max_width // width), interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode(".jpg", frame, params)
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+
+    return encode
+
+
+class EncodedFrame:
+    """One encoded frame; `part` is the same JPEG already wrapped for multipart/x-mixed-replace."""
+
+    __slots__ = ("seq", "jpeg", "part", "captured_at")
+
+    def __init__(self, seq: int, jpeg: bytes, captured_at: float):
+        self.seq = seq
+        self.jpeg = jpeg
+        self.part = (
+            f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+            + jpeg + b"\r\n"
+        )
+        self.captured_at = captured_at
+
+
+class Viewer:
+    """Delivery counters for one connected viewer."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.connected_at = time.monotonic()
+        self.last_seq = 0
+        self.sent = 0
+        self.skipped = 0
+        self.lag = 0.0  # capture -> handed to the socket, latest frame
+        self.max_lag = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.connected_at, 1e-9)
+        return {
+            "viewer": self.name,
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "fps": round(self.sent / elapsed, 1),
+            "lag_ms": round(self.lag * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+        }
+
+
+class FrameStream:
+    """
+    Latest-frame broadcast for one camera.
+
+    The detection loop calls `submit()` with each annotated frame; that only
+    stores a reference and wakes the encoder thread, which encodes the newest
+    frame it finds (older unencoded ones are dropped) and nothing at all while
+    no one is watching. Each viewer iterates `frames()` and always gets the
+    newest encoded frame, so a slow viewer skips frames instead of queueing
+    them, and never delays the others.
+    """
+
+    def __init__(self, encode: Optional[Callable[[Any], bytes]] = None):
+        self._encode = encode
+        self.latest: Optional[EncodedFrame] = None
+        self.encoded = 0
+        self.viewers: List[Viewer] = []
+        self._raw: Optional[Any] = None
+        self._raw_at = 0.0
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        if self._encode is None:
+            self._encode = jpeg_encoder()
+        self._thread = threading.Thread(target=self._run, name="frame-encoder", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame: Any) -> None:
+        """Hand over a processed frame; never blocks the caller."""
+        if not self.viewers or self._stopped:
+            return
+        self._raw, self._raw_at = frame, time.monotonic()
+        self._wake.set()
+
+    async def frames(self, name: str = "viewer") -> AsyncIterator[EncodedFrame]:
+        viewer = Viewer(name)
+        self.viewers.append(viewer)
+        try:
+            while not self._stopped:
+                changed = self._changed
+                frame = self.latest
+                if frame is None or frame.seq <= viewer.last_seq:
+                    await changed.wait()
+                    continue
+                if viewer.last_seq:
+                    viewer.skipped += frame.seq - viewer.last_seq - 1
+                viewer.last_seq = frame.seq
+                yield frame
+                # Resumed once the caller finished sending this frame
+                viewer.sent += 1
+                viewer.lag = time.monotonic() - frame.captured_at
+                viewer.max_lag = max(viewer.max_lag, viewer.lag)
+        finally:
+            self.viewers.remove(viewer)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"encoded": self.encoded, "viewers": [viewer.stats() for viewer in self.viewers]}
+
+    async def aclose(self) -> None:
+        self._stopped = True
+        self._wake.set()
+        if self._changed is not None:
+            self._changed.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            await asyncio.to_thread(thread.join)
+
+    # ---------- encoder thread ----------
+    def _run(self) -> None:
+        seq = 0
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stopped:
+                return
+            frame, captured_at = self._raw, self._raw_at
+            self._raw = None
+            if frame is None:
+                continue
+            try:
+                jpeg = self._encode(frame)
+            except Exception as e:
+                logger.warning(f"Frame encoding failed: {e}")
+                continue
+            seq += 1
+            encoded = EncodedFrame(seq, jpeg, captured_at)
+            try:
+                self._loop.call_soon_threadsafe(self._publish, encoded)
+            except RuntimeError:  # loop closed underneath us
+                return
+
+    def _publish(self, frame: EncodedFrame) -> None:
+        self.latest = frame
+        self.encoded += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
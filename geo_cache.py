@@ -0,0 +1,229 @@
+# geo_cache.py - Geohash-cell cache for nearby-place lookups
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from async_cache import AsyncTTLCache
+from resilience import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_MILE = 1.609344
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+# -------------------------------------------------------------------
+# Geohash helpers
+# -------------------------------------------------------------------
+def geohash_encode(lat: float, lng: float, precision: int = 5) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                bits, lng_lo = (bits << 1) | 1, mid
+            else:
+                bits, lng_hi = bits << 1, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits, lat_lo = (bits << 1) | 1, mid
+            else:
+                bits, lat_hi = bits << 1, mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def geohash_bbox(cell: str) -> Tuple[float, float, float, float]:
+    """Return (lat_lo, lat_hi, lng_lo, lng_hi) of a geohash cell."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    even = True
+    for char in cell:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                lng_lo, lng_hi = (mid, lng_hi) if bit else (lng_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lat_hi, lng_lo, lng_hi
+
+
+def geohash_center(cell: str) -> Tuple[float, float]:
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bbox(cell)
+    return (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
+
+
+def geohash_block(cell: str) -> List[str]:
+    """The cell followed by its 8 neighbours (fewer at the poles)."""
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bbox(cell)
+    d_lat, d_lng = lat_hi - lat_lo, lng_hi - lng_lo
+    lat_c, lng_c = (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
+    block = [cell]
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if dx == 0 and dy == 0:
+                continue
+            lat = lat_c + dy * d_lat
+            if not -90.0 < lat < 90.0:
+                continue
+            lng = (lng_c + dx * d_lng + 180.0) % 360.0 - 180.0
+            neighbour = geohash_encode(lat, lng, len(cell))
+            if neighbour not in block:
+                block.append(neighbour)
+    return block
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point to arrays of points."""
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def format_miles(km: float) -> str:
+    return f"{km / KM_PER_MILE:.1f} miles"
+
+
+# -------------------------------------------------------------------
+# Cache
+# -------------------------------------------------------------------
+# fetch_cell(lat, lng, place_type, radius_m, background) -> places with "lat"/"lng" keys;
+# background fetches are warming work that should give way to interactive ones
+CellFetcher = Callable[[float, float, str, int, bool], Awaitable[List[Dict]]]
+
+
+class GeoPlacesCache:
+    """
+    Nearby-place results cached per (geohash cell, place type).
+
+    A query looks at the cell containing the car plus its 8 neighbours. Warm
+    cells answer immediately; cold neighbours are fetched in the background so
+    the next query along the road is warm. Only a cold centre cell makes the
+    caller wait. Distances are computed locally from the car's exact position.
+
+    Expired cells keep answering for `stale_ttl` more while they are refreshed
+    in the background, so an upstream outage or exhausted quota still gets
+    the last known places rather than none.
+    """
+
+    def __init__(
+        self,
+        fetch_cell: CellFetcher,
+        precision: int = 5,
+        ttl: float = 30 * 60,
+        stale_ttl: float = 6 * 60 * 60,
+        max_cells: int = 2048,
+    ):
+        self.fetch_cell = fetch_cell
+        self.precision = precision
+        self.cells = AsyncTTLCache(ttl=ttl, stale_ttl=stale_ttl, maxsize=max_cells, name="places")
+        self._background: Set[asyncio.Task] = set()
+
+    def _cell_radius_m(self, cell: str) -> int:
+        """Search radius that covers a cell from its centre (half diagonal)."""
+        lat_lo, lat_hi, lng_lo, lng_hi = geohash_bbox(cell)
+        lat_c, lng_c = geohash_center(cell)
+        corner = haversine_km(lat_c, lng_c, np.array([lat_hi]), np.array([lng_hi]))[0]
+        return int(corner * 1000) + 1
+
+    def fetch_cell_places(self, cell: str, place_type: str, background: bool = False) -> Awaitable[List[Dict]]:
+        """Places in `cell`, from cache or (single-flight) upstream."""
+        lat, lng = geohash_center(cell)
+        return self.cells.get_or_fetch(
+            (cell, place_type),
+            lambda: self.fetch_cell(lat, lng, place_type, self._cell_radius_m(cell), background),
+        )
+
+    def is_warm(self, cell: str, place_type: str) -> bool:
+        return self.cells.peek((cell, place_type), allow_stale=False) is not None
+
+    def warm(self, lat: float, lng: float, place_type: str) -> Optional[asyncio.Task]:
+        """Fetch the cell containing (lat, lng) in the background if it is cold."""
+        return self._warm_cell(geohash_encode(lat, lng, self.precision), place_type)
+
+    def _warm_cell(self, cell: str, place_type: str) -> Optional[asyncio.Task]:
+        if self.is_warm(cell, place_type):
+            return None
+        task = asyncio.ensure_future(self.fetch_cell_places(cell, place_type, background=True))
+        self._background.add(task)
+
+        def _on_done(t):
+            self._background.discard(t)
+            if t.cancelled() or t.exception() is None:
+                return
+            if isinstance(t.exception(), UpstreamUnavailable):
+                # Deferred to keep quota for interactive lookups; a later query retries
+                logger.debug(f"Background fetch of {place_type} in cell {cell} skipped: {t.exception()}")
+            else:
+                logger.warning(f"Background fetch of {place_type} in cell {cell} failed: {t.exception()}")
+
+        task.add_done_callback(_on_done)
+        return task
+
+    def cached_places(self, lat: float, lng: float, place_type: str) -> Optional[List[Dict]]:
+        """Places from warm cells around (lat, lng) without any network, or None if all cold."""
+        block = geohash_block(geohash_encode(lat, lng, self.precision))
+        found = [self.cells.peek((cell, place_type)) for cell in block]
+        warm = [places for places in found if places is not None]
+        if not warm:
+            return None
+        return [place for places in warm for place in places]
+
+    async def query(
+        self, lat: float, lng: float, place_type: str, radius_km: float = 5.0, limit: int = 5
+    ) -> List[Dict]:
+        block = geohash_block(geohash_encode(lat, lng, self.precision))
+        centre = block[0]
+
+        if self.cells.peek((centre, place_type)) is None:
+            await self.fetch_cell_places(centre, place_type)
+        for cell in block:
+            self._warm_cell(cell, place_type)
+
+        places = self.cached_places(lat, lng, place_type) or []
+        return rank_by_distance(lat, lng, places, radius_km, limit)
+
+
+def rank_by_distance(
+    lat: float, lng: float, places: List[Dict], radius_km: float = 5.0, limit: int = 5
+) -> List[Dict]:
+    """Dedupe, filter to `radius_km` and sort places by distance from (lat, lng)."""
+    unique: Dict[str, Dict] = {}
+    for place in places:
+        key = place.get("place_id") or f"{place.get('name')}|{place.get('address')}"
+        unique.setdefault(key, place)
+    if not unique:
+        return []
+
+    candidates = list(unique.values())
+    distances = haversine_km(
+        lat, lng,
+        np.fromiter((p["lat"] for p in candidates), dtype=float, count=len(candidates)),
+        np.fromiter((p["lng"] for p in candidates), dtype=float, count=len(candidates)),
+    )
+    order = np.argsort(distances)
+    ranked = []
+    for i in order:
+        if distances[i] > radius_km or len(ranked) >= limit:
+            break
+        place = dict(candidates[i])
+        place["distance"] = format_miles(distances[i])
+        place["distance_km"] = round(float(distances[i]), 3)
+        ranked.append(place)
+    return ranked
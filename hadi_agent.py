@@ -1,8 +1,8 @@
 # hadi_agent.py — Vehicle Co-Pilot (Technical / Diagnostic Agent)
 
 import os
-import json
 import logging
+import time
 import asyncio
 from typing import Optional
 
@@ -19,7 +19,6 @@ HAS_LIVEKIT = False
 try:
     from livekit import agents  # type: ignore
     from livekit.agents import AgentSession, Agent, RoomInputOptions, ChatContext  # type: ignore
-    from livekit.plugins import noise_cancellation, google  # type: ignore
     HAS_LIVEKIT = True
 except ImportError:
     print("LiveKit not installed. Run: pip install livekit-agents")
@@ -35,37 +34,26 @@ except ImportError:
         def add_message(self, **kwargs): pass
     class RoomInputOptions:
         def __init__(self, **kwargs): pass
-    class google:
-        class beta:
-            class realtime:
-                @staticmethod
-                def RealtimeModel(**kwargs): return None
-    class noise_cancellation:
-        @staticmethod
-        def BVC(): return None
-
-# Memory
-HAS_MEM0 = False
-try:
-    from mem0 import AsyncMemoryClient  # type: ignore
-    HAS_MEM0 = True
-except ImportError:
-    print("mem0 not installed. Run: pip install mem0ai")
-    class AsyncMemoryClient:
-        async def get_all(self, **kwargs): return []
-        async def add(self, **kwargs): pass
 
 # -------------------------------------------------------------------
 # Local imports
 # -------------------------------------------------------------------
 from hadi_prompt import HADI_AGENT_INSTRUCTION, SESSION_INSTRUCTION_HADI
+from http_client import http
+from lazy_plugins import build_realtime_model, load_plugins
+from local_memory import MEMORY_TOP_K, get_memory_client
+from log_setup import setup_logging
+from memory_context import build_memory_context
+from memory_writer import MemoryWriter
+from startup_timing import StartupTimer
 from tools import search_web, diagnose_car_issue
+from worker import prewarmed, session_started, worker_options
 
 # -------------------------------------------------------------------
 # Config
 # -------------------------------------------------------------------
 load_dotenv()
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+setup_logging()
 
 # -------------------------------------------------------------------
 # CLASS: HadiAgent
@@ -73,37 +61,49 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 class HadiAgent:
     """HADI — Intelligent Vehicle Systems Co-Pilot (Diagnostics / Navigation)"""
 
-    def __init__(self, chat_ctx: Optional[ChatContext] = None) -> None:
+    # Persona, reused when a shared session switches to Hadi
+    instructions = HADI_AGENT_INSTRUCTION
+    tools = [search_web, diagnose_car_issue]
+
+    def __init__(self, chat_ctx: Optional[ChatContext] = None, llm=None) -> None:
         self.session: Optional[AgentSession] = None
         self.chat_ctx = chat_ctx
+        # AlertAudioCache with the pre-rendered wake-up line, set by the co-pilot entrypoint
+        self.alert_audio = None
 
         if HAS_LIVEKIT:
             self._agent = Agent(
-                instructions=HADI_AGENT_INSTRUCTION,
-                llm=google.beta.realtime.RealtimeModel(
-                    model="models/gemini-2.0-flash-live-001",
-                    voice="Aoede"
-                ),
-                tools=[search_web, diagnose_car_issue],
+                instructions=self.instructions,
+                llm=llm if llm is not None else build_realtime_model(voice="Aoede"),
+                tools=list(self.tools),
                 chat_ctx=chat_ctx
             )
         else:
             self._agent = None
 
-    async def alert_driver(self) -> None:
-        """Speak a firm wake-up warning when drowsiness detected."""
-        print("🚨 Hadi: Drowsiness detected! Speaking alert...")
+    async def alert_driver(self, clip_played: bool = False) -> None:
+        """Speak a firm wake-up warning when drowsiness detected.
+
+        `clip_played` means the caller already queued the cached wake-up clip.
+        """
+        logging.info("🚨 Hadi: Drowsiness detected! Speaking alert...")
         try:
             if HAS_LIVEKIT and self.session:
-                await self.session.generate_reply(
-                    instructions="Ayan! You're losing focus. Keep your eyes open and stay alert!"
-                )
-                print("🔊 Hadi: Voice alert sent via LiveKit")
+                # Canned audio goes out immediately; the model follows up once it is ready
+                if clip_played or (self.alert_audio and self.alert_audio.play(self.session, "hadi_wake")):
+                    await self.session.generate_reply(
+                        instructions="You just told Ayan to stay alert. Firmly add: pull over safely if too tired to drive."
+                    )
+                else:
+                    await self.session.generate_reply(
+                        instructions="Ayan! You're losing focus. Keep your eyes open and stay alert!"
+                    )
+                logging.info("🔊 Hadi: Voice alert sent via LiveKit")
             else:
                 print("🚨 Hadi: AYAN! YOU'RE LOSING FOCUS. KEEP YOUR EYES OPEN AND STAY ALERT!")
                 print("💬 Hadi: Please pull over safely if you're too tired to drive.")
         except Exception as e:
-            print(f"⚠️ Hadi alert failed: {e}")
+            logging.warning("⚠️ Hadi alert failed: %s", e)
             print("🚨 Hadi: AYAN! WAKE UP! PULL OVER SAFELY!")
 
 # -------------------------------------------------------------------
@@ -115,57 +115,43 @@ async def entrypoint(ctx) -> None:
         print("❌ LiveKit not installed. Run: pip install livekit-agents mem0ai python-dotenv")
         return
 
-    async def shutdown_hook(chat_ctx: ChatContext, mem0: AsyncMemoryClient, memory_str: str):
-        """Save memory context on graceful shutdown."""
-        logging.info("HADI: Initiating shutdown, saving context...")
-        messages_formatted = []
-        for item in getattr(chat_ctx, "items", []):
-            role = getattr(item, "role", None)
-            content = getattr(item, "content", None)
-            if not role or not content:
-                continue
-            content_str = "".join(str(c) for c in content) if isinstance(content, list) else str(content)
-            if memory_str and memory_str in content_str:
-                continue
-            if role in ["user", "assistant"]:
-                messages_formatted.append({"role": role, "content": content_str.strip()})
-        if messages_formatted:
-            await mem0.add(messages_formatted, user_id="Ayan")
-            logging.info(f"HADI: Saved {len(messages_formatted)} memory entries.")
-        else:
-            logging.info("HADI: No new memory to save.")
-
     # -------------------------------------------------------------
-    # SETUP
+    # STARTUP: room connect runs alongside memory load + agent build
     # -------------------------------------------------------------
+    timer = StartupTimer("HADI")
     session = AgentSession()
-    mem0 = AsyncMemoryClient()
+    memory_client = get_memory_client()
     user_name = "Ayan"
     initial_ctx = ChatContext()
-    memory_str = ""
-
-    # Load memory
-    results = await mem0.get_all(user_id=user_name)
-    if results:
-        memories = [{"memory": r["memory"], "updated_at": r["updated_at"]} for r in results]
-        memory_str = json.dumps(memories, indent=2)
-        initial_ctx.add_message(
-            role="assistant",
-            content=f"User is {user_name}. Prior context: {memory_str}"
+    skip_ids = []  # the injected memory summary is not itself a memory
+
+    async def load_memory() -> None:
+        results = await memory_client.search(
+            f"{user_name}'s car, vehicle issues, driving habits, routes and places", user_id=user_name, top_k=MEMORY_TOP_K
         )
-        logging.info("HADI: Loaded previous memories.")
-    else:
-        logging.info("HADI: Starting with fresh context.")
+        memory_str, stats = build_memory_context(results or [], user_name, heading="Prior context")
+        if memory_str:
+            message = initial_ctx.add_message(role="assistant", content=memory_str)
+            skip_ids.append(getattr(message, "id", None))
+            logging.info(f"HADI: Loaded previous memories {stats}.")
+        else:
+            logging.info("HADI: Starting with fresh context.")
 
-    # Create Hadi
-    agent = HadiAgent(chat_ctx=initial_ctx)
-    logging.info("✅ HADI initialized with Gemini 2.0 Flash Realtime model (voice: Aoede ).")
+    async def build_agent() -> HadiAgent:
+        # The agent copies its chat context, so it is built once memories are in
+        await timer.phase("memory", load_memory())
+        with timer.measure("agent"):
+            agent = HadiAgent(chat_ctx=initial_ctx, llm=prewarmed(ctx, "realtime_model"))
+        logging.info("✅ HADI initialized with Gemini 2.0 Flash Realtime model (voice: Aoede ).")
+        return agent
+
+    agent, _ = await asyncio.gather(build_agent(), timer.phase("connect", ctx.connect()))
 
     # -------------------------------------------------------------
     # START LIVEKIT SESSION
     # -------------------------------------------------------------
-    await ctx.connect()
-    await session.start(
+    _, noise_cancellation = load_plugins()
+    await timer.phase("session", session.start(
         room=ctx.room,
         agent=agent._agent if agent._agent else agent,
         room_input_options=RoomInputOptions(
@@ -173,23 +159,35 @@ async def entrypoint(ctx) -> None:
             video_enabled=True,
             noise_cancellation=noise_cancellation.BVC() if HAS_LIVEKIT else None
         ),
-    )
+    ))
+    session_started(ctx, fallback_start=time.time() - timer.elapsed())
 
     # First reply on connection
-    await session.generate_reply(instructions=SESSION_INSTRUCTION_HADI)
+    await timer.phase("greeting", session.generate_reply(instructions=SESSION_INSTRUCTION_HADI))
     logging.info("🎯 HADI ready for interaction.")
+    timer.log()
 
     # Store session for runtime use (like drowsiness alert)
     agent.session = session
 
-    ctx.add_shutdown_callback(lambda: asyncio.create_task(shutdown_hook(agent.chat_ctx or initial_ctx, mem0, memory_str)))
+    # Turns are saved in small batches as the conversation goes; shutdown only flushes the tail
+    memory_writer = MemoryWriter(
+        memory_client, user_name,
+        get_items=lambda: getattr(agent._agent.chat_ctx if agent._agent else initial_ctx, "items", []),
+        skip_ids=skip_ids,
+        name="HADI",
+    )
+    memory_writer.start()
+    ctx.add_shutdown_callback(memory_writer.aclose)
+    ctx.add_shutdown_callback(http.aclose)
 
 # -------------------------------------------------------------------
 # MAIN
 # -------------------------------------------------------------------
 if __name__ == "__main__":
     if HAS_LIVEKIT and agents and hasattr(agents, "cli"):
-        agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
+        load_plugins()  # register plugins in the main process for `download-files`
+        agents.cli.run_app(worker_options(entrypoint))
     else:
         print("Cannot run — LiveKit agents unavailable.")
         print("Install dependencies: pip install livekit-agents mem0ai python-dotenv")
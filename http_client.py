@@ -0,0 +1,108 @@
+# http_client.py - Shared pooled async HTTP client for all outbound API calls
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401  # type: ignore
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Defaults (overridable through the environment)
+# -------------------------------------------------------------------
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.0"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "8.0"))
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "64"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE", "32"))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "8"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60.0"))
+
+
+class SharedHttpClient:
+    """
+    Process-wide keep-alive HTTP client.
+
+    One `httpx.AsyncClient` is created lazily on first use and reused for every
+    outbound call (wttr.in, YouTube, Places, Directions), so DNS, TCP and TLS
+    setup is paid once per host instead of once per request. httpx only caps
+    connections globally, so a semaphore per host keeps one slow upstream from
+    holding the whole pool.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        max_connections: int = MAX_CONNECTIONS,
+        max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+        max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+        keepalive_expiry: float = KEEPALIVE_EXPIRY,
+        http2: bool = HAS_HTTP2,
+    ):
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_connections_per_host = max_connections_per_host
+        self.http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The underlying client, (re)created if missing, closed or bound to another loop."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=self.limits,
+                follow_redirects=True,
+            )
+            self._loop = loop
+            self._host_slots = {}
+            logger.debug(f"Created shared HTTP client (http2={self.http2})")
+        return self._client
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_slots[host] = slot
+        return slot
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        client = self.client
+        async with self._host_slot(url):
+            return await client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        """Close pooled connections. Safe to call more than once."""
+        client, self._client = self._client, None
+        self._host_slots = {}
+        if client is not None and not client.is_closed:
+            await client.aclose()
+            logger.debug("Closed shared HTTP client")
+
+
+# Process-wide instance shared by tools.py and connectivity_manager.py
+http = SharedHttpClient()
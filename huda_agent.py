@@ -1,8 +1,8 @@
 # huda_agent.py — Emotional AI Co-Driver (Companion Agent)
 
 import os
-import json
 import logging
+import time
 import asyncio
 from typing import Optional
 
@@ -19,7 +19,6 @@ HAS_LIVEKIT = False
 try:
     from livekit import agents  # type: ignore
     from livekit.agents import AgentSession, Agent, RoomInputOptions, ChatContext  # type: ignore
-    from livekit.plugins import noise_cancellation, google  # type: ignore
     HAS_LIVEKIT = True
 except ImportError:
     print("LiveKit not installed. Run: pip install livekit-agents")
@@ -35,35 +34,27 @@ except ImportError:
         def add_message(self, **kwargs): pass
     class RoomInputOptions:
         def __init__(self, **kwargs): pass
-    class google:
-        class beta:
-            class realtime:
-                @staticmethod
-                def RealtimeModel(**kwargs): return None
-    class noise_cancellation:
-        @staticmethod
-        def BVC(**kwargs): return None
-
-# Memory imports
-try:
-    from mem0 import AsyncMemoryClient  # type: ignore
-except ImportError:
-    print("mem0 not installed. Run: pip install mem0ai")
-    class AsyncMemoryClient:
-        async def get_all(self, **kwargs): return []
-        async def add(self, **kwargs): pass
 
 # -------------------------------------------------------------------
 # LOCAL IMPORTS
 # -------------------------------------------------------------------
 from huda_prompt import HUDA_INSTRUCTION, SESSION_INSTRUCTION_HUDA
-from tools import get_weather, search_web, send_email
+from http_client import http
+from lazy_plugins import build_realtime_model, load_plugins
+from local_memory import MEMORY_TOP_K, get_memory_client
+from log_setup import setup_logging
+from mail_queue import shutdown_mail_queue
+from memory_context import build_memory_context
+from memory_writer import MemoryWriter
+from startup_timing import StartupTimer
+from tools import get_weather, search_web, send_email, check_email_status
+from worker import prewarmed, session_started, worker_options
 
 # -------------------------------------------------------------------
 # SETUP
 # -------------------------------------------------------------------
 load_dotenv(override=True)
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+setup_logging()
 
 # -------------------------------------------------------------------
 # CLASS: HudaAgent
@@ -71,45 +62,76 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 class HudaAgent:
     """HUDA — Emotional AI Co-Driver and Conversational Companion."""
 
-    def __init__(self, chat_ctx: Optional[ChatContext] = None) -> None:
+    # Persona, reused when a shared session switches to Huda
+    instructions = HUDA_INSTRUCTION
+    tools = [get_weather, search_web, send_email, check_email_status]
+
+    def __init__(self, chat_ctx: Optional[ChatContext] = None, connectivity=None, llm=None) -> None:
         self.session: Optional[AgentSession] = None
         self.chat_ctx = chat_ctx
+        # ConnectivityManager; places and the car position reported to the API server reach it via the shared cache
+        self.connectivity = connectivity
+        # AlertAudioCache with the pre-rendered wellbeing opener, set by the co-pilot entrypoint
+        self.alert_audio = None
 
         if HAS_LIVEKIT:
             logging.info("💖 Initializing HudaAgent with Google Realtime voice 'Aoede'")
             self._agent = Agent(
-                instructions=HUDA_INSTRUCTION,
-                llm=google.beta.realtime.RealtimeModel(
-                    model="models/gemini-2.0-flash-live-001",
-                    voice="Aoede"  # ✅ Supported female voice for emotional tone
-                ),
-                tools=[get_weather, search_web, send_email],
+                instructions=self.instructions,
+                # ✅ Supported female voice for emotional tone
+                llm=llm if llm is not None else build_realtime_model(voice="Aoede"),
+                tools=list(self.tools),
                 chat_ctx=chat_ctx
             )
         else:
             self._agent = None
 
+    async def _nearby_stop_hint(self) -> str:
+        """Cached rest stop near the car's last reported position (no network), or an empty string."""
+        if not self.connectivity:
+            return ""
+        try:
+            stop = await self.connectivity.nearest_cached_stop()
+        except Exception as e:
+            logging.warning(f"Rest stop lookup failed: {e}")
+            return ""
+        if not stop:
+            return ""
+        return f"{stop['name']} is {stop['distance']} away"
+
     async def check_wellbeing(self) -> None:
         """Speak empathetic follow-up after Hadi’s alert."""
-        print("💬 Huda: Initiating wellbeing check...")
+        logging.info("💬 Huda: Initiating wellbeing check...")
+        stop_hint = await self._nearby_stop_hint()
         try:
             if HAS_LIVEKIT and self.session:
+                rest_offer = (
+                    f"Suggest a short break: {stop_hint}. "
+                    if stop_hint else
+                    "I can also find nearby rest stops or cafes where you can take a short break."
+                )
+                # Canned opener plays immediately; the model continues with the offers
+                opened = bool(self.alert_audio and self.alert_audio.play(self.session, "huda_wellbeing"))
                 await self.session.generate_reply(
                     instructions=(
-                        "Hey Ayan! You seem tired. Let me help you feel better. "
-                        "Would you like me to play some relaxing music? "
+                        ("You just told Ayan they seem tired; continue from there. " if opened else
+                         "Hey Ayan! You seem tired. Let me help you feel better. ")
+                        + "Would you like me to play some relaxing music? "
                         "Are you hungry or thirsty — should I suggest some snacks or drinks? "
-                        "I can also find nearby rest stops or cafes where you can take a short break."
+                        + rest_offer
                     )
                 )
-                print("🔊 Huda: Wellbeing conversation sent via LiveKit")
+                logging.info("🔊 Huda: Wellbeing conversation sent via LiveKit")
             else:
                 print("💖 Huda: Hey Ayan! You seem tired. Let me help you feel better.")
                 print("🎵 Huda: Would you like me to suggest some relaxing music?")
                 print("🍿 Huda: Are you hungry or thirsty? I can suggest snacks or drinks.")
-                print("🗺️ Huda: I can also find nearby rest stops or cafes for a break.")
+                if stop_hint:
+                    print(f"🗺️ Huda: How about a short break? {stop_hint}.")
+                else:
+                    print("🗺️ Huda: I can also find nearby rest stops or cafes for a break.")
         except Exception as e:
-            print(f"⚠️ Huda wellbeing conversation failed: {e}")
+            logging.warning("⚠️ Huda wellbeing conversation failed: %s", e)
             print("💖 Huda: Please take care of yourself and rest when needed.")
 
 # -------------------------------------------------------------------
@@ -121,56 +143,39 @@ async def entrypoint(ctx) -> None:
         print("❌ LiveKit not installed. Run: pip install livekit-agents mem0ai python-dotenv")
         return
 
-    async def shutdown_hook(chat_ctx: ChatContext, mem0: AsyncMemoryClient, memory_str: str):
-        """Persist emotional memory context before shutdown."""
-        logging.info("🩷 HUDA: Saving emotional context before shutdown...")
-        messages_formatted = []
-        for item in getattr(chat_ctx, "items", []):
-            role = getattr(item, "role", None)
-            content = getattr(item, "content", None)
-            if not role or not content:
-                continue
-            content_str = "".join(str(c) for c in content) if isinstance(content, list) else str(content)
-            if memory_str and memory_str in content_str:
-                continue
-            if role in ["user", "assistant"]:
-                messages_formatted.append({"role": role, "content": content_str.strip()})
-        if messages_formatted:
-            await mem0.add(messages_formatted, user_id="Ayan")
-            logging.info(f"💾 HUDA: {len(messages_formatted)} emotional memories saved.")
-        else:
-            logging.info("ℹ️ HUDA: No new emotional data to save.")
-
     # -------------------------------------------------------------
-    # MEMORY INIT
+    # STARTUP: room connect runs alongside memory load + agent build
     # -------------------------------------------------------------
-    mem0 = AsyncMemoryClient()
+    timer = StartupTimer("HUDA")
+    memory_client = get_memory_client()
     user_name = "Ayan"
     initial_ctx = ChatContext()
-    memory_str = ""
-
-    results = await mem0.get_all(user_id=user_name)
-    if results:
-        memories = [{"memory": r["memory"], "updated_at": r["updated_at"]} for r in results]
-        memory_str = json.dumps(memories, indent=2)
-        initial_ctx.add_message(
-            role="assistant",
-            content=f"User is {user_name}. Emotional and contextual history: {memory_str}"
+    skip_ids = []  # the injected memory summary is not itself a memory
+
+    async def load_memory() -> None:
+        results = await memory_client.search(
+            f"how {user_name} feels, mood, music, family, friends and personal preferences", user_id=user_name, top_k=MEMORY_TOP_K
         )
-        logging.info("🩶 HUDA: Loaded previous emotional memory context.")
-    else:
-        logging.info("💬 HUDA: No prior emotional history found. Starting new context.")
+        memory_str, stats = build_memory_context(results or [], user_name, heading="Emotional and contextual history")
+        if memory_str:
+            message = initial_ctx.add_message(role="assistant", content=memory_str)
+            skip_ids.append(getattr(message, "id", None))
+            logging.info(f"🩶 HUDA: Loaded previous emotional memory context {stats}.")
+        else:
+            logging.info("💬 HUDA: No prior emotional history found. Starting new context.")
 
-    # -------------------------------------------------------------
-    # INITIALIZE AGENT + SESSION
-    # -------------------------------------------------------------
-    agent = HudaAgent(chat_ctx=initial_ctx)
-    session = AgentSession()
+    async def build_agent() -> HudaAgent:
+        # The agent copies its chat context, so it is built once memories are in
+        await timer.phase("memory", load_memory())
+        with timer.measure("agent"):
+            return HudaAgent(chat_ctx=initial_ctx, llm=prewarmed(ctx, "realtime_model"))
 
-    await ctx.connect()
+    agent, _ = await asyncio.gather(build_agent(), timer.phase("connect", ctx.connect()))
+    session = AgentSession()
+    _, noise_cancellation = load_plugins()
     logging.info("🎙️ Starting LiveKit session for HUDA (voice active)...")
 
-    await session.start(
+    await timer.phase("session", session.start(
         room=ctx.room,
         agent=agent._agent if HAS_LIVEKIT and agent._agent else agent,
         room_input_options=RoomInputOptions(
@@ -178,7 +183,8 @@ async def entrypoint(ctx) -> None:
             video_enabled=True,
             noise_cancellation=noise_cancellation.BVC()
         ),
-    )
+    ))
+    session_started(ctx, fallback_start=time.time() - timer.elapsed())
 
     # Store session reference
     agent.session = session
@@ -188,22 +194,34 @@ async def entrypoint(ctx) -> None:
     # -------------------------------------------------------------
     try:
         logging.info("🧠 Generating initial emotional greeting from HUDA...")
-        await session.generate_reply(instructions=SESSION_INSTRUCTION_HUDA)
+        await timer.phase("greeting", session.generate_reply(instructions=SESSION_INSTRUCTION_HUDA))
     except Exception as e:
         logging.error(f"❌ HUDA failed to generate greeting: {e}")
+    timer.log()
 
     # -------------------------------------------------------------
     # SHUTDOWN HANDLER
     # -------------------------------------------------------------
-    ctx.add_shutdown_callback(lambda: asyncio.create_task(shutdown_hook(agent.chat_ctx or initial_ctx, mem0, memory_str)))
+    # Turns are saved in small batches as the conversation goes; shutdown only flushes the tail
+    memory_writer = MemoryWriter(
+        memory_client, user_name,
+        get_items=lambda: getattr(agent._agent.chat_ctx if agent._agent else initial_ctx, "items", []),
+        skip_ids=skip_ids,
+        name="HUDA",
+    )
+    memory_writer.start()
+    ctx.add_shutdown_callback(memory_writer.aclose)
+    ctx.add_shutdown_callback(http.aclose)
+    ctx.add_shutdown_callback(shutdown_mail_queue)
 
 # -------------------------------------------------------------------
 # MAIN
 # -------------------------------------------------------------------
 if __name__ == "__main__":
     if HAS_LIVEKIT and agents and hasattr(agents, "cli"):
+        load_plugins()  # register plugins in the main process for `download-files`
         logging.info("💖 Starting HUDA Emotional AI Co-Pilot Agent...")
-        agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
+        agents.cli.run_app(worker_options(entrypoint))
     else:
         print("❌ Cannot run — LiveKit agents unavailable.")
         print("Install dependencies: pip install livekit-agents mem0ai python-dotenv")
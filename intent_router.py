@@ -0,0 +1,138 @@
+# intent_router.py - Precompiled keyword router deciding which agent handles an utterance
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Phrase -> weight per agent. Matched on whole words, so "hi" never fires
+# inside "this"/"highway" and "map" never fires inside "amplifier".
+DEFAULT_INTENTS: Dict[str, Dict[str, float]] = {
+    "HADI": {
+        "engine": 2.0, "fuel": 2.0, "gas": 1.5, "temperature": 1.5, "overheating": 2.0,
+        "route": 2.0, "routes": 2.0, "map": 2.0, "maps": 2.0, "location": 1.5,
+        "directions": 2.0, "navigate": 2.0, "navigation": 2.0, "traffic": 1.5,
+        "battery": 2.0, "speed": 1.5, "system": 1.0, "diagnostic": 2.0, "diagnostics": 2.0,
+        "pressure": 1.5, "check engine": 3.0, "sensor": 1.5, "sensors": 1.5, "status": 1.0,
+        "data": 1.0, "report": 1.0, "drive": 1.0, "driving": 1.0, "tire": 2.0, "tires": 2.0,
+        "tyre": 2.0, "tyres": 2.0, "oil": 2.0, "brake": 2.0, "brakes": 2.0, "mileage": 1.5,
+        "rest stop": 1.5, "gas station": 2.0, "warning light": 2.5,
+    },
+    "HUDA": {
+        "hi": 1.0, "hello": 1.0, "hey": 1.0, "how are you": 2.0, "tired": 2.0, "sleepy": 2.0,
+        "music": 2.0, "song": 2.0, "songs": 2.0, "play": 1.0, "mood": 2.0, "talk": 1.5,
+        "relax": 2.0, "funny": 1.5, "joke": 2.0, "jokes": 2.0, "story": 2.0, "who are you": 2.0,
+        "who is hadi": 2.5, "friend": 1.5, "laugh": 1.5, "good morning": 1.5, "good night": 1.5,
+        "lonely": 2.0, "bored": 2.0, "sad": 2.0, "stressed": 2.0, "feel": 1.0, "feeling": 1.0,
+        "weather": 1.5, "email": 1.5, "remember": 1.0,
+    },
+}
+
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+class IntentRouter:
+    """
+    Routes text to an agent by summing per-agent phrase weights.
+
+    Text is tokenised once and every 1..n word window is looked up in a
+    phrase -> (agent, weight) dict, so phrases only match whole words and
+    routing cost depends on utterance length, not on how many intents are
+    registered. When nothing matches, an optional HashedLinearClassifier gets
+    a say; otherwise `route` returns None and the caller keeps the current agent.
+    """
+
+    def __init__(
+        self,
+        intents: Optional[Dict[str, Dict[str, float]]] = None,
+        classifier: Optional["HashedLinearClassifier"] = None,
+        min_confidence: float = 0.6,
+    ):
+        intents = intents if intents is not None else DEFAULT_INTENTS
+        self.agents: List[str] = list(intents)
+        self.classifier = classifier
+        self.min_confidence = min_confidence
+        self._weights: Dict[str, Tuple[int, float]] = {}
+        self._max_words = 0
+        for index, agent in enumerate(self.agents):
+            for phrase, weight in intents[agent].items():
+                words = tokenize(phrase)
+                self._weights[" ".join(words)] = (index, weight)
+                self._max_words = max(self._max_words, len(words))
+
+    def _hits(self, text: str) -> Dict[int, float]:
+        totals: Dict[int, float] = {}
+        words = tokenize(text)
+        lookup = self._weights.get
+        for n in range(1, self._max_words + 1):
+            for i in range(len(words) - n + 1):
+                hit = lookup(words[i] if n == 1 else " ".join(words[i:i + n]))
+                if hit is not None:
+                    totals[hit[0]] = totals.get(hit[0], 0.0) + hit[1]
+        return totals
+
+    def scores(self, text: str) -> Dict[str, float]:
+        hits = self._hits(text)
+        return {agent: hits.get(index, 0.0) for index, agent in enumerate(self.agents)}
+
+    def route(self, text: str) -> Optional[str]:
+        """Best agent for `text`, or None if nothing points anywhere. Ties go to the first agent."""
+        hits = self._hits(text)
+        if hits:
+            best = min(hits, key=lambda index: (-hits[index], index))
+            return self.agents[best]
+        if self.classifier is not None:
+            label, confidence = self.classifier.predict(text)
+            if confidence >= self.min_confidence:
+                return label
+        return None
+
+
+# -------------------------------------------------------------------
+# Optional fallback: linear classifier over hashed word features
+# -------------------------------------------------------------------
+
+class HashedLinearClassifier:
+    """
+    Multinomial logistic regression over hashed unigrams and bigrams.
+
+    Features are hashed with crc32 into `n_features` buckets (stable across
+    processes, unlike `hash`), so there is no vocabulary to keep and
+    prediction is a sparse row lookup plus a sum in NumPy.
+    """
+
+    def __init__(self, labels: Sequence[str], n_features: int = 1 << 12):
+        self.labels = list(labels)
+        self.n_features = n_features
+        self.weights = np.zeros((n_features, len(self.labels)))
+        self.bias = np.zeros(len(self.labels))
+
+    def features(self, text: str) -> np.ndarray:
+        words = tokenize(text)
+        grams = words + [a + " " + b for a, b in zip(words, words[1:])]
+        return np.fromiter((zlib.crc32(g.encode()) % self.n_features for g in grams), dtype=np.int64, count=len(grams))
+
+    def _probabilities(self, idx: np.ndarray) -> np.ndarray:
+        logits = self.weights[idx].sum(axis=0) + self.bias
+        exp = np.exp(logits - logits.max())
+        return exp / exp.sum()
+
+    def fit(self, texts: Iterable[str], labels: Iterable[str], epochs: int = 20, lr: float = 0.5) -> "HashedLinearClassifier":
+        samples = [(self.features(t), self.labels.index(l)) for t, l in zip(texts, labels)]
+        for _ in range(epochs):
+            for idx, target in samples:
+                grad = self._probabilities(idx)
+                grad[target] -= 1.0
+                np.subtract.at(self.weights, idx, lr * grad)
+                self.bias -= lr * grad
+        return self
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        probs = self._probabilities(self.features(text))
+        best = int(probs.argmax())
+        return self.labels[best], float(probs[best])
@@ -0,0 +1,44 @@
+# lazy_plugins.py - On-demand loading of heavy LiveKit plugins
+#
+# `livekit.plugins.google` pulls in the whole Gemini SDK and dominates import
+# time of the agent modules. Job processes are spawned often, so the plugins
+# are resolved the first time an agent is built instead of at module load.
+# LiveKit requires plugins to be registered on the main thread: call these
+# from agent construction / entrypoints, or eagerly before `cli.run_app` so
+# `download-files` still sees them.
+from typing import Any, Tuple
+
+_plugins: Tuple[Any, Any] = ()
+
+
+class _FallbackGoogle:
+    class beta:
+        class realtime:
+            @staticmethod
+            def RealtimeModel(**kwargs): return None
+
+
+class _FallbackNoiseCancellation:
+    @staticmethod
+    def BVC(**kwargs): return None
+
+
+def load_plugins() -> Tuple[Any, Any]:
+    """Return `(google, noise_cancellation)`, importing them on first call."""
+    global _plugins
+    if not _plugins:
+        try:
+            from livekit.plugins import google, noise_cancellation  # type: ignore
+            _plugins = (google, noise_cancellation)
+        except ImportError:
+            _plugins = (_FallbackGoogle, _FallbackNoiseCancellation)
+    return _plugins
+
+
+REALTIME_MODEL = "models/gemini-2.0-flash-live-001"
+
+
+def build_realtime_model(voice: str = "Aoede") -> Any:
+    """Gemini realtime model; share one instance between agents that can share it."""
+    google, _ = load_plugins()
+    return google.beta.realtime.RealtimeModel(model=REALTIME_MODEL, voice=voice)
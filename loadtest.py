@@ -0,0 +1,415 @@
+# loadtest.py - Load generator for api_server / simple_api_server: simulated dashboards, REST traffic and injected drowsiness, against local stub upstreams
+#
+#   python loadtest.py run --spawn api_server:app --clients 200 --duration 30
+#   python loadtest.py run --spawn simple_api_server:app --rest-rate 100
+#   python loadtest.py run --url http://127.0.0.1:8000 --no-stub     # a server you started yourself
+#   python loadtest.py stub --port 8766 --latency 0.05                # stub upstreams only
+#
+# --spawn starts the server with MONITOR_SOURCE=synthetic, ENABLE_TEST_ENDPOINTS=1,
+# stub API keys and YOUTUBE_API_BASE_URL / MAPS_API_BASE_URL pointing at the stub,
+# so nothing leaves the machine and no camera is needed.
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Optional
+
+import httpx
+
+from ws_codec import negotiate
+
+UTTERANCES = [
+    "What's the engine temperature?",
+    "Find me a gas station nearby",
+    "Play some relaxing music",
+    "I'm feeling a bit tired",
+    "How's the weather in Boston?",
+    "Okay",
+]
+
+DEFAULT_REST_PATHS = [
+    "/api/maps/nearby?type=gas_station&lat={lat}&lng={lng}",
+    "/api/youtube/search?query={query}",
+    "/api/status",
+]
+
+
+# ---------- results ----------
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class Stats:
+    """Latencies, errors and plain counters per operation name."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.counts: Counter = Counter()
+
+    def record(self, name: str, seconds: float) -> None:
+        self.latencies[name].append(seconds)
+
+    def error(self, name: str, reason: str) -> None:
+        self.errors[name][reason] += 1
+
+    def report(self, elapsed: float) -> str:
+        lines = [f"{'operation':<34}{'ok':>8}{'ok/s':>9}{'err':>7}{'err%':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"]
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies.get(name, [])
+            errors = sum(self.errors[name].values()) if name in self.errors else 0
+            total = len(values) + errors
+            lines.append(
+                f"{name:<34}{len(values):>8}{len(values) / elapsed:>9.1f}{errors:>7}"
+                f"{(100 * errors / total if total else 0):>6.1f}%"
+                + "".join(f"{percentile(values, p) * 1000:>9.1f}" for p in (50, 95, 99))
+                + f"{max(values, default=0) * 1000:>9.1f}"
+            )
+        for name, reasons in sorted(self.errors.items()):
+            for reason, count in reasons.most_common(3):
+                lines.append(f"  {name}: {count} x {reason}")
+        if self.counts:
+            lines.append("")
+            lines.extend(f"{name:<34}{count:>8}" for name, count in sorted(self.counts.items()))
+        return "\n".join(lines)
+
+
+# ---------- simulated clients ----------
+async def ws_client(url: str, stats: Stats, stop: asyncio.Event, message_rate: float,
+                    rng: random.Random, encoding: str, response_timeout: float = 5.0) -> None:
+    """One dashboard: keeps the event stream open and sends user messages as a Poisson process."""
+    import websockets
+
+    codec = negotiate(encoding)
+    pending: deque = deque()
+    connected = False
+    start = time.perf_counter()
+    try:
+        separator = "&" if "?" in url else "?"
+        async with websockets.connect(f"{url}{separator}encoding={codec.name}", max_size=None, open_timeout=10) as ws:
+            stats.record("ws_connect", time.perf_counter() - start)
+            stats.counts["ws_connected"] += 1
+            connected = True
+
+            async def reader():
+                async for raw in ws:
+                    frame = codec.decode(raw)
+                    events = frame["events"] if frame.get("type") == "batch" else [frame]
+                    stats.counts["ws_frames"] += 1
+                    for event in events:
+                        kind = event.get("type")
+                        stats.counts[f"ws_events_{kind}"] += 1
+                        if kind == "agent_response" and pending:
+                            stats.record("ws_user_message", time.perf_counter() - pending.popleft())
+
+            read_task = asyncio.create_task(reader())
+            try:
+                while not stop.is_set() and not read_task.done():
+                    if message_rate > 0:
+                        try:
+                            await asyncio.wait_for(stop.wait(), rng.expovariate(message_rate))
+                            break
+                        except asyncio.TimeoutError:
+                            pass
+                        pending.append(time.perf_counter())
+                        await ws.send(codec.encode({"type": "user_message", "text": rng.choice(UTTERANCES)}))
+                    else:
+                        await asyncio.wait([read_task, asyncio.create_task(stop.wait())],
+                                           return_when=asyncio.FIRST_COMPLETED)
+                if read_task.done() and not stop.is_set():
+                    stats.error("ws_session", "closed by server")
+            finally:
+                read_task.cancel()
+    except Exception as e:
+        stats.error("ws_session" if connected else "ws_connect", type(e).__name__)
+    now = time.perf_counter()
+    for sent in pending:
+        if now - sent > response_timeout:
+            stats.error("ws_user_message", "no response")
+
+
+async def open_loop(rate: float, stop: asyncio.Event, rng: random.Random, make_request) -> None:
+    """Start requests at Poisson arrival times regardless of how long earlier ones take."""
+    tasks = set()
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), rng.expovariate(rate))
+            break
+        except asyncio.TimeoutError:
+            pass
+        task = asyncio.create_task(make_request())
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.wait(tasks, timeout=10)
+
+
+async def timed_request(client: httpx.AsyncClient, stats: Stats, name: str, method: str, path: str) -> None:
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, path)
+    except Exception as e:
+        stats.error(name, type(e).__name__)
+        return
+    if response.status_code >= 400:
+        stats.error(name, f"HTTP {response.status_code}")
+    else:
+        stats.record(name, time.perf_counter() - start)
+
+
+def fill_path(template: str, rng: random.Random, spread: float) -> str:
+    return template.format(
+        lat=round(40.7128 + rng.uniform(-spread, spread), 5),
+        lng=round(-74.0060 + rng.uniform(-spread, spread), 5),
+        query=rng.choice(["focus", "lofi", "road trip", "jazz", "podcast"]).replace(" ", "+"),
+    )
+
+
+async def usable_paths(client: httpx.AsyncClient, templates: List[str], rng: random.Random, spread: float) -> List[str]:
+    """Drop endpoints this server does not have (e.g. /api/youtube/search on api_server)."""
+    usable = []
+    for template in templates:
+        try:
+            response = await client.get(fill_path(template, rng, spread))
+        except Exception as e:
+            print(f"skipping {template}: {type(e).__name__}")
+            continue
+        if response.status_code in (404, 405):
+            print(f"skipping {template}: HTTP {response.status_code}")
+        else:
+            usable.append(template)
+    return usable
+
+
+# ---------- stub upstreams ----------
+def stub_app(latency: float = 0.05, error_rate: float = 0.0, seed: int = 0):
+    """YouTube Data, Places and Directions lookalikes with exponential latency and random 503s."""
+    from fastapi import FastAPI, HTTPException
+
+    app = FastAPI(title="Hadi-Huda stub upstreams")
+    rng = random.Random(seed)
+
+    async def behave():
+        if latency > 0:
+            await asyncio.sleep(rng.expovariate(1 / latency))
+        if rng.random() < error_rate:
+            raise HTTPException(status_code=503, detail="stub outage")
+
+    @app.get("/youtube/v3/search")
+    async def youtube(q: str = "", maxResults: int = 5):
+        await behave()
+        return {"items": [
+            {"id": {"videoId": f"stub{i:04d}"},
+             "snippet": {"title": f"{q} #{i}", "thumbnails": {"default": {"url": ""}}}}
+            for i in range(maxResults)
+        ]}
+
+    @app.get("/maps/api/place/nearbysearch/json")
+    async def places(location: str = "0,0", type: str = "", keyword: str = ""):
+        await behave()
+        lat, lng = (float(v) for v in location.split(","))
+        return {"status": "OK", "results": [
+            {"place_id": f"stub-{type or keyword}-{i}", "name": f"Stub {type or keyword} {i}", "rating": 4.0,
+             "vicinity": "Stub Rd", "geometry": {"location": {"lat": lat + i * 0.001, "lng": lng - i * 0.001}}}
+            for i in range(5)
+        ]}
+
+    @app.get("/maps/api/directions/json")
+    async def directions(origin: str = "", destination: str = ""):
+        await behave()
+        return {"status": "OK", "routes": [{
+            "legs": [{"distance": {"text": "12 mi"}, "duration": {"text": "18 mins"},
+                      "steps": [{"html_instructions": f"Head from {origin} to {destination}"}],
+                      "start_location": {"lat": 40.7128, "lng": -74.0060}}],
+            "overview_polyline": {"points": ""},
+        }]}
+
+    return app
+
+
+def run_stub(port: int, latency: float, error_rate: float) -> None:
+    import uvicorn
+
+    uvicorn.run(stub_app(latency, error_rate), host="127.0.0.1", port=port, log_level="warning")
+
+
+# ---------- processes ----------
+def spawn(args: List[str], env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], env={**os.environ, **(env or {})},
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+async def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.get(url, timeout=1.0)
+                return
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+                await asyncio.sleep(0.2)
+
+
+async def server_counters(client: httpx.AsyncClient) -> List[str]:
+    """A few server-side counters from /metrics, when the server exposes them."""
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return []
+    if response.status_code != 200:
+        return []
+    wanted = ("ws_dropped_messages_total", "ws_slow_disconnects_total", "upstream_rejected_total")
+    return [line for line in response.text.splitlines() if line.startswith(wanted)]
+
+
+# ---------- run ----------
+async def run(args: argparse.Namespace) -> int:
+    processes: List[subprocess.Popen] = []
+    base_url = args.url.rstrip("/")
+    try:
+        if not args.no_stub:
+            processes.append(spawn([__file__, "stub", "--port", str(args.stub_port),
+                                    "--latency", str(args.stub_latency), "--error-rate", str(args.stub_error_rate)]))
+            await wait_ready(f"http://127.0.0.1:{args.stub_port}/docs")
+        if args.spawn:
+            stub_url = f"http://127.0.0.1:{args.stub_port}"
+            base_url = f"http://127.0.0.1:{args.port}"
+            processes.append(spawn(
+                ["-m", "uvicorn", args.spawn, "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning"],
+                env={
+                    "MONITOR_SOURCE": "synthetic",
+                    "ENABLE_TEST_ENDPOINTS": "1",
+                    "YOUTUBE_API_KEY": "stub",
+                    "GOOGLE_MAPS_API_KEY": "stub",
+                    "YOUTUBE_API_BASE_URL": stub_url,
+                    "MAPS_API_BASE_URL": stub_url,
+                    "RESPONSE_CACHE_PATH": os.path.join(tempfile.mkdtemp(prefix="loadtest-"), "responses.sqlite3"),
+                },
+            ))
+            await wait_ready(f"{base_url}/api/status")
+        return await drive(args, base_url)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def drive(args: argparse.Namespace, base_url: str) -> int:
+    stats = Stats()
+    stop = asyncio.Event()
+    rng = random.Random(args.seed)
+    ws_url = base_url.replace("http", "ws", 1) + "/ws"
+    limits = httpx.Limits(max_connections=args.max_http_connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=15.0) as client:
+        rest_paths = await usable_paths(client, args.rest or DEFAULT_REST_PATHS, rng, args.spread)
+        can_inject = False
+        if args.inject_rate > 0:
+            probe = await client.post("/api/test/drowsiness", params={"camera": 0, "kind": "huda"})
+            can_inject = probe.status_code != 404
+            if not can_inject:
+                print("drowsiness injection unavailable (start the server with ENABLE_TEST_ENDPOINTS=1)")
+
+        tasks = []
+        for i in range(args.clients):
+            camera = i % args.cameras
+            tasks.append(asyncio.create_task(ws_client(
+                f"{ws_url}?camera={camera}", stats, stop, args.message_rate,
+                random.Random(args.seed + i), args.encoding,
+            )))
+            if args.ramp > 0:
+                await asyncio.sleep(args.ramp / max(args.clients, 1))
+
+        if rest_paths and args.rest_rate > 0:
+            async def rest_request():
+                template = rng.choice(rest_paths)
+                await timed_request(client, stats, f"GET {template.split('?')[0]}", "GET",
+                                    fill_path(template, rng, args.spread))
+            tasks.append(asyncio.create_task(open_loop(args.rest_rate, stop, rng, rest_request)))
+
+        if can_inject:
+            async def inject():
+                camera = rng.randrange(args.cameras)
+                await timed_request(client, stats, "POST /api/test/drowsiness", "POST",
+                                    f"/api/test/drowsiness?camera={camera}&kind=hadi")
+                stats.counts["alerts_injected"] += 1
+            tasks.append(asyncio.create_task(open_loop(args.inject_rate, stop, rng, inject)))
+
+        print(f"driving {base_url}: {args.clients} WebSocket clients, {args.rest_rate}/s REST, "
+              f"{args.inject_rate if can_inject else 0}/s injected alerts for {args.duration:.0f}s")
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.wait(tasks, timeout=15)
+        elapsed = time.perf_counter() - started
+        counters = await server_counters(client)
+
+    print()
+    print(stats.report(elapsed))
+    injected = stats.counts.get("alerts_injected", 0)
+    if injected and args.clients:
+        delivered = stats.counts.get("ws_events_hadi_alert", 0)
+        expected = injected * args.clients / args.cameras
+        print(f"\nalert delivery: {delivered}/{expected:.0f} ({100 * delivered / expected:.1f}%)")
+    if counters:
+        print("\nserver:")
+        print("\n".join(f"  {line}" for line in counters))
+    errors = sum(sum(reasons.values()) for reasons in stats.errors.values())
+    return 1 if errors and args.fail_on_error else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load-test the Hadi-Huda API servers")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    stub = sub.add_parser("stub", help="serve stub YouTube/Places/Directions upstreams")
+    stub.add_argument("--port", type=int, default=8766)
+    stub.add_argument("--latency", type=float, default=0.05, help="mean upstream latency in seconds")
+    stub.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls answered 503")
+
+    run_parser = sub.add_parser("run", help="drive a server with simulated clients")
+    target = run_parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://127.0.0.1:8000", help="server already running")
+    target.add_argument("--spawn", metavar="MODULE:APP", help="start this app with uvicorn, e.g. api_server:app")
+    run_parser.add_argument("--port", type=int, default=8765, help="port for --spawn")
+    run_parser.add_argument("--no-stub", action="store_true", help="do not start stub upstreams")
+    run_parser.add_argument("--stub-port", type=int, default=8766)
+    run_parser.add_argument("--stub-latency", type=float, default=0.05)
+    run_parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    run_parser.add_argument("--clients", type=int, default=50, help="concurrent WebSocket dashboards")
+    run_parser.add_argument("--cameras", type=int, default=1, help="spread clients over this many cameras")
+    run_parser.add_argument("--message-rate", type=float, default=0.5, help="user messages per client per second")
+    run_parser.add_argument("--encoding", default="json", help="WebSocket encoding (json, orjson, msgpack)")
+    run_parser.add_argument("--rest", action="append", metavar="PATH",
+                            help="REST path template ({lat}, {lng}, {query}); repeatable")
+    run_parser.add_argument("--rest-rate", type=float, default=20.0, help="REST requests per second, all paths")
+    run_parser.add_argument("--spread", type=float, default=0.05, help="degrees of random lat/lng around NYC")
+    run_parser.add_argument("--inject-rate", type=float, default=0.2, help="synthetic Hadi alerts per second")
+    run_parser.add_argument("--duration", type=float, default=20.0, help="seconds of steady load")
+    run_parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which clients connect")
+    run_parser.add_argument("--max-http-connections", type=int, default=100)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--fail-on-error", action="store_true", help="exit 1 if any request failed")
+
+    args = parser.parse_args()
+    if args.command == "stub":
+        run_stub(args.port, args.latency, args.error_rate)
+        return 0
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+# local_memory.py - Offline memory store with the get_all/add/search interface of mem0's AsyncMemoryClient
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "memories.sqlite3")
+EMBEDDING_DIM = 512
+
+# Candidate memories fetched for a new session (default 20). memory_context ranks
+# them and keeps what fits MEMORY_TOKEN_BUDGET, so this is a pool size, not the
+# number injected; before the budget existed all 8 hits were injected as-is.
+MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "20"))
+
+# A new memory this similar to an existing one refreshes it instead of adding a row
+DUPLICATE_SIMILARITY = 0.92
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def embed(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """
+    Hashed bag of unigrams and bigrams, signed and L2-normalised, so cosine
+    similarity is a dot product. Crude next to a sentence model, but it is
+    deterministic, needs no download and embeds a memory in microseconds.
+    """
+    words = _WORD.findall(text.lower())
+    vec = np.zeros(dim, dtype=np.float32)
+    for gram in words + [a + " " + b for a, b in zip(words, words[1:])]:
+        h = zlib.crc32(gram.encode())
+        vec[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def _public(row: Dict) -> Dict:
+    return {k: v for k, v in row.items() if not k.startswith("_")}
+
+
+class _UserMemories:
+    """One user's memories held in RAM: row dicts plus a (n, dim) embedding matrix."""
+
+    def __init__(self, rows: List[Dict], vectors: np.ndarray):
+        self.rows = rows
+        self.vectors = vectors
+
+
+class LocalMemoryClient:
+    """
+    Memories stored in a local SQLite file, searched by cosine similarity
+    over an in-memory NumPy matrix per user.
+
+    SQLite runs on one dedicated thread; a user's rows are loaded once and
+    searches are a single matrix-vector product on the event loop, so
+    `search` answers in well under a millisecond for thousands of memories.
+    `add` stores each user turn as a memory (mem0 would distil facts with an
+    LLM first) and refreshes near-duplicates instead of piling them up.
+    """
+
+    def __init__(self, path: str = DEFAULT_MEMORY_PATH, dim: int = EMBEDDING_DIM, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.dim = dim
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-db")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._users: Dict[str, _UserMemories] = {}
+
+    # ---------- mem0-compatible API ----------
+    async def get_all(self, user_id: str, **kwargs) -> List[Dict]:
+        memories = await self._user(user_id)
+        return [_public(r) for r in sorted(memories.rows, key=lambda r: r["_updated"], reverse=True)]
+
+    async def search(self, query: str, user_id: str, limit: int = 5, top_k: Optional[int] = None, **kwargs) -> List[Dict]:
+        """The `top_k` (or `limit`) memories most similar to `query`, best first, each with a `score`."""
+        k = top_k if top_k is not None else limit
+        memories = await self._user(user_id)
+        if not memories.rows or k <= 0:
+            return []
+        scores = memories.vectors @ embed(query, self.dim)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        # Best score first; equally relevant memories newest first
+        top = sorted(top, key=lambda i: (-scores[i], -memories.rows[i]["_updated"]))
+        return [dict(_public(memories.rows[i]), score=round(float(scores[i]), 4)) for i in top]
+
+    async def add(self, messages: Any, user_id: str, **kwargs) -> Dict:
+        """Store user turns from `messages` (a string or mem0-style role/content dicts)."""
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        texts = [m["content"].strip() for m in messages if m.get("role") == "user" and m.get("content", "").strip()]
+        memories = await self._user(user_id)
+        results = []
+        for text in texts:
+            vector = embed(text, self.dim)
+            now = self._clock()
+            match = None
+            if memories.rows:
+                sims = memories.vectors @ vector
+                best = int(sims.argmax())
+                if sims[best] >= DUPLICATE_SIMILARITY:
+                    match = best
+            if match is not None:
+                row = memories.rows[match]
+                row.update(memory=text, updated_at=_iso(now), _updated=now)
+                memories.vectors[match] = vector
+                await self._run(self._update_row, row["id"], text, vector, now)
+                results.append({"id": row["id"], "memory": text, "event": "UPDATE"})
+            else:
+                row = {"id": str(uuid.uuid4()), "memory": text, "user_id": user_id,
+                       "created_at": _iso(now), "updated_at": _iso(now), "_updated": now}
+                memories.rows.append(row)
+                memories.vectors = np.vstack((memories.vectors, vector[None, :]))
+                await self._run(self._insert_row, row["id"], user_id, text, vector, now)
+                results.append({"id": row["id"], "memory": text, "event": "ADD"})
+        return {"results": results}
+
+    async def close(self) -> None:
+        await self._run(self._close)
+
+    # ---------- internals ----------
+    async def _user(self, user_id: str) -> _UserMemories:
+        memories = self._users.get(user_id)
+        if memories is None:
+            rows, vectors = await self._run(self._load_user, user_id)
+            memories = self._users.setdefault(user_id, _UserMemories(rows, vectors))
+        return memories
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS memories ("
+                " id TEXT PRIMARY KEY,"
+                " user_id TEXT NOT NULL,"
+                " memory TEXT NOT NULL,"
+                " embedding BLOB NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS memories_user ON memories (user_id)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _load_user(self, user_id: str):
+        cursor = self._connection().execute(
+            "SELECT id, memory, embedding, created_at, updated_at FROM memories WHERE user_id = ?", (user_id,)
+        )
+        rows, vectors = [], []
+        for memory_id, memory, blob, created_at, updated_at in cursor:
+            vector = np.frombuffer(blob, dtype=np.float32)
+            if vector.shape[0] != self.dim:
+                vector = embed(memory, self.dim)  # stored with another dimension: re-embed
+            rows.append({"id": memory_id, "memory": memory, "user_id": user_id,
+                         "created_at": _iso(created_at), "updated_at": _iso(updated_at), "_updated": updated_at})
+            vectors.append(vector)
+        matrix = np.array(vectors, dtype=np.float32) if vectors else np.zeros((0, self.dim), dtype=np.float32)
+        return rows, matrix
+
+    def _insert_row(self, memory_id: str, user_id: str, memory: str, vector: np.ndarray, now: float) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO memories (id, user_id, memory, embedding, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (memory_id, user_id, memory, vector.astype(np.float32).tobytes(), now, now),
+        )
+        conn.commit()
+
+    def _update_row(self, memory_id: str, memory: str, vector: np.ndarray, now: float) -> None:
+        conn = self._connection()
+        conn.execute(
+            "UPDATE memories SET memory = ?, embedding = ?, updated_at = ? WHERE id = ?",
+            (memory, vector.astype(np.float32).tobytes(), now, memory_id),
+        )
+        conn.commit()
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# -------------------------------------------------------------------
+# Backend selection
+# -------------------------------------------------------------------
+def get_memory_client():
+    """
+    MEMORY_BACKEND=local|mem0 picks the store explicitly. Unset, mem0 is used
+    when it is installed and MEM0_API_KEY is set, otherwise the local store.
+    """
+    backend = os.getenv("MEMORY_BACKEND", "").lower()
+    if backend != "local" and (backend == "mem0" or os.getenv("MEM0_API_KEY")):
+        try:
+            from mem0 import AsyncMemoryClient  # type: ignore
+            return AsyncMemoryClient()
+        except Exception as e:  # not installed, or rejected the API key
+            logger.warning(f"mem0 unavailable ({e}); using local memory store")
+    return LocalMemoryClient(os.getenv("MEMORY_DB_PATH", DEFAULT_MEMORY_PATH))
@@ -0,0 +1,179 @@
+# log_setup.py - Non-blocking structured logging: records are queued on the caller's thread and written as JSON lines by a background thread
+#
+#   from log_setup import setup_logging, truncate
+#   setup_logging()                                   # once, at process start
+#   logger.info("Tool %s returned %s", name, truncate(result))
+#
+# LOG_LEVEL (INFO), LOG_FORMAT (json | text) and LOG_MAX_FIELD (characters kept
+# per message argument / extra field) configure it from the environment.
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from typing import Any, Dict, Optional, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD", "500"))
+QUEUE_SIZE = 10000
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "suppressed"}
+
+
+def truncate(value: Any, limit: int = MAX_FIELD_CHARS) -> Any:
+    """Cut long strings/bytes to `limit` characters, noting how much was dropped; other values pass through."""
+    if isinstance(value, (str, bytes)) and len(value) > limit:
+        cut = value[:limit]
+        if isinstance(cut, bytes):
+            cut = cut.decode("utf-8", "replace")
+        return f"{cut}…(+{len(value) - limit} chars)"
+    return value
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `burst` records per `period` seconds for each
+    (logger, message template) pair, so a line logged from the frame loop
+    or a retrying thread cannot flood the queue. The next record let
+    through for a throttled template carries `suppressed=<count>`.
+
+    Records at `max_level` and above (WARNING by default) always pass:
+    a repeated error is exactly what an operator needs to see.
+    """
+
+    def __init__(self, burst: int = 10, period: float = 10.0, max_level: int = logging.WARNING, clock=time.monotonic):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self.max_level = max_level
+        self._clock = clock
+        self._window_start = clock()
+        self._counts: Dict[Tuple[str, Any], int] = {}
+        self._suppressed: Dict[Tuple[str, Any], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.max_level:
+            return True
+        now = self._clock()
+        if now - self._window_start >= self.period:
+            self._window_start = now
+            self._counts.clear()
+        key = (record.name, record.msg)
+        count = self._counts.get(key, 0) + 1
+        self._counts[key] = count
+        if count > self.burst:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return False
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, msg, any `extra=` fields, exc.
+
+    `extra=` keys must not be LogRecord attributes (args, msg, name, ...):
+    the logger raises KeyError for those, so prefix them (tool_args).
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that only does cheap work on the caller's thread: cut long
+    arguments, build the message, and drop the record (counting it) if the
+    writer has fallen `QUEUE_SIZE` records behind rather than wait for it.
+    """
+
+    def __init__(self, log_queue: "queue.Queue", max_field: int = MAX_FIELD_CHARS):
+        super().__init__(log_queue)
+        self.max_field = max_field
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            args = record.args
+            if isinstance(args, dict):
+                record.args = {k: truncate(v, self.max_field) for k, v in args.items()}
+            else:
+                record.args = tuple(truncate(a, self.max_field) for a in args)
+        message = truncate(record.getMessage(), self.max_field * 4)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg, record.args, record.exc_info = message, None, None
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                setattr(record, key, truncate(value, self.max_field))
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None) -> logging.handlers.QueueListener:
+    """
+    Route every log record in the process through a bounded queue to a
+    writer thread. Replaces the root logger's handlers; safe to call more
+    than once (later calls return the running listener).
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    writer = logging.StreamHandler(stream or sys.stderr)
+    if fmt == "json":
+        writer.setFormatter(JsonFormatter())
+    else:
+        writer.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+
+    log_queue: "queue.Queue" = queue.Queue(maxsize=QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, writer, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
@@ -0,0 +1,295 @@
+# mail_queue.py - Background outbound mail queue with a persistent SMTP connection
+import asyncio
+import logging
+import os
+import smtplib
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+
+class MailQueueFull(Exception):
+    """Raised when the outbound queue is at capacity."""
+
+
+class OutboundMessage:
+    def __init__(self, sender: str, recipients: List[str], payload: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.sender = sender
+        self.recipients = recipients
+        self.payload = payload
+
+
+class MailQueue:
+    """
+    Sends mail from a bounded queue on a background worker.
+
+    `enqueue` returns a message id immediately; the worker keeps one
+    authenticated SMTP connection open, sends whatever has queued up in one
+    batch over it, closes it after `idle_timeout` seconds without traffic and
+    reconnects on demand. smtplib is blocking, so every SMTP call runs on a
+    single dedicated thread that owns the connection.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        sender: Optional[str] = None,
+        use_starttls: bool = True,
+        queue_size: int = 100,
+        batch_size: int = 10,
+        idle_timeout: float = 60.0,
+        connect_timeout: float = 15.0,
+        drain_timeout: float = 30.0,
+        status_history: int = 500,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username or ""
+        self.use_starttls = use_starttls
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.drain_timeout = drain_timeout
+        self.status_history = status_history
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smtp")
+        self._smtp: Optional[smtplib.SMTP] = None  # only touched on the smtp thread
+        self._statuses: "OrderedDict[str, Dict]" = OrderedDict()
+        self._in_flight: List[OutboundMessage] = []
+        self._aborting = False  # read by the smtp thread: fail the rest of the batch
+
+    @classmethod
+    def from_env(cls) -> "MailQueue":
+        user = os.getenv("GMAIL_USER")
+        return cls(
+            host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+            port=int(os.getenv("SMTP_PORT", "587")),
+            username=user,
+            password=os.getenv("GMAIL_APP_PASSWORD"),
+            sender=user,
+        )
+
+    # ---------- public API ----------
+    def enqueue(self, to_email: str, subject: str, message: str, cc_email: Optional[str] = None) -> str:
+        """Queue a plain-text email and return its message id. Raises MailQueueFull."""
+        self._ensure_worker()
+
+        msg = MIMEMultipart()
+        msg["From"] = self.sender
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        recipients = [to_email]
+        if cc_email:
+            msg["Cc"] = cc_email
+            recipients.append(cc_email)
+        msg.attach(MIMEText(message, "plain"))
+
+        outbound = OutboundMessage(self.sender, recipients, msg.as_string())
+        try:
+            self._queue.put_nowait(outbound)
+        except asyncio.QueueFull:
+            raise MailQueueFull(f"Outbound mail queue is full ({self.queue_size} messages)")
+        self._record(outbound.id, STATUS_QUEUED, to=to_email)
+        return outbound.id
+
+    def status(self, message_id: str) -> Optional[Dict]:
+        """Delivery status for a message id, or None if unknown or expired from history."""
+        return self._statuses.get(message_id)
+
+    async def stop(self, drain: bool = True) -> List[str]:
+        """
+        Stop the worker and close the connection. With `drain`, queued mail
+        gets up to `drain_timeout` seconds to go out first. Whatever is left
+        is marked failed and its ids are logged and returned.
+        """
+        if self._worker is None:
+            return []
+        if drain and self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Mail queue not drained within {self.drain_timeout:.0f}s")
+        self._aborting = True
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        unsent = self._fail_unsent()
+        try:
+            # The smtp thread may still be finishing a command; don't wait on a hung server
+            await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(self._executor, self._disconnect),
+                timeout=self.connect_timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("SMTP connection did not close in time")
+        self._aborting = False
+        return unsent
+
+    def _fail_unsent(self) -> List[str]:
+        """Mark the interrupted batch and everything still queued as failed."""
+        unsent = [(m, "shutdown during delivery; may have been sent") for m in self._in_flight]
+        self._in_flight = []
+        while self._queue is not None and not self._queue.empty():
+            unsent.append((self._queue.get_nowait(), "not sent before shutdown"))
+            self._queue.task_done()
+        for message, error in unsent:
+            self._record(message.id, STATUS_FAILED, error=error)
+        if unsent:
+            logger.error(
+                f"{len(unsent)} email(s) not delivered at shutdown: "
+                + ", ".join(f"{m.id} to {', '.join(m.recipients)}" for m, _ in unsent)
+            )
+        return [message.id for message, _ in unsent]
+
+    # ---------- worker ----------
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                first = await asyncio.wait_for(self._queue.get(), timeout=self.idle_timeout)
+            except asyncio.TimeoutError:
+                await loop.run_in_executor(self._executor, self._disconnect)
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            self._in_flight = batch
+            try:
+                results = await loop.run_in_executor(self._executor, self._deliver_batch, batch)
+            except Exception as e:
+                results = [(m.id, str(e)) for m in batch]
+            self._in_flight = []
+            for message_id, error in results:
+                if error:
+                    logger.error(f"Email {message_id} failed: {error}")
+                    self._record(message_id, STATUS_FAILED, error=error)
+                else:
+                    logger.info(f"Email {message_id} sent")
+                    self._record(message_id, STATUS_SENT)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _record(self, message_id: str, status: str, **extra) -> None:
+        entry = self._statuses.setdefault(message_id, {"id": message_id})
+        entry.update(extra, status=status, updated_at=time.time())
+        self._statuses.move_to_end(message_id)
+        while len(self._statuses) > self.status_history:
+            self._statuses.popitem(last=False)
+
+    # ---------- SMTP thread ----------
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.connect_timeout)
+        if self.use_starttls:
+            smtp.starttls()
+        if self.username and self.password:
+            smtp.login(self.username, self.password)
+        logger.info(f"SMTP connection opened to {self.host}:{self.port}")
+        return smtp
+
+    def _disconnect(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except OSError:
+                smtp.close()
+            logger.info("SMTP connection closed")
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+        self._smtp = self._connect()
+        return self._smtp
+
+    def _deliver_batch(self, batch: List[OutboundMessage]) -> List[Tuple[str, Optional[str]]]:
+        results = []
+        verified = False  # probe a reused connection once per batch, not per message
+        connection_error = None  # once the server is unreachable, don't retry per message
+        for message in batch:
+            if connection_error is None and self._aborting:
+                connection_error = "mail queue shutting down"
+            if connection_error is not None:
+                results.append((message.id, f"not attempted: {connection_error}"))
+                continue
+            error, lost = None, False
+            for attempt in range(2):
+                try:
+                    smtp = self._smtp if verified and self._smtp else self._connection()
+                    verified = True
+                    smtp.sendmail(message.sender, message.recipients, message.payload)
+                    error = None
+                    break
+                except smtplib.SMTPServerDisconnected as e:
+                    # Server dropped the connection; reconnect once and retry
+                    self._smtp = None
+                    error, lost = f"disconnected: {e}", True
+                except smtplib.SMTPAuthenticationError:
+                    error, lost = "authentication failed", True
+                    break
+                except smtplib.SMTPException as e:
+                    # Rejected message (bad recipient etc.); the connection is still usable
+                    error, lost = str(e), False
+                    break
+                except OSError as e:
+                    self._smtp = None
+                    error, lost = str(e), True
+                    break
+            if error and lost:
+                connection_error = error
+            results.append((message.id, error))
+        return results
+
+
+# -------------------------------------------------------------------
+# Process-wide queue, built on first use so .env has been loaded
+# -------------------------------------------------------------------
+_mail_queue: Optional[MailQueue] = None
+
+
+def get_mail_queue() -> MailQueue:
+    global _mail_queue
+    if _mail_queue is None:
+        _mail_queue = MailQueue.from_env()
+    return _mail_queue
+
+
+async def shutdown_mail_queue() -> None:
+    """Flush queued mail (bounded by drain_timeout) and close the SMTP connection (shutdown hook)."""
+    if _mail_queue is not None:
+        await _mail_queue.stop(drain=True)
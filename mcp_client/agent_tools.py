@@ -11,6 +11,7 @@ from .util import MCPUtil, FunctionTool
 from .server import MCPServer, MCPServerSse
 from livekit.agents import ChatContext, AgentSession, JobContext, FunctionTool as Tool
 from mcp import CallToolRequest
+from log_setup import truncate
 
 logger = logging.getLogger("mcp-agent-tools")
 
@@ -85,6 +86,21 @@ class MCPToolsIntegration:
         # Import locally to avoid circular imports
         from livekit.agents.llm import function_tool
 
+        # Apply the decorator and return
+        return function_tool()(MCPToolsIntegration._build_tool_impl(tool))
+
+    @staticmethod
+    def _build_tool_impl(tool: FunctionTool) -> Callable:
+        """
+        Builds the undecorated async function that invokes an MCP tool, with a
+        signature and annotations generated from the tool's JSON schema.
+
+        Args:
+            tool: The FunctionTool instance to convert
+
+        Returns:
+            An async function taking the tool's parameters as keyword arguments
+        """
         # Create parameters list from JSON schema
         params = []
         annotations = {}
@@ -113,9 +129,10 @@ class MCPToolsIntegration:
         # Define the actual function that will be called by the agent
         async def tool_impl(**kwargs):
             input_json = json.dumps(kwargs)
-            logger.info(f"Invoking tool '{tool.name}' with args: {kwargs}")
+            logger.info("Invoking tool %s", tool.name, extra={"tool": tool.name, "tool_args": truncate(input_json)})
             result_str = await tool.on_invoke_tool(None, input_json)
-            logger.info(f"Tool '{tool.name}' result: {result_str}")
+            logger.info("Tool %s returned %d chars", tool.name, len(result_str),
+                        extra={"tool": tool.name, "result": truncate(result_str)})
             return result_str
 
         # Set function metadata
@@ -123,9 +140,7 @@ class MCPToolsIntegration:
         tool_impl.__name__ = tool.name
         tool_impl.__doc__ = tool.description
         tool_impl.__annotations__ = {'return': str, **annotations}
-
-        # Apply the decorator and return
-        return function_tool()(tool_impl)
+        return tool_impl
 
     @staticmethod
     async def register_with_agent(agent, mcp_servers: List[MCPServer],
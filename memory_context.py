@@ -0,0 +1,90 @@
+# memory_context.py - Budgeted, relevance-ranked memory text for an agent's initial ChatContext
+import math
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from local_memory import embed
+
+# Rough prompt budget for injected memories; ~4 characters per token
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "400"))
+
+RECENCY_HALF_LIFE_DAYS = 30.0
+RELEVANCE_WEIGHT = 0.7
+NEAR_DUPLICATE_SIMILARITY = 0.85
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / 4))
+
+
+def _timestamp(value) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _rank(memories: List[Dict], now: float) -> List[Tuple[float, Dict, Optional[float]]]:
+    """(score, memory, updated_ts) best first: relevance blended with exponential recency decay."""
+    ranked = []
+    for memory in memories:
+        updated = _timestamp(memory.get("updated_at") or memory.get("created_at"))
+        age_days = max(0.0, (now - updated) / 86400) if updated is not None else math.inf
+        recency = 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+        relevance = min(1.0, max(0.0, float(memory.get("score") or 0.0)))
+        ranked.append((RELEVANCE_WEIGHT * relevance + (1 - RELEVANCE_WEIGHT) * recency, memory, updated))
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    return ranked
+
+
+def build_memory_context(
+    memories: List[Dict],
+    user_name: str,
+    heading: str = "What you remember about them",
+    budget_tokens: int = MEMORY_TOKEN_BUDGET,
+    now: Optional[float] = None,
+) -> Tuple[str, Dict]:
+    """
+    Compact "- memory (date)" lines for the best memories that fit in
+    `budget_tokens`, near-duplicates removed. Returns the text ("" when
+    nothing is kept) and stats on what was kept and dropped.
+    """
+    now = time.time() if now is None else now
+    header = f"User is {user_name}. {heading}:"
+    used = estimate_tokens(header)
+    lines: List[str] = []
+    kept_vectors: List[np.ndarray] = []
+    stats = {"candidates": len(memories), "kept": 0, "duplicates": 0, "over_budget": 0,
+             "tokens_used": 0, "tokens_dropped": 0, "budget": budget_tokens}
+
+    for _, memory, updated in _rank(memories, now):
+        text = " ".join(str(memory.get("memory", "")).split())
+        if not text:
+            continue
+        date = datetime.fromtimestamp(updated).strftime("%Y-%m-%d") if updated is not None else ""
+        line = f"- {text} ({date})" if date else f"- {text}"
+        cost = estimate_tokens(line)
+        vector = embed(text)
+        if any(float(vector @ kept) >= NEAR_DUPLICATE_SIMILARITY for kept in kept_vectors):
+            stats["duplicates"] += 1
+            stats["tokens_dropped"] += cost
+            continue
+        if used + cost > budget_tokens:
+            stats["over_budget"] += 1
+            stats["tokens_dropped"] += cost
+            continue
+        lines.append(line)
+        kept_vectors.append(vector)
+        used += cost
+
+    stats["kept"] = len(lines)
+    if not lines:
+        return "", stats
+    stats["tokens_used"] = used
+    return "\n".join([header] + lines), stats
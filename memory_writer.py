@@ -0,0 +1,126 @@
+# memory_writer.py - Persist conversation turns to the memory store during the session
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+
+def _message_text(item: Any) -> str:
+    content = getattr(item, "content", None)
+    if not content:
+        return ""
+    text = "".join(str(c) for c in content) if isinstance(content, list) else str(content)
+    return text.strip()
+
+
+def _message_key(item: Any, role: str, text: str) -> str:
+    item_id = getattr(item, "id", None)
+    return item_id if item_id else f"{role}:{hash(text)}"
+
+
+def _item_marker(item: Any) -> Any:
+    """Identifies a chat item across ticks: its ID, or its role and text."""
+    return getattr(item, "id", None) or (getattr(item, "role", None), _message_text(item))
+
+
+class MemoryWriter:
+    """
+    Streams new user/assistant turns from a chat context to the memory
+    store in small batches from a background task.
+
+    `get_items` returns the live chat items. The writer remembers the last
+    item it has looked at and resumes after it, so each tick only looks at
+    new items and shutdown only has to flush the tail. If that item is gone
+    (the context was truncated or replaced) the whole list is rescanned and
+    message IDs guard against re-sending. A failed batch stays pending and
+    is retried on the next tick.
+    """
+
+    def __init__(
+        self,
+        memory_client,
+        user_id: str,
+        get_items: Callable[[], Sequence[Any]],
+        skip_ids: Iterable[str] = (),
+        batch_size: int = 6,
+        interval: float = 15.0,
+        name: str = "memory",
+    ):
+        self.memory_client = memory_client
+        self.user_id = user_id
+        self.get_items = get_items
+        self.batch_size = batch_size
+        self.interval = interval
+        self.name = name
+        self._seen: Set[str] = set(i for i in skip_ids if i)
+        self._last_marker: Any = None
+        self._pending: List[Dict] = []
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.saved = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"{self.name}-writer")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"{self.name}: memory flush failed, will retry: {e}")
+
+    def _collect(self) -> None:
+        items = self.get_items() or []
+        start = 0
+        if self._last_marker is not None:
+            # Usually the last or nearly the last item; not found means a rescan
+            for i in range(len(items) - 1, -1, -1):
+                if _item_marker(items[i]) == self._last_marker:
+                    start = i + 1
+                    break
+        for item in items[start:]:
+            role = getattr(item, "role", None)
+            if role not in ("user", "assistant"):
+                continue
+            text = _message_text(item)
+            if not text:
+                continue
+            key = _message_key(item, role, text)
+            if key in self._seen:
+                continue
+            self._seen.add(key)
+            self._pending.append({"role": role, "content": text})
+        if items:
+            self._last_marker = _item_marker(items[-1])
+
+    async def flush(self) -> int:
+        """Send every new turn in batches of `batch_size`. Returns how many were saved."""
+        async with self._lock:
+            self._collect()
+            saved = 0
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                await self.memory_client.add(batch, user_id=self.user_id)
+                del self._pending[:len(batch)]
+                saved += len(batch)
+                self.saved += len(batch)
+            return saved
+
+    async def aclose(self) -> None:
+        """Stop the background task and flush the tail."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            saved = await self.flush()
+        except Exception as e:
+            logger.error(f"{self.name}: {len(self._pending)} turns not saved at shutdown: {e}")
+            return
+        logger.info(f"{self.name}: flushed {saved} turns at shutdown ({self.saved} this session)")
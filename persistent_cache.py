@@ -0,0 +1,146 @@
+# persistent_cache.py - SQLite-backed response cache that survives restarts
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "responses.sqlite3")
+
+# Seconds a stored response stays fresh, per endpoint
+DEFAULT_TTLS = {
+    "youtube_search": 24 * 60 * 60,
+    "directions": 6 * 60 * 60,
+    "places_cell": 6 * 60 * 60,
+    # A position older than this no longer says where the car is
+    "car_position": 2 * 60,
+}
+
+# Endpoints written often enough to crowd out the long-lived entries get their
+# own row cap: they only ever evict each other, never searches or routes.
+DEFAULT_CAPS = {
+    "places_cell": 2000,
+    "car_position": 1,
+}
+
+
+def _normalise(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, dict):
+        return {k: _normalise(v) for k, v in value.items()}
+    return value
+
+
+def make_key(endpoint: str, params: Dict[str, Any]) -> str:
+    """Stable key for a request: endpoint plus normalised, sorted params (never include API keys)."""
+    return endpoint + ":" + json.dumps(_normalise(params), sort_keys=True, separators=(",", ":"))
+
+
+class PersistentCache:
+    """
+    JSON responses stored in a local SQLite file in WAL mode.
+
+    Every SQLite call runs on one dedicated thread that owns the connection,
+    so reads never block the event loop. Entries expire per endpoint TTL;
+    expired entries can still be read with `allow_stale=True` as an outage
+    fallback. Endpoints listed in `caps` are capped separately; everything
+    else shares `max_entries`. Either way the least recently used rows are
+    evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 60 * 60,
+        max_entries: int = 5000,
+        caps: Optional[Dict[str, int]] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.caps = dict(DEFAULT_CAPS, **(caps or {}))
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-cache")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # ---------- async API ----------
+    async def get(self, endpoint: str, params: Dict[str, Any], allow_stale: bool = False) -> Optional[Any]:
+        return await self._run(self._get, make_key(endpoint, params), endpoint, allow_stale)
+
+    async def set(self, endpoint: str, params: Dict[str, Any], value: Any) -> None:
+        await self._run(self._set, make_key(endpoint, params), endpoint, json.dumps(value))
+
+    async def close(self) -> None:
+        await self._run(self._close)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # ---------- SQLite thread ----------
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " endpoint TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_endpoint ON responses (endpoint, accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _get(self, key: str, endpoint: str, allow_stale: bool) -> Optional[Any]:
+        conn = self._connection()
+        row = conn.execute("SELECT value, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, stored_at = row
+        now = self._clock()
+        if not allow_stale and now - stored_at > self.ttls.get(endpoint, self.default_ttl):
+            return None
+        conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        conn.commit()
+        return json.loads(value)
+
+    def _set(self, key: str, endpoint: str, value: str) -> None:
+        conn = self._connection()
+        now = self._clock()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, endpoint, value, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, endpoint, value, now, now),
+        )
+        if endpoint in self.caps:
+            scope, params = "endpoint = ?", [endpoint]
+            limit = self.caps[endpoint]
+        else:
+            scope = f"endpoint NOT IN ({','.join('?' * len(self.caps))})"
+            params, limit = list(self.caps), self.max_entries
+        conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            f" SELECT key FROM responses WHERE {scope} ORDER BY accessed_at ASC"
+            f" LIMIT max(0, (SELECT COUNT(*) FROM responses WHERE {scope}) - ?))",
+            (*params, *params, limit),
+        )
+        conn.commit()
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,140 @@
+# poi_index.py - Offline points-of-interest index for maps features without connectivity
+import csv
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from geo_cache import EARTH_RADIUS_KM, format_miles
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "poi_region.csv")
+
+
+def _to_unit_xyz(lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Project lat/lng onto the unit sphere so Euclidean KD-tree distance tracks great-circle distance."""
+    lat_r, lng_r = np.radians(lats), np.radians(lngs)
+    cos_lat = np.cos(lat_r)
+    return np.column_stack((cos_lat * np.cos(lng_r), cos_lat * np.sin(lng_r), np.sin(lat_r)))
+
+
+def _chord_to_km(chord: np.ndarray) -> np.ndarray:
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+def _km_to_chord(km: float) -> float:
+    return 2 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+class POIIndex:
+    """
+    Points of interest from a bundled region extract, indexed with one
+    cKDTree per place type (plus one over everything) for k-nearest and
+    radius queries in microseconds, with no network.
+
+    Rows need the columns name, type, lat, lng; address and rating are optional.
+    """
+
+    def __init__(self, rows: List[Dict]):
+        self.rows = rows
+        self._trees: Dict[Optional[str], cKDTree] = {}
+        self._members: Dict[Optional[str], np.ndarray] = {}
+        if not rows:
+            return
+
+        lats = np.fromiter((float(r["lat"]) for r in rows), dtype=float, count=len(rows))
+        lngs = np.fromiter((float(r["lng"]) for r in rows), dtype=float, count=len(rows))
+        xyz = _to_unit_xyz(lats, lngs)
+        types = np.array([r["type"] for r in rows])
+
+        self._trees[None] = cKDTree(xyz)
+        self._members[None] = np.arange(len(rows))
+        for place_type in np.unique(types):
+            members = np.flatnonzero(types == place_type)
+            self._trees[str(place_type)] = cKDTree(xyz[members])
+            self._members[str(place_type)] = members
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_POI_PATH) -> "POIIndex":
+        """Load a CSV or Parquet (requires pandas + pyarrow) region extract."""
+        if path.endswith(".parquet"):
+            import pandas as pd  # optional: only needed for Parquet extracts
+            rows = pd.read_parquet(path).to_dict("records")
+        else:
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+        for row in rows:
+            row["lat"], row["lng"] = float(row["lat"]), float(row["lng"])
+            row["rating"] = float(row.get("rating") or 0)
+            row["address"] = row.get("address") or ""
+        logger.info(f"Loaded {len(rows)} offline POIs from {path}")
+        return cls(rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def types(self) -> List[str]:
+        return sorted(t for t in self._trees if t is not None)
+
+    def nearest(self, lat: float, lng: float, place_type: Optional[str] = None, k: int = 5) -> List[Dict]:
+        """The `k` closest POIs of `place_type` (any type if None), nearest first."""
+        tree = self._trees.get(place_type)
+        if tree is None or k <= 0:
+            return []
+        k = min(k, tree.n)
+        chords, idx = tree.query(_to_unit_xyz(np.array([lat]), np.array([lng]))[0], k=k)
+        return self._results(place_type, np.atleast_1d(chords), np.atleast_1d(idx))
+
+    def within(
+        self, lat: float, lng: float, radius_km: float, place_type: Optional[str] = None, limit: int = 20
+    ) -> List[Dict]:
+        """POIs of `place_type` within `radius_km`, nearest first."""
+        tree = self._trees.get(place_type)
+        if tree is None:
+            return []
+        point = _to_unit_xyz(np.array([lat]), np.array([lng]))[0]
+        idx = np.array(tree.query_ball_point(point, _km_to_chord(radius_km)), dtype=int)
+        if idx.size == 0:
+            return []
+        chords = np.linalg.norm(tree.data[idx] - point, axis=1)
+        order = np.argsort(chords)[:limit]
+        return self._results(place_type, chords[order], idx[order])
+
+    def _results(self, place_type: Optional[str], chords: np.ndarray, idx: np.ndarray) -> List[Dict]:
+        members = self._members[place_type]
+        results = []
+        for km, i in zip(_chord_to_km(chords), idx):
+            row = self.rows[members[i]]
+            results.append({
+                "name": row["name"],
+                "type": row["type"],
+                "rating": row["rating"],
+                "address": row["address"],
+                "lat": row["lat"],
+                "lng": row["lng"],
+                "distance": format_miles(km),
+                "distance_km": round(float(km), 3),
+            })
+        return results
+
+
+# -------------------------------------------------------------------
+# Process-wide index, loaded on first use
+# -------------------------------------------------------------------
+_poi_index: Optional[POIIndex] = None
+
+
+def get_poi_index() -> POIIndex:
+    """Index of POI_DATA_PATH (default data/poi_region.csv); empty if the file is missing."""
+    global _poi_index
+    if _poi_index is None:
+        path = os.getenv("POI_DATA_PATH", DEFAULT_POI_PATH)
+        try:
+            _poi_index = POIIndex.load(path)
+        except (OSError, KeyError, ValueError, ImportError) as e:
+            logger.warning(f"Offline POI data unavailable ({path}): {e}")
+            _poi_index = POIIndex([])
+    return _poi_index
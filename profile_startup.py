@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# profile_startup.py - Report per-module import cost of the agent entry modules
+#
+# Usage:
+#   python profile_startup.py                      # hadi_agent, huda_agent, agent_manager
+#   python profile_startup.py tools --top 15
+#   python profile_startup.py hadi_agent --by-package
+#
+# Each module is imported in a fresh interpreter with `-X importtime`, so the
+# numbers are what a newly spawned LiveKit job process pays before it can run
+# the entrypoint.
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = ["hadi_agent", "huda_agent", "agent_manager"]
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_import(module: str) -> Tuple[float, List[Tuple[str, int, int, int]]]:
+    """
+    Import `module` in a subprocess. Returns the wall time in seconds and a
+    list of (module, self_us, cumulative_us, depth) rows from -X importtime.
+    """
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {module}; "
+        "print(time.perf_counter() - t)"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    wall = float(proc.stdout.strip().splitlines()[-1])
+    return wall, rows
+
+
+def by_package(rows: List[Tuple[str, int, int, int]]) -> Dict[str, int]:
+    """Sum self time per top-level package."""
+    totals: Dict[str, int] = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        totals[name.split(".")[0]] += self_us
+    return totals
+
+
+def report(module: str, top: int, group: bool) -> None:
+    wall, rows = profile_import(module)
+    print(f"\n{module}: {wall * 1000:.1f} ms to import ({len(rows)} modules loaded)")
+    if group:
+        print(f"  {'self ms':>9}  package")
+        ranked = sorted(by_package(rows).items(), key=lambda kv: kv[1], reverse=True)
+        for name, self_us in ranked[:top]:
+            print(f"  {self_us / 1000:9.1f}  {name}")
+    else:
+        print(f"  {'cumul ms':>9}  {'self ms':>8}  module")
+        for name, self_us, cumulative_us, depth in sorted(rows, key=lambda r: r[2], reverse=True)[:top]:
+            print(f"  {cumulative_us / 1000:9.1f}  {self_us / 1000:8.1f}  {'  ' * depth}{name}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Profile agent worker import time")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=25, help="rows to show per module")
+    parser.add_argument("--by-package", action="store_true", help="group self time by top-level package")
+    args = parser.parse_args()
+
+    status = 0
+    for module in args.modules:
+        try:
+            report(module, args.top, args.by_package)
+        except RuntimeError as e:
+            print(f"\n{module}: {e}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# resilience.py - Token-bucket rate limiting and circuit breaking for upstream APIs
+import logging
+import time
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from metrics import counter, gauge, histogram
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+UPSTREAM_SECONDS = histogram("upstream_request_seconds", "Upstream API call latency", ["upstream", "outcome"])
+UPSTREAM_REJECTED = counter("upstream_rejected_total", "Calls refused before reaching the upstream", ["upstream", "reason"])
+UPSTREAM_CIRCUIT = gauge("upstream_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ["upstream"])
+CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling an upstream that is rate limited or known to be down."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    pass
+
+
+class RateLimitedError(UpstreamUnavailable):
+    pass
+
+
+class UpstreamError(Exception):
+    """An upstream answered, but with an error payload (e.g. OVER_QUERY_LIMIT)."""
+
+
+class UpstreamClientError(Exception):
+    """
+    The upstream refused the request itself (INVALID_REQUEST, most 4xx).
+    Retrying will not help and it says nothing about the upstream's health,
+    so it never counts towards opening the breaker.
+    """
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def try_acquire(self, tokens: float = 1.0, reserve: float = 0.0) -> bool:
+        """Take `tokens` if at least `reserve` would still be left afterwards."""
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens - tokens >= reserve:
+            self._tokens -= tokens
+            return True
+        return False
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass through; `failure_threshold` consecutive failures open it.
+    Open: calls are rejected until `reset_timeout` has passed.
+    Half-open: one probe call is let through; success closes, failure re-opens.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        name: str = "upstream",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot that was granted but never used."""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info(f"{self.name}: circuit closed (upstream recovered)")
+        self._state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning(f"{self.name}: circuit opened after {self._failures} consecutive failures")
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+            self._probe_in_flight = False
+
+
+class Upstream:
+    """
+    Rate limit + circuit breaker guarding one external API.
+
+    Background calls (cache warming, prefetch) only get a token while more
+    than `background_reserve` are left, so they cannot use up the burst an
+    interactive request arriving next would need.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        background_reserve: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.background_reserve = background_reserve
+        self.bucket = TokenBucket(rate, burst, clock=clock)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, name=name, clock=clock)
+        self.short_circuited = 0
+        self._ok_seconds = UPSTREAM_SECONDS.labels(name, "ok")
+        self._error_seconds = UPSTREAM_SECONDS.labels(name, "error")
+        self._client_error_seconds = UPSTREAM_SECONDS.labels(name, "client_error")
+
+    async def call(self, make_call: Callable[[], Awaitable[T]], background: bool = False) -> T:
+        """
+        Run `make_call()` if the breaker and rate limit allow it, otherwise
+        raise UpstreamUnavailable immediately so the caller can fall back.
+        """
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            UPSTREAM_REJECTED.labels(self.name, "circuit_open").inc()
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        if not self.bucket.try_acquire(reserve=self.background_reserve if background else 0.0):
+            # A probe rejected by the rate limit must not count against the upstream
+            self.breaker.release_probe()
+            self.short_circuited += 1
+            UPSTREAM_REJECTED.labels(self.name, "background_deferred" if background else "rate_limited").inc()
+            raise RateLimitedError(f"{self.name} rate limit reached")
+        start = time.perf_counter()
+        try:
+            result = await make_call()
+        except UpstreamClientError:
+            self._client_error_seconds.observe(time.perf_counter() - start)
+            self.breaker.release_probe()
+            raise
+        except Exception:
+            self._error_seconds.observe(time.perf_counter() - start)
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled: no verdict on the upstream either way
+            self.breaker.release_probe()
+            raise
+        self._ok_seconds.observe(time.perf_counter() - start)
+        self.breaker.record_success()
+        return result
+
+    def status(self) -> Dict:
+        return {"state": self.breaker.state, "short_circuited": self.short_circuited}
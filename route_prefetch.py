@@ -0,0 +1,148 @@
+# route_prefetch.py - Warm the places cache along a route corridor
+import asyncio
+import logging
+import time
+from typing import Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from geo_cache import GeoPlacesCache, geohash_encode, haversine_km
+from resilience import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PLACE_TYPES = ("rest_stop", "gas_station", "restaurant")
+
+
+def decode_polyline(encoded: str) -> np.ndarray:
+    """Decode a Google encoded polyline into an (N, 2) array of (lat, lng)."""
+    coords = []
+    index, lat, lng = 0, 0, 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift, result = 0, 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        coords.append((lat / 1e5, lng / 1e5))
+    return np.array(coords, dtype=float).reshape(-1, 2)
+
+
+def sample_corridor(
+    points: np.ndarray,
+    every_km: float = 3.0,
+    ahead_km: float = 80.0,
+    position: Optional[Tuple[float, float]] = None,
+) -> np.ndarray:
+    """
+    Points every `every_km` along the route, starting at the vertex nearest
+    `position` (or the route start) and stopping `ahead_km` further on.
+    """
+    if len(points) == 0:
+        return points
+    if len(points) == 1:
+        return points.copy()
+
+    lats, lngs = points[:, 0], points[:, 1]
+    legs = haversine_km(lats[:-1], lngs[:-1], lats[1:], lngs[1:])
+    along = np.concatenate(([0.0], np.cumsum(legs)))
+
+    start_km = 0.0
+    if position is not None:
+        nearest = int(np.argmin(haversine_km(position[0], position[1], lats, lngs)))
+        start_km = along[nearest]
+
+    end_km = min(along[-1], start_km + ahead_km)
+    marks = np.arange(start_km, end_km + 1e-9, every_km)
+    return np.column_stack((np.interp(marks, along, lats), np.interp(marks, along, lngs)))
+
+
+class RoutePrefetcher:
+    """
+    Warms GeoPlacesCache cells along a route so a rest stop can be suggested
+    without touching the network.
+
+    Sampled points are mapped to the geohash cells the road passes through,
+    deduplicated in route order and fetched for each place type, nearest first.
+    A budget caps upstream requests per route, and requests are paced by
+    `min_interval` with at most `concurrency` in flight.
+    """
+
+    def __init__(
+        self,
+        places_cache: GeoPlacesCache,
+        place_types: Iterable[str] = DEFAULT_PLACE_TYPES,
+        every_km: float = 3.0,
+        ahead_km: float = 80.0,
+        max_requests: int = 60,
+        concurrency: int = 4,
+        min_interval: float = 0.25,
+    ):
+        self.places_cache = places_cache
+        self.place_types = tuple(place_types)
+        self.every_km = every_km
+        self.ahead_km = ahead_km
+        self.max_requests = max_requests
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self._current: Optional[asyncio.Task] = None
+
+    def corridor_cells(self, polyline: str, position: Optional[Tuple[float, float]] = None) -> List[str]:
+        samples = sample_corridor(decode_polyline(polyline), self.every_km, self.ahead_km, position)
+        precision = self.places_cache.precision
+        seen: Set[str] = set()
+        ordered: List[str] = []
+        for lat, lng in samples:
+            cell = geohash_encode(lat, lng, precision)
+            if cell not in seen:
+                seen.add(cell)
+                ordered.append(cell)
+        return ordered
+
+    def prefetch(self, polyline: str, position: Optional[Tuple[float, float]] = None) -> asyncio.Task:
+        """Start warming the corridor in the background, replacing any previous route."""
+        if self._current is not None and not self._current.done():
+            self._current.cancel()
+        self._current = asyncio.ensure_future(self._run(polyline, position))
+        return self._current
+
+    async def _run(self, polyline: str, position: Optional[Tuple[float, float]]) -> int:
+        cells = self.corridor_cells(polyline, position)
+        jobs = [
+            (cell, place_type)
+            for cell in cells
+            for place_type in self.place_types
+            if not self.places_cache.is_warm(cell, place_type)
+        ][:self.max_requests]
+
+        slots = asyncio.Semaphore(self.concurrency)
+        started = time.monotonic()
+
+        async def fetch(i: int, cell: str, place_type: str) -> bool:
+            # Pace request starts so a long route cannot burst the Places quota
+            await asyncio.sleep(max(0.0, started + i * self.min_interval - time.monotonic()))
+            async with slots:
+                try:
+                    await self.places_cache.fetch_cell_places(cell, place_type, background=True)
+                    return True
+                except UpstreamUnavailable as e:
+                    # Quota reserved for interactive lookups, or breaker open
+                    logger.debug(f"Prefetch of {place_type} in {cell} skipped: {e}")
+                    return False
+                except Exception as e:
+                    logger.warning(f"Prefetch of {place_type} in {cell} failed: {e}")
+                    return False
+
+        results = await asyncio.gather(*(fetch(i, c, t) for i, (c, t) in enumerate(jobs)))
+        warmed = sum(results)
+        logger.info(f"Route prefetch warmed {warmed}/{len(jobs)} cells across {len(cells)} corridor cells")
+        return warmed
@@ -1,14 +1,31 @@
 # simple_api_server.py - Simplified backend without LiveKit
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
 import asyncio
-import json
+import logging
 import cv2
 import time
 from connectivity_manager import ConnectivityManager
+from http_client import http
+from log_setup import setup_logging, shutdown_logging
+from metrics import CONTENT_TYPE, REGISTRY
+from ws_codec import accept, sender
 
-app = FastAPI(title="Hadi-Huda Simple API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    yield
+    # Release pooled upstream connections and the response cache on shutdown
+    await http.aclose()
+    await connectivity.aclose()
+    shutdown_logging()
+
+app = FastAPI(title="Hadi-Huda Simple API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,16 +42,22 @@ class BluetoothRequest(BaseModel):
     device_address: str
 
 connectivity = ConnectivityManager()
+REGISTRY.on_collect(connectivity.export_metrics)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    print("WebSocket connected")
+    codec = await accept(websocket)
+    if codec is None:
+        return
+    send = sender(websocket, codec)
+    logger.info("WebSocket connected (%s)", codec.name)
     
     try:
         while True:
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            data = await websocket.receive()
+            if data.get("type") == "websocket.disconnect":
+                raise WebSocketDisconnect(data.get("code", 1000))
+            message = codec.decode(data["bytes"] if data.get("bytes") is not None else data["text"])
             
             if message["type"] == "user_message":
                 text = message["text"].lower()
@@ -46,14 +69,14 @@ async def websocket_endpoint(websocket: WebSocket):
                 else:
                     response = f"HUDA: I heard you say '{message['text']}'. How can I help?"
                 
-                await websocket.send_text(json.dumps({
+                await send(codec.encode({
                     "type": "agent_response",
                     "message": response,
                     "timestamp": time.time()
                 }))
                 
     except WebSocketDisconnect:
-        print("WebSocket disconnected")
+        logger.info("WebSocket disconnected")
 
 @app.get("/api/wifi/scan")
 async def scan_wifi():
@@ -79,6 +102,10 @@ async def get_nearby_places(type: str = "gas_station"):
     places = await connectivity.get_nearby_places(40.7128, -74.0060, type)
     return {"places": places}
 
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/api/status")
 async def get_status():
     return {
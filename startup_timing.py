@@ -0,0 +1,51 @@
+# startup_timing.py - Per-phase timing for agent entrypoints
+import logging
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class StartupTimer:
+    """
+    Records how long each startup phase took and when it finished relative
+    to job dispatch, so overlapping phases show up as a wall time shorter
+    than the sum of their durations.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._started = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+        self.finished_at: Dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.durations[phase] = end - start
+            self.finished_at[phase] = end - self._started
+
+    async def phase(self, phase: str, awaitable: Awaitable[T]) -> T:
+        with self.measure(phase):
+            return await awaitable
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def summary(self) -> str:
+        phases = ", ".join(
+            f"{phase} {self.durations[phase] * 1000:.0f}ms (done +{self.finished_at[phase] * 1000:.0f}ms)"
+            for phase in self.durations
+        )
+        return (
+            f"{self.name} startup: {phases}; total {self.elapsed() * 1000:.0f}ms "
+            f"vs {sum(self.durations.values()) * 1000:.0f}ms sequential"
+        )
+
+    def log(self) -> None:
+        logging.info(self.summary())
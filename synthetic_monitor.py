@@ -0,0 +1,64 @@
+# synthetic_monitor.py - Camera-free stand-in for DrowsinessModel that emits steady telemetry and on-demand alerts (load tests, demos)
+import asyncio
+import logging
+import random
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SyntheticMonitor:
+    """
+    Same `start()` contract as DrowsinessModel: telemetry every frame at
+    `fps`, a blank annotated frame to `frame_sink` when one is attached,
+    and Hadi/Huda callbacks fired only through `inject()`.
+    """
+
+    def __init__(self, camera_index: int = 0, fps: float = 15.0, width: int = 640, height: int = 480):
+        self.camera_index = camera_index
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.running = False
+        self.frame_sink: Optional[Callable[[Any], None]] = None
+        self._callbacks = {}
+        self._frame = None
+
+    def _blank_frame(self) -> Any:
+        if self._frame is None:
+            import numpy as np
+
+            self._frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        return self._frame
+
+    def inject(self, kind: str = "hadi") -> bool:
+        """Fire the callback the real monitor would at an escalation ("hadi" or "huda")."""
+        callback = self._callbacks.get(kind)
+        if callback is None:
+            return False
+        asyncio.get_running_loop().create_task(callback())
+        return True
+
+    async def start(self, hadi_callback=None, huda_callback=None, telemetry_callback=None):
+        self.running = True
+        self._callbacks = {kind: cb for kind, cb in (("hadi", hadi_callback), ("huda", huda_callback)) if cb}
+        rng = random.Random(self.camera_index)
+        period = 1.0 / self.fps
+        logger.info("Synthetic monitor started on camera %s at %.0f fps", self.camera_index, self.fps)
+        try:
+            while self.running:
+                if telemetry_callback:
+                    x, y = rng.randint(200, 260), rng.randint(120, 160)
+                    telemetry_callback({
+                        "eyes": "open",
+                        "closed_for": 0.0,
+                        "faces": [[x, y, 180, 180]],
+                        "hadi_active": False,
+                        "alarm": False,
+                    })
+                if self.frame_sink is not None:
+                    self.frame_sink(self._blank_frame())
+                await asyncio.sleep(period)
+        finally:
+            self._callbacks = {}
+            logger.info("Synthetic monitor stopped on camera %s", self.camera_index)
@@ -0,0 +1,91 @@
+# test_alert_audio.py - Test loading, rendering, caching and framing of canned alert audio
+import asyncio
+import os
+
+from alert_audio import FRAME_MS, AlertAudioCache
+
+
+class FakeFrame:
+    def __init__(self, data, sample_rate=16000, num_channels=1):
+        self.data, self.sample_rate, self.num_channels = data, sample_rate, num_channels
+
+
+class FakeEvent:
+    def __init__(self, frame):
+        self.frame = frame
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._chunks:
+            raise StopAsyncIteration
+        return FakeEvent(FakeFrame(self._chunks.pop(0)))
+
+    async def aclose(self):
+        pass
+
+
+class FakeTTS:
+    def __init__(self):
+        self.texts = []
+
+    def synthesize(self, text):
+        self.texts.append(text)
+        return FakeStream([b"\x01\x00" * 320, b"\x02\x00" * 100])
+
+
+class FakeSession:
+    def __init__(self):
+        self.said = []
+
+    def say(self, text, audio=None, allow_interruptions=True):
+        self.said.append((text, audio, allow_interruptions))
+
+
+def test_renders_once_then_loads_from_disk(tmp_path):
+    tts = FakeTTS()
+    cache = AlertAudioCache("Ayan", "Aoede", tts=tts, directory=str(tmp_path))
+    asyncio.run(cache.prepare())
+    assert tts.texts[0] == "Ayan! You're losing focus. Keep your eyes open and stay alert!"
+    assert all(cache.has(key) for key in cache.phrases)
+    assert os.path.exists(cache.path_for("hadi_wake"))
+
+    reloaded = AlertAudioCache("Ayan", "Aoede", tts=None, directory=str(tmp_path))
+    asyncio.run(reloaded.prepare())
+    assert reloaded.has("hadi_wake")
+    assert reloaded._audio["hadi_wake"] == cache._audio["hadi_wake"]
+
+
+def test_editing_a_phrase_invalidates_its_file(tmp_path):
+    a = AlertAudioCache("Ayan", "Aoede", directory=str(tmp_path), phrases={"hadi_wake": "Wake up, {name}!"})
+    b = AlertAudioCache("Ayan", "Aoede", directory=str(tmp_path), phrases={"hadi_wake": "Eyes open, {name}!"})
+    assert a.path_for("hadi_wake") != b.path_for("hadi_wake")
+
+
+def test_chunks_are_frame_sized(tmp_path):
+    cache = AlertAudioCache("Ayan", "Aoede", tts=FakeTTS(), directory=str(tmp_path))
+    asyncio.run(cache.prepare())
+    chunks = list(cache.chunks("hadi_wake"))
+    per_frame = 16000 * FRAME_MS // 1000
+    assert [samples for _, _, _, samples in chunks] == [per_frame, 420 - per_frame]
+    assert b"".join(c for c, _, _, _ in chunks) == cache._audio["hadi_wake"][0]
+
+
+def test_play_falls_back_when_not_ready(tmp_path):
+    session = FakeSession()
+    cache = AlertAudioCache("Ayan", "Aoede", tts=None, directory=str(tmp_path))
+    asyncio.run(cache.prepare())
+    assert not cache.play(session, "hadi_wake")
+
+    cache = AlertAudioCache("Ayan", "Aoede", tts=FakeTTS(), directory=str(tmp_path))
+    asyncio.run(cache.prepare())
+    assert cache.play(session, "hadi_wake")
+    text, audio, interruptible = session.said[0]
+    assert text.startswith("Ayan!") and audio is not None and not interruptible
+    assert hasattr(audio, "__aiter__")  # frames are streamed to session.say
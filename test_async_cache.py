@@ -0,0 +1,103 @@
+# test_async_cache.py - Test TTL expiry, LRU bound, single-flight and stale-while-revalidate
+import asyncio
+
+from async_cache import AsyncTTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_concurrent_misses_share_one_fetch():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "London: +12C"
+
+    async def run():
+        cache = AsyncTTLCache(ttl=600)
+        results = await asyncio.gather(*(cache.get_or_fetch("london", fetch) for _ in range(10)))
+        assert results == ["London: +12C"] * 10
+
+    asyncio.run(run())
+    assert calls == 1
+
+
+def test_ttl_expiry_and_stale_while_revalidate():
+    clock = FakeClock()
+    values = iter(["v1", "v2", "v3"])
+
+    async def fetch():
+        return next(values)
+
+    lookups = []
+
+    async def run():
+        cache = AsyncTTLCache(ttl=10, stale_ttl=20, on_lookup=lookups.append, clock=clock)
+        assert await cache.get_or_fetch("k", fetch) == "v1"
+
+        clock.now = 5  # fresh
+        assert await cache.get_or_fetch("k", fetch) == "v1"
+
+        clock.now = 15  # stale: old value now, refresh in background
+        assert await cache.get_or_fetch("k", fetch) == "v1"
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert cache.peek("k") == "v2"
+
+        clock.now = 100  # past stale window: blocking fetch
+        assert await cache.get_or_fetch("k", fetch) == "v3"
+        assert cache.stats()["stale_hits"] == 1
+
+    asyncio.run(run())
+    assert lookups == ["miss", "hit", "stale", "miss"]
+
+
+def test_lru_bound():
+    async def run():
+        cache = AsyncTTLCache(ttl=60, maxsize=2)
+        for key in ("a", "b"):
+            await cache.get_or_fetch(key, lambda key=key: asyncio.sleep(0, result=key))
+        await cache.get_or_fetch("a", lambda: asyncio.sleep(0, result="a"))  # touch a
+        await cache.get_or_fetch("c", lambda: asyncio.sleep(0, result="c"))
+        assert cache.peek("b") is None
+        assert cache.peek("a") == "a" and cache.peek("c") == "c"
+
+    asyncio.run(run())
+
+
+def test_failures_are_not_cached():
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise ConnectionError("upstream down")
+        return "ok"
+
+    async def run():
+        cache = AsyncTTLCache(ttl=60)
+        try:
+            await cache.get_or_fetch("k", flaky)
+            raise AssertionError("expected ConnectionError")
+        except ConnectionError:
+            pass
+        assert await cache.get_or_fetch("k", flaky) == "ok"
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_concurrent_misses_share_one_fetch()
+    test_ttl_expiry_and_stale_while_revalidate()
+    test_lru_bound()
+    test_failures_are_not_cached()
+    print("Async TTL cache: OK")
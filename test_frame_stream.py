@@ -0,0 +1,111 @@
+# test_frame_stream.py - Test encode-once sharing, frame skipping and viewer stats of the video stream
+import asyncio
+
+from frame_stream import FrameStream
+
+
+class CountingEncoder:
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    def __call__(self, frame):
+        if self.delay:
+            import time
+            time.sleep(self.delay)
+        self.calls.append(frame)
+        return f"jpeg-{frame}".encode()
+
+
+async def collect(stream, name, count, delay=0.0):
+    received = []
+    async for frame in stream.frames(name):
+        received.append(frame)
+        if delay:
+            await asyncio.sleep(delay)
+        if len(received) == count:
+            break
+    return received
+
+
+def test_nothing_is_encoded_without_viewers():
+    encoder = CountingEncoder()
+
+    async def run():
+        stream = FrameStream(encode=encoder)
+        stream.start()
+        for i in range(5):
+            stream.submit(i)
+        await asyncio.sleep(0.05)
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert encoder.calls == []
+
+
+def test_each_frame_is_encoded_once_for_all_viewers():
+    encoder = CountingEncoder()
+
+    async def run():
+        stream = FrameStream(encode=encoder)
+        stream.start()
+        viewers = [asyncio.create_task(collect(stream, f"v{i}", 3)) for i in range(4)]
+        await asyncio.sleep(0.01)
+        for i in range(3):
+            stream.submit(i)
+            await asyncio.sleep(0.02)
+        results = await asyncio.wait_for(asyncio.gather(*viewers), 1)
+        await stream.aclose()
+        return results
+
+    results = asyncio.run(run())
+    assert encoder.calls == [0, 1, 2]
+    for received in results:
+        assert [f.jpeg for f in received] == [b"jpeg-0", b"jpeg-1", b"jpeg-2"]
+        assert received[0].jpeg is results[0][0].jpeg  # shared, not copied
+    assert results[0][0].part.startswith(b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: 6\r\n\r\njpeg-0")
+
+
+def test_slow_viewer_skips_to_newest_frame():
+    encoder = CountingEncoder()
+
+    async def run():
+        stream = FrameStream(encode=encoder)
+        stream.start()
+        fast = asyncio.create_task(collect(stream, "fast", 10))
+        slow = asyncio.create_task(collect(stream, "slow", 2, delay=0.15))
+        await asyncio.sleep(0.01)
+        for i in range(10):
+            stream.submit(i)
+            await asyncio.sleep(0.02)
+        fast_frames = await asyncio.wait_for(fast, 1)
+        stats = {v["viewer"]: v for v in stream.stats()["viewers"]}
+        slow_frames = await asyncio.wait_for(slow, 1)
+        await stream.aclose()
+        return fast_frames, slow_frames, stats
+
+    fast_frames, slow_frames, stats = asyncio.run(run())
+    assert [f.seq for f in fast_frames] == list(range(1, 11))
+    assert slow_frames[0].seq == 1 and slow_frames[1].seq > 2
+    assert stats["slow"]["skipped"] > 0
+    assert stats["slow"]["lag_ms"] >= 100
+
+
+def test_encoder_drops_stale_raw_frames():
+    encoder = CountingEncoder(delay=0.05)
+
+    async def run():
+        stream = FrameStream(encode=encoder)
+        stream.start()
+        viewer = asyncio.create_task(collect(stream, "v", 100))
+        await asyncio.sleep(0.01)
+        for i in range(10):
+            stream.submit(i)
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.15)
+        await stream.aclose()
+        return await asyncio.wait_for(viewer, 1)
+
+    received = asyncio.run(run())
+    assert len(encoder.calls) < 10
+    assert encoder.calls[-1] == 9 and received[-1].jpeg == b"jpeg-9"
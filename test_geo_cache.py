@@ -0,0 +1,76 @@
+# test_geo_cache.py - Test geohash helpers and the nearby-places cell cache
+import asyncio
+
+import numpy as np
+
+from geo_cache import GeoPlacesCache, geohash_bbox, geohash_block, geohash_encode, haversine_km
+
+
+def test_geohash_roundtrip():
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bbox("u4pruydqqvj")
+    assert lat_lo <= 57.64911 <= lat_hi and lng_lo <= 10.40744 <= lng_hi
+    block = geohash_block(geohash_encode(40.7128, -74.0060, 5))
+    assert len(block) == 9 and len(set(block)) == 9
+
+
+def test_haversine():
+    d = haversine_km(40.7128, -74.0060, np.array([34.0522, 40.7128]), np.array([-118.2437, -74.0060]))
+    assert abs(d[0] - 3936) < 5
+    assert d[1] == 0
+
+
+def test_warm_cells_skip_upstream():
+    calls = []
+
+    async def fetch_cell(lat, lng, place_type, radius_m, background=False):
+        calls.append((round(lat, 3), round(lng, 3)))
+        return [{"place_id": f"{lat:.4f},{lng:.4f}", "name": "Shell", "address": "", "rating": 4.0,
+                 "lat": lat, "lng": lng}]
+
+    async def run():
+        cache = GeoPlacesCache(fetch_cell)
+        first = await cache.query(40.7128, -74.0060, "gas_station")
+        assert len(calls) == 1  # only the centre cell blocks the caller
+        await asyncio.gather(*cache._background)
+        assert len(calls) == 9  # neighbours warmed in the background
+
+        # A few hundred metres down the road: answered entirely from cache
+        second = await cache.query(40.7150, -74.0040, "gas_station", radius_km=10)
+        assert len(calls) == 9
+        assert first and second
+        assert [p["distance_km"] for p in second] == sorted(p["distance_km"] for p in second)
+
+    asyncio.run(run())
+
+
+def test_expired_cells_answer_during_outage():
+    clock = {"now": 0.0}
+    up = {"ok": True}
+
+    async def fetch_cell(lat, lng, place_type, radius_m, background=False):
+        if not up["ok"]:
+            raise ConnectionError("Places API down")
+        return [{"place_id": f"{lat:.4f},{lng:.4f}", "name": "Shell", "address": "", "rating": 4.0,
+                 "lat": lat, "lng": lng}]
+
+    async def run():
+        cache = GeoPlacesCache(fetch_cell, ttl=60, stale_ttl=600)
+        cache.cells._clock = lambda: clock["now"]
+        assert await cache.query(40.7128, -74.0060, "gas_station")
+        await asyncio.gather(*cache._background, return_exceptions=True)
+
+        up["ok"] = False
+        clock["now"] = 300  # past the TTL, within the stale window
+        assert await cache.query(40.7128, -74.0060, "gas_station")
+        await asyncio.gather(*cache._background, return_exceptions=True)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_geohash_roundtrip()
+    test_haversine()
+    test_warm_cells_skip_upstream()
+    test_expired_cells_answer_during_outage()
+    print("Geo cache: OK")
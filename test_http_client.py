@@ -0,0 +1,85 @@
+# test_http_client.py - Test the shared HTTP client against a local stub server
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from http_client import SharedHttpClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    connections = set()
+
+    def do_GET(self):
+        StubHandler.connections.add(self.client_address)
+        if self.path.startswith("/slow"):
+            time.sleep(0.5)
+        body = b"London: +12C"
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client gave up (timeout test)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_connections_are_reused():
+    server, base_url = start_stub_server()
+    StubHandler.connections.clear()
+
+    async def run():
+        client = SharedHttpClient(http2=False)
+        try:
+            for _ in range(5):
+                response = await client.get(f"{base_url}/weather")
+                assert response.status_code == 200
+                assert response.text == "London: +12C"
+        finally:
+            await client.aclose()
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.shutdown()
+
+    # Five sequential requests should ride one pooled connection
+    assert len(StubHandler.connections) == 1
+
+
+def test_read_timeout():
+    server, base_url = start_stub_server()
+
+    async def run():
+        client = SharedHttpClient(read_timeout=0.1, http2=False)
+        try:
+            await client.get(f"{base_url}/slow")
+        finally:
+            await client.aclose()
+
+    try:
+        asyncio.run(run())
+        raise AssertionError("expected a read timeout")
+    except httpx.ReadTimeout:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_connections_are_reused()
+    test_read_timeout()
+    print("Shared HTTP client: OK")
@@ -0,0 +1,62 @@
+# test_intent_router.py - Accuracy set and edge cases for the compiled intent router
+from intent_router import HashedLinearClassifier, IntentRouter
+
+LABELLED = [
+    ("What's the engine temperature?", "HADI"),
+    ("Find me a route to Boston", "HADI"),
+    ("Show the map", "HADI"),
+    ("Is my tire pressure okay?", "HADI"),
+    ("The check engine light is on", "HADI"),
+    ("How much fuel is left", "HADI"),
+    ("Run a diagnostic on the brakes", "HADI"),
+    ("Where is the nearest gas station", "HADI"),
+    ("Hi there", "HUDA"),
+    ("Hello Huda, how are you?", "HUDA"),
+    ("I'm feeling tired", "HUDA"),
+    ("Play some music", "HUDA"),
+    ("Tell me a joke", "HUDA"),
+    ("Who is Hadi?", "HUDA"),
+    ("Good   morning!", "HUDA"),
+    ("What's the weather like in Chicago", "HUDA"),
+    # Substring traps that the old `k in text` scan got wrong
+    ("This highway is long", None),
+    ("Turn the amplifier up", None),
+    ("Something is rattling", None),
+    ("Okay", None),
+]
+
+
+def test_accuracy_set():
+    router = IntentRouter()
+    wrong = [(text, expected, router.route(text)) for text, expected in LABELLED if router.route(text) != expected]
+    assert not wrong
+
+
+def test_multi_word_phrase_outweighs_single_words():
+    router = IntentRouter()
+    scores = router.scores("hey, the check engine light came on")
+    assert scores["HADI"] > scores["HUDA"] > 0
+    assert router.route("hey, the check engine light came on") == "HADI"
+
+
+def test_ties_go_to_first_agent():
+    router = IntentRouter({"A": {"ping": 1.0}, "B": {"pong": 1.0}})
+    assert router.route("ping pong") == "A"
+
+
+def test_handles_hundreds_of_intents():
+    intents = {f"AGENT{i}": {f"intent{i}word{j}": 1.0 for j in range(5)} for i in range(300)}
+    router = IntentRouter(intents)
+    assert router.route("please do intent217word3 now") == "AGENT217"
+    assert router.route("intent2word") is None
+
+
+def test_classifier_fallback_for_unmatched_text():
+    classifier = HashedLinearClassifier(["HADI", "HUDA"]).fit(
+        ["my car is making a weird noise", "the car shakes at idle", "i miss my family", "i had a rough day"],
+        ["HADI", "HADI", "HUDA", "HUDA"],
+    )
+    router = IntentRouter(classifier=classifier)
+    assert router.route("the car is making a noise") == "HADI"
+    assert router.route("rough day, miss my family") == "HUDA"
+    assert router.route("Show the map") == "HADI"  # keywords still win when they match
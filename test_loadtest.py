@@ -0,0 +1,80 @@
+# test_loadtest.py - Test the load-test stats, stub upstreams and synthetic drowsiness injection
+import asyncio
+import json
+import random
+
+import httpx
+
+from loadtest import Stats, fill_path, percentile, stub_app
+from synthetic_monitor import SyntheticMonitor
+from ws_hub import MonitorHub
+
+
+def test_percentiles_and_report():
+    stats = Stats()
+    for ms in range(1, 101):
+        stats.record("GET /api/status", ms / 1000)
+    stats.error("GET /api/status", "HTTP 500")
+    stats.counts["alerts_injected"] = 3
+
+    assert percentile([], 50) == 0.0
+    assert percentile(stats.latencies["GET /api/status"], 50) == 0.051
+    report = stats.report(elapsed=10.0)
+    row = next(line for line in report.splitlines() if line.startswith("GET /api/status"))
+    assert row.split()[3:7] == ["10.0", "1", "1.0%", "51.0"]
+    assert "1 x HTTP 500" in report and "alerts_injected" in report
+
+
+def test_fill_path_randomises_position_and_query():
+    path = fill_path("/api/maps/nearby?lat={lat}&lng={lng}&q={query}", random.Random(1), 0.05)
+    params = dict(part.split("=") for part in path.split("?")[1].split("&"))
+    assert abs(float(params["lat"]) - 40.7128) <= 0.05
+    assert abs(float(params["lng"]) + 74.0060) <= 0.05
+    assert " " not in params["q"]
+
+
+def test_stub_upstreams_match_the_google_payloads():
+    async def run():
+        transport = httpx.ASGITransport(app=stub_app(latency=0))
+        async with httpx.AsyncClient(transport=transport, base_url="http://stub") as client:
+            videos = (await client.get("/youtube/v3/search", params={"q": "lofi", "maxResults": 3})).json()
+            places = (await client.get("/maps/api/place/nearbysearch/json",
+                                       params={"location": "40.7,-74.0", "type": "gas_station"})).json()
+            route = (await client.get("/maps/api/directions/json", params={"origin": "A", "destination": "B"})).json()
+        return videos, places, route
+
+    videos, places, route = asyncio.run(run())
+    assert [item["id"]["videoId"] for item in videos["items"]] == ["stub0000", "stub0001", "stub0002"]
+    assert places["status"] == "OK" and places["results"][0]["geometry"]["location"]["lat"] == 40.7
+    assert route["routes"][0]["legs"][0]["duration"]["text"] == "18 mins"
+
+
+def test_stub_error_rate_returns_503():
+    async def run():
+        transport = httpx.ASGITransport(app=stub_app(latency=0, error_rate=1.0))
+        async with httpx.AsyncClient(transport=transport, base_url="http://stub") as client:
+            return (await client.get("/youtube/v3/search")).status_code
+
+    assert asyncio.run(run()) == 503
+
+
+def test_synthetic_monitor_streams_telemetry_and_injects_alerts():
+    received = []
+
+    async def send(message):
+        frame = json.loads(message)
+        received.extend(frame["events"] if frame["type"] == "batch" else [frame])
+
+    async def run():
+        hub = MonitorHub(lambda camera: SyntheticMonitor(camera_index=camera, fps=50), tick=0.02)
+        await hub.subscribe(send)
+        await asyncio.sleep(0.1)
+        assert hub.monitor(0).inject("hadi")
+        assert not hub.monitor(0).inject("unknown")
+        await asyncio.sleep(0.1)
+        await hub.aclose()
+
+    asyncio.run(run())
+    kinds = [event["type"] for event in received]
+    assert kinds.count("hadi_alert") == 1
+    assert kinds.count("telemetry") >= 3
@@ -0,0 +1,94 @@
+# test_local_memory.py - Test the offline memory store: add/search/get_all, dedupe, persistence, backend choice
+import asyncio
+import time
+
+import local_memory
+from local_memory import LocalMemoryClient, get_memory_client
+
+
+def test_search_ranks_relevant_memories_first(tmp_path):
+    async def run():
+        client = LocalMemoryClient(str(tmp_path / "m.sqlite3"))
+        await client.add([
+            {"role": "user", "content": "I really like Linkin Park"},
+            {"role": "assistant", "content": "That is a good choice."},
+            {"role": "user", "content": "My car has a slow leak in the front left tire"},
+            {"role": "user", "content": "I feel stressed when traffic is heavy"},
+        ], user_id="Ayan")
+        try:
+            return await client.search("front tire pressure", user_id="Ayan", top_k=2), await client.get_all(user_id="Ayan")
+        finally:
+            await client.close()
+
+    hits, everything = asyncio.run(run())
+    assert len(everything) == 3  # assistant turns are not stored
+    assert len(hits) == 2
+    assert "tire" in hits[0]["memory"]
+    assert hits[0]["score"] >= hits[1]["score"]
+    assert set(hits[0]) == {"id", "memory", "user_id", "created_at", "updated_at", "score"}
+
+
+def test_near_duplicate_refreshes_existing_memory(tmp_path):
+    async def run():
+        client = LocalMemoryClient(str(tmp_path / "m.sqlite3"))
+        first = await client.add("I really like Linkin Park", user_id="Ayan")
+        second = await client.add("I really like Linkin Park!", user_id="Ayan")
+        try:
+            return first, second, await client.get_all(user_id="Ayan")
+        finally:
+            await client.close()
+
+    first, second, everything = asyncio.run(run())
+    assert first["results"][0]["event"] == "ADD"
+    assert second["results"][0] == {"id": first["results"][0]["id"], "memory": "I really like Linkin Park!", "event": "UPDATE"}
+    assert len(everything) == 1
+
+
+def test_memories_persist_and_stay_per_user(tmp_path):
+    path = str(tmp_path / "m.sqlite3")
+
+    async def write():
+        client = LocalMemoryClient(path)
+        await client.add("My favourite snack is dates", user_id="Ayan")
+        await client.close()
+
+    async def read():
+        client = LocalMemoryClient(path)
+        try:
+            return await client.search("snack", user_id="Ayan"), await client.search("snack", user_id="Someone")
+        finally:
+            await client.close()
+
+    asyncio.run(write())
+    mine, theirs = asyncio.run(read())
+    assert [m["memory"] for m in mine] == ["My favourite snack is dates"]
+    assert theirs == []
+
+
+def test_search_is_fast_with_thousands_of_memories(tmp_path):
+    async def run():
+        client = LocalMemoryClient(str(tmp_path / "m.sqlite3"))
+        client._users["Ayan"] = local_memory._UserMemories([], local_memory.np.zeros((0, client.dim), dtype="float32"))
+        rows = [f"memory number {i} about topic {i % 97}" for i in range(5000)]
+        client._users["Ayan"].rows = [{"id": str(i), "memory": m, "_updated": float(i)} for i, m in enumerate(rows)]
+        client._users["Ayan"].vectors = local_memory.np.stack([local_memory.embed(m) for m in rows])
+        await client.search("topic 42", user_id="Ayan")
+        start = time.perf_counter()
+        for _ in range(20):
+            hits = await client.search("topic 42", user_id="Ayan", top_k=8)
+        return (time.perf_counter() - start) / 20, hits
+
+    per_query, hits = asyncio.run(run())
+    assert len(hits) == 8
+    assert per_query < 0.01
+
+
+def test_backend_selection(monkeypatch, tmp_path):
+    monkeypatch.setenv("MEMORY_DB_PATH", str(tmp_path / "m.sqlite3"))
+    monkeypatch.setenv("MEMORY_BACKEND", "local")
+    monkeypatch.setenv("MEM0_API_KEY", "set-but-ignored")
+    assert isinstance(get_memory_client(), LocalMemoryClient)
+
+    monkeypatch.delenv("MEMORY_BACKEND")
+    monkeypatch.delenv("MEM0_API_KEY")
+    assert isinstance(get_memory_client(), LocalMemoryClient)
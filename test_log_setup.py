@@ -0,0 +1,110 @@
+# test_log_setup.py - Test truncation, rate limiting and the queued JSON log pipeline
+import io
+import json
+import logging
+import queue
+
+import log_setup
+from log_setup import JsonFormatter, NonBlockingQueueHandler, RateLimitFilter, truncate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_record(msg, *args, name="test", level=logging.INFO, **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_truncate_only_cuts_long_text():
+    assert truncate("short", 10) == "short"
+    assert truncate("x" * 25, 10) == "xxxxxxxxxx…(+15 chars)"
+    assert truncate(b"y" * 12, 10) == "yyyyyyyyyy…(+2 chars)"
+    assert truncate({"a": 1}, 1) == {"a": 1}
+
+
+def test_rate_limit_per_template_and_reports_suppressed():
+    clock = FakeClock()
+    limiter = RateLimitFilter(burst=2, period=10, clock=clock)
+    results = [limiter.filter(make_record("frame %d", i)) for i in range(5)]
+    assert results == [True, True, False, False, False]
+    assert limiter.filter(make_record("other line"))
+
+    clock.now = 10.0
+    record = make_record("frame %d", 99)
+    assert limiter.filter(record)
+    assert record.suppressed == 3
+
+
+def test_rate_limit_never_drops_warnings():
+    limiter = RateLimitFilter(burst=1, period=10, clock=FakeClock())
+    assert all(limiter.filter(make_record("camera %d lost", 0, level=logging.WARNING)) for _ in range(5))
+    assert all(limiter.filter(make_record("upstream down", level=logging.ERROR)) for _ in range(5))
+
+
+def test_queue_handler_truncates_before_formatting_and_never_blocks():
+    q = queue.Queue(maxsize=1)
+    handler = NonBlockingQueueHandler(q, max_field=8)
+    handler.handle(make_record("result %s", "r" * 100, payload="p" * 100))
+    handler.handle(make_record("second"))  # queue full: dropped, not waited on
+
+    prepared = q.get_nowait()
+    assert prepared.args is None
+    assert prepared.getMessage() == "result rrrrrrrr…(+92 chars)"
+    assert prepared.payload == "pppppppp…(+92 chars)"
+    assert handler.dropped == 1
+
+
+def test_json_formatter_includes_extra_fields():
+    record = make_record("Tool %s returned", "search", tool="search", suppressed=2)
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["msg"] == "Tool search returned"
+    assert entry["level"] == "INFO" and entry["logger"] == "test"
+    assert entry["tool"] == "search" and entry["suppressed"] == 2
+
+
+def test_json_formatter_emits_tool_args_logged_at_info():
+    stream = io.StringIO()
+    logger = logging.getLogger("test-tool-args")
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        logger.info("Invoking tool %s", "lookup", extra={"tool": "lookup", "tool_args": '{"q": "fuel"}'})
+    finally:
+        logger.removeHandler(handler)
+    entry = json.loads(stream.getvalue())
+    assert entry["msg"] == "Invoking tool lookup"
+    assert entry["tool"] == "lookup" and entry["tool_args"] == '{"q": "fuel"}'
+
+
+def test_setup_logging_writes_json_lines_from_background_thread():
+    stream = io.StringIO()
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    try:
+        log_setup.setup_logging(level="INFO", fmt="json", stream=stream)
+        logging.getLogger("demo").info("hello %s", "world", extra={"camera": 0})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("demo").exception("failed")
+        log_setup.shutdown_logging()  # flushes the queue
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert lines[0]["msg"] == "hello world" and lines[0]["camera"] == 0
+        assert lines[1]["level"] == "ERROR" and "ValueError: boom" in lines[1]["exc"]
+    finally:
+        log_setup.shutdown_logging()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
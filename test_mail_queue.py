@@ -0,0 +1,132 @@
+# test_mail_queue.py - Test the outbound mail queue against a local aiosmtpd server
+import asyncio
+import socket
+import time
+
+import pytest
+
+from mail_queue import MailQueue, MailQueueFull, OutboundMessage, STATUS_FAILED, STATUS_SENT
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_smtp_server():
+    aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    return controller, handler
+
+
+def make_queue(port: int, **kwargs) -> MailQueue:
+    return MailQueue(host="127.0.0.1", port=port, sender="hadi@example.com", use_starttls=False, **kwargs)
+
+
+def test_batch_reuses_one_connection():
+    controller, handler = start_smtp_server()
+
+    async def run():
+        queue = make_queue(controller.port)
+        ids = [queue.enqueue(f"driver{i}@example.com", "Rest stop", "Take a break") for i in range(5)]
+        assert all(queue.status(i)["status"] == "queued" for i in ids)
+        await queue.stop(drain=True)
+        return [queue.status(i)["status"] for i in ids]
+
+    try:
+        statuses = asyncio.run(run())
+    finally:
+        controller.stop()
+
+    assert statuses == [STATUS_SENT] * 5
+    assert len(handler.messages) == 5
+    assert len(handler.sessions) == 1
+
+
+def test_reconnects_after_idle_timeout():
+    controller, handler = start_smtp_server()
+
+    async def run():
+        queue = make_queue(controller.port, idle_timeout=0.1)
+        first = queue.enqueue("a@example.com", "One", "first")
+        await queue._queue.join()
+        await asyncio.sleep(0.3)  # connection closed while idle
+        second = queue.enqueue("b@example.com", "Two", "second")
+        await queue.stop(drain=True)
+        return queue.status(first)["status"], queue.status(second)["status"]
+
+    try:
+        assert asyncio.run(run()) == (STATUS_SENT, STATUS_SENT)
+    finally:
+        controller.stop()
+    assert len(handler.sessions) == 2
+
+
+def test_full_queue_rejects():
+    async def run():
+        queue = make_queue(free_port(), queue_size=1, idle_timeout=10)
+        queue._ensure_worker()
+        queue._worker.cancel()  # nothing drains the queue
+        queue.enqueue("a@example.com", "One", "first")
+        with pytest.raises(MailQueueFull):
+            queue.enqueue("b@example.com", "Two", "second")
+
+    asyncio.run(run())
+
+
+def test_connection_error_fails_rest_of_batch_fast():
+    queue = make_queue(free_port(), connect_timeout=1.0)  # nothing listening
+    connects = 0
+    connect = queue._connect
+
+    def counting_connect():
+        nonlocal connects
+        connects += 1
+        return connect()
+
+    queue._connect = counting_connect
+    batch = [OutboundMessage("hadi@example.com", [f"{i}@example.com"], "x") for i in range(3)]
+    results = queue._deliver_batch(batch)
+    assert connects == 1
+    assert all(error for _, error in results)
+    assert all(error.startswith("not attempted") for _, error in results[1:])
+
+
+def test_stop_reports_mail_left_after_drain_timeout():
+    async def run():
+        queue = make_queue(free_port(), batch_size=1, drain_timeout=0.1, connect_timeout=0.2)
+        # A server that never answers: the first batch blocks the smtp thread
+        queue._deliver_batch = lambda batch: time.sleep(0.5) or [(m.id, None) for m in batch]
+        ids = [queue.enqueue(f"{i}@example.com", "Hi", "x") for i in range(2)]
+        await asyncio.sleep(0)
+        started = time.monotonic()
+        unsent = await queue.stop(drain=True)
+        return ids, unsent, time.monotonic() - started, [queue.status(i)["status"] for i in ids]
+
+    ids, unsent, elapsed, statuses = asyncio.run(run())
+    assert sorted(unsent) == sorted(ids)
+    assert statuses == [STATUS_FAILED, STATUS_FAILED]
+    assert elapsed < 0.45
+
+
+if __name__ == "__main__":
+    test_batch_reuses_one_connection()
+    test_reconnects_after_idle_timeout()
+    test_full_queue_rejects()
+    test_connection_error_fails_rest_of_batch_fast()
+    test_stop_reports_mail_left_after_drain_timeout()
+    print("Mail queue: OK")
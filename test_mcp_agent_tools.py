@@ -0,0 +1,48 @@
+# test_mcp_agent_tools.py - Test that wrapped MCP tools log and invoke with INFO logging enabled
+import asyncio
+import io
+import json
+import logging
+
+import pytest
+
+pytest.importorskip("livekit.agents")
+pytest.importorskip("mcp")
+
+from log_setup import JsonFormatter
+from mcp_client.agent_tools import MCPToolsIntegration
+from mcp_client.util import FunctionTool
+
+
+def test_tool_impl_logs_arguments_at_info():
+    calls = []
+
+    async def on_invoke_tool(context, input_json):
+        calls.append(json.loads(input_json))
+        return "3 fuel stops"
+
+    tool = FunctionTool(
+        name="find_fuel",
+        description="Find fuel stops",
+        params_json_schema={"properties": {"city": {"type": "string"}}, "required": ["city"]},
+        on_invoke_tool=on_invoke_tool,
+    )
+    tool_impl = MCPToolsIntegration._build_tool_impl(tool)
+
+    stream = io.StringIO()
+    logger = logging.getLogger("mcp-agent-tools")
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    saved_level = logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        assert asyncio.run(tool_impl(city="Reno")) == "3 fuel stops"
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(saved_level)
+
+    assert calls == [{"city": "Reno"}]
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert entries[0]["tool"] == "find_fuel" and entries[0]["tool_args"] == '{"city": "Reno"}'
+    assert entries[1]["result"] == "3 fuel stops"
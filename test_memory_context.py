@@ -0,0 +1,46 @@
+# test_memory_context.py - Test budgeted, ranked and deduplicated memory injection
+from memory_context import build_memory_context, estimate_tokens
+
+NOW = 1_700_000_000.0
+DAY = 86400.0
+
+
+def test_relevance_and_recency_order_lines():
+    memories = [
+        {"memory": "Likes Linkin Park", "updated_at": NOW - 400 * DAY, "score": 0.2},
+        {"memory": "Front left tire leaks slowly", "updated_at": NOW - 2 * DAY, "score": 0.9},
+        {"memory": "Prefers highways over city roads", "updated_at": NOW - DAY, "score": 0.2},
+    ]
+    text, stats = build_memory_context(memories, "Ayan", now=NOW)
+    lines = text.splitlines()
+    assert lines[0] == "User is Ayan. What you remember about them:"
+    assert lines[1].startswith("- Front left tire leaks slowly (")
+    assert lines[2].startswith("- Prefers highways")
+    assert stats["kept"] == 3 and stats["duplicates"] == 0
+    assert "{" not in text  # compact lines, no JSON
+
+
+def test_near_duplicates_are_dropped():
+    memories = [
+        {"memory": "I really like Linkin Park", "updated_at": NOW, "score": 0.8},
+        {"memory": "I really like  linkin park!", "updated_at": NOW - DAY, "score": 0.7},
+    ]
+    text, stats = build_memory_context(memories, "Ayan", now=NOW)
+    assert text.count("Linkin Park") == 1
+    assert stats["duplicates"] == 1
+
+
+def test_budget_caps_tokens_and_reports_drops():
+    memories = [{"memory": f"Memory number {i} about topic{i} place{i} person{i} item{i}", "updated_at": NOW - i * DAY} for i in range(50)]
+    text, stats = build_memory_context(memories, "Ayan", budget_tokens=100, now=NOW)
+    assert estimate_tokens(text) <= 100 + stats["kept"]  # newline joins are not budgeted
+    assert stats["tokens_used"] <= 100
+    assert stats["kept"] + stats["over_budget"] == 50
+    assert stats["over_budget"] > 0 and stats["tokens_dropped"] > 0
+    assert "Memory number 0 " in text  # newest survives
+
+
+def test_iso_dates_and_empty_input():
+    text, _ = build_memory_context([{"memory": "Drinks black coffee", "updated_at": "2024-07-20T01:04:09.123-07:00"}], "Ayan")
+    assert "- Drinks black coffee (2024-07-20)" in text
+    assert build_memory_context([], "Ayan")[0] == ""
@@ -0,0 +1,89 @@
+# test_memory_writer.py - Test incremental, deduplicated memory persistence
+import asyncio
+
+from memory_writer import MemoryWriter
+
+
+class Item:
+    def __init__(self, id, role, content):
+        self.id, self.role, self.content = id, role, content
+
+
+class RecordingClient:
+    def __init__(self, fail_times=0):
+        self.batches = []
+        self.fail_times = fail_times
+
+    async def add(self, messages, user_id):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("memory store unreachable")
+        self.batches.append(list(messages))
+
+
+def test_flushes_only_new_turns_in_batches():
+    items = [Item("m0", "assistant", "User is Ayan. Prior context: ..."), Item("m1", "user", ["Hi ", "Huda"])]
+    client = RecordingClient()
+    writer = MemoryWriter(client, "Ayan", get_items=lambda: items, skip_ids=["m0"], batch_size=2)
+
+    async def run():
+        assert await writer.flush() == 1
+        items.extend([Item("m2", "assistant", "Hey Ayan!"), Item("s", "system", "ignored"),
+                      Item("m3", "user", "Play music"), Item("m4", "assistant", "Sure")])
+        assert await writer.flush() == 3
+        assert await writer.flush() == 0
+
+    asyncio.run(run())
+    assert client.batches == [
+        [{"role": "user", "content": "Hi Huda"}],
+        [{"role": "assistant", "content": "Hey Ayan!"}, {"role": "user", "content": "Play music"}],
+        [{"role": "assistant", "content": "Sure"}],
+    ]
+
+
+def test_truncated_context_does_not_resend():
+    items = [Item("m1", "user", "one"), Item("m2", "user", "two")]
+    client = RecordingClient()
+    writer = MemoryWriter(client, "Ayan", get_items=lambda: items)
+
+    async def run():
+        await writer.flush()
+        items[:] = [Item("m2", "user", "two")]  # older turns dropped from the context
+        await writer.flush()
+        items.append(Item("m3", "user", "three"))
+        await writer.flush()
+
+    asyncio.run(run())
+    assert [m["content"] for batch in client.batches for m in batch] == ["one", "two", "three"]
+
+
+def test_truncated_then_grown_context_keeps_new_turns():
+    items = [Item(f"m{i}", "user", f"turn {i}") for i in range(4)]
+    client = RecordingClient()
+    writer = MemoryWriter(client, "Ayan", get_items=lambda: items)
+
+    async def run():
+        await writer.flush()
+        # Truncated to the last turn, then grown past the old length before the next tick
+        items[:] = items[-1:] + [Item(f"m{i}", "user", f"turn {i}") for i in range(4, 9)]
+        await writer.flush()
+
+    asyncio.run(run())
+    assert [m["content"] for batch in client.batches for m in batch] == [f"turn {i}" for i in range(9)]
+
+
+def test_failed_batch_is_retried_and_shutdown_flushes_tail():
+    items = [Item("m1", "user", "remember my tire is leaking")]
+    client = RecordingClient(fail_times=1)
+    writer = MemoryWriter(client, "Ayan", get_items=lambda: items, interval=0.01)
+
+    async def run():
+        writer.start()
+        await asyncio.sleep(0.05)  # first tick fails, a later one succeeds
+        items.append(Item("m2", "assistant", "Noted"))
+        await writer.aclose()
+
+    asyncio.run(run())
+    sent = [m["content"] for batch in client.batches for m in batch]
+    assert sent == ["remember my tire is leaking", "Noted"]
+    assert writer.saved == 2
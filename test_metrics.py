@@ -0,0 +1,73 @@
+# test_metrics.py - Test the metrics registry and its Prometheus text output
+import urllib.request
+
+import pytest
+
+from metrics import Registry, serve
+
+
+def test_counter_and_gauge_render_with_labels():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ["route"])
+    requests.labels("/a").inc()
+    requests.labels("/a").inc(2)
+    requests.labels('/b"x').inc()
+    temperature = registry.gauge("temperature", "Engine temperature")
+    temperature.set(91.5)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a"} 3' in text
+    assert 'requests_total{route="/b\\"x"} 1' in text
+    assert "# TYPE temperature gauge\ntemperature 91.5" in text
+    assert text.endswith("\n")
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency", ["tool"], buckets=(0.1, 1.0))
+    child = latency.labels("search")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        child.observe(value)
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{tool="search",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{tool="search",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{tool="search",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{tool="search"} 4' in lines
+    assert 'latency_seconds_sum{tool="search"} 3.65' in lines
+
+
+def test_registration_is_idempotent_but_checked():
+    registry = Registry()
+    assert registry.counter("x_total", "X", ["a"]) is registry.counter("x_total", "X", ["a"])
+    with pytest.raises(ValueError):
+        registry.gauge("x_total", "X", ["a"])
+    with pytest.raises(ValueError):
+        registry.counter("x_total", "X", ["a"]).labels("1", "2")
+
+
+def test_collectors_run_before_render_and_failures_are_isolated():
+    registry = Registry()
+    depth = registry.gauge("queue_depth", "Depth", ["camera"])
+    queue = [1, 2, 3]
+
+    def broken():
+        raise RuntimeError("boom")
+
+    registry.on_collect(broken)
+    registry.on_collect(lambda: depth.labels(0).set(len(queue)))
+    assert 'queue_depth{camera="0"} 3' in registry.render()
+    queue.pop()
+    depth.clear()
+    assert 'queue_depth{camera="0"} 2' in registry.render()
+
+
+def test_serve_exposes_metrics_over_http():
+    registry = Registry()
+    registry.counter("served_total", "Served").inc()
+    port = serve(19100, registry=registry)
+    assert port is not None
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=2) as response:
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert "served_total 1" in response.read().decode()
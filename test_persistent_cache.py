@@ -0,0 +1,114 @@
+# test_persistent_cache.py - Test the SQLite response cache: TTLs, stale reads, LRU cap, restarts
+import asyncio
+import os
+
+from persistent_cache import PersistentCache, make_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_ignores_case_whitespace_and_param_order():
+    assert make_key("directions", {"origin": "Boston ", "destination": "new  york"}) == make_key(
+        "directions", {"destination": "New York", "origin": "boston"}
+    )
+
+
+def test_round_trip(tmp_path):
+    async def run():
+        cache = PersistentCache(str(tmp_path / "cache" / "responses.sqlite3"))
+        await cache.set("youtube_search", {"q": "lofi"}, [{"id": "abc"}])
+        try:
+            return await cache.get("youtube_search", {"q": "lofi"}), await cache.get("youtube_search", {"q": "jazz"})
+        finally:
+            await cache.close()
+
+    assert asyncio.run(run()) == ([{"id": "abc"}], None)
+
+
+def test_expired_entries_only_served_when_stale_allowed(tmp_path):
+    clock = FakeClock()
+
+    async def run():
+        cache = PersistentCache(str(tmp_path / "r.sqlite3"), ttls={"directions": 60}, clock=clock)
+        await cache.set("directions", {"origin": "a"}, {"distance": "1 mi"})
+        clock.now += 61
+        try:
+            return (
+                await cache.get("directions", {"origin": "a"}),
+                await cache.get("directions", {"origin": "a"}, allow_stale=True),
+            )
+        finally:
+            await cache.close()
+
+    assert asyncio.run(run()) == (None, {"distance": "1 mi"})
+
+
+def test_evicts_least_recently_used_beyond_cap(tmp_path):
+    clock = FakeClock()
+
+    async def run():
+        cache = PersistentCache(str(tmp_path / "r.sqlite3"), max_entries=2, clock=clock)
+        await cache.set("youtube_search", {"q": "one"}, 1)
+        clock.now += 1
+        await cache.set("youtube_search", {"q": "two"}, 2)
+        clock.now += 1
+        await cache.get("youtube_search", {"q": "one"})  # "two" is now least recently used
+        clock.now += 1
+        await cache.set("youtube_search", {"q": "three"}, 3)
+        try:
+            return [await cache.get("youtube_search", {"q": q}) for q in ("one", "two", "three")]
+        finally:
+            await cache.close()
+
+    assert asyncio.run(run()) == [1, None, 3]
+
+
+def test_capped_endpoints_never_evict_searches_or_routes(tmp_path):
+    clock = FakeClock()
+
+    async def run():
+        cache = PersistentCache(str(tmp_path / "r.sqlite3"), max_entries=2, caps={"places_cell": 3}, clock=clock)
+        await cache.set("youtube_search", {"q": "lofi"}, 1)
+        await cache.set("directions", {"origin": "a"}, 2)
+        for i in range(10):
+            clock.now += 1
+            await cache.set("places_cell", {"cell": f"c{i}"}, i)
+            await cache.set("car_position", {}, {"lat": i, "lng": i})
+        try:
+            cells = [await cache.get("places_cell", {"cell": f"c{i}"}) for i in range(10)]
+            return (await cache.get("youtube_search", {"q": "lofi"}), await cache.get("directions", {"origin": "a"}),
+                    cells, await cache.get("car_position", {}))
+        finally:
+            await cache.close()
+
+    search, route, cells, position = asyncio.run(run())
+    assert (search, route) == (1, 2)
+    assert cells == [None] * 7 + [7, 8, 9]
+    assert position == {"lat": 9, "lng": 9}
+
+
+def test_survives_restart(tmp_path):
+    path = str(tmp_path / "r.sqlite3")
+    params = {"origin": "a", "destination": "b"}
+
+    async def write():
+        cache = PersistentCache(path)
+        await cache.set("directions", params, {"steps": ["go"]})
+        await cache.close()
+
+    async def read():
+        cache = PersistentCache(path)
+        try:
+            return await cache.get("directions", params)
+        finally:
+            await cache.close()
+
+    asyncio.run(write())
+    assert os.path.exists(path)
+    assert asyncio.run(read()) == {"steps": ["go"]}
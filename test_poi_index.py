@@ -0,0 +1,42 @@
+# test_poi_index.py - Test the offline POI index against brute-force haversine
+import numpy as np
+
+from geo_cache import haversine_km
+from poi_index import POIIndex
+
+NYC = (40.7128, -74.0060)
+
+
+def test_nearest_matches_brute_force():
+    index = POIIndex.load()
+    assert {"gas_station", "restaurant", "rest_stop"} <= set(index.types())
+
+    results = index.nearest(*NYC, place_type="gas_station", k=3)
+    stations = [r for r in index.rows if r["type"] == "gas_station"]
+    brute = np.sort(haversine_km(*NYC, np.array([r["lat"] for r in stations]), np.array([r["lng"] for r in stations])))
+    assert np.allclose([r["distance_km"] for r in results], brute[:3], atol=1e-3)
+
+
+def test_within_radius():
+    index = POIIndex.load()
+    results = index.within(*NYC, radius_km=15, place_type="restaurant")
+    assert results and all(r["distance_km"] <= 15 for r in results)
+    assert [r["distance_km"] for r in results] == sorted(r["distance_km"] for r in results)
+    assert index.within(*NYC, radius_km=15, place_type="car_wash") == []
+
+
+def test_offline_places_are_radius_bounded_and_tagged():
+    from connectivity_manager import ConnectivityManager
+
+    manager = ConnectivityManager()
+    nearby = manager._offline_places(*NYC, "gas_station")
+    assert nearby and all(p["offline"] and p["approximate"] for p in nearby)
+    # Mid-Atlantic: the nearest sample POI is thousands of km away
+    assert manager._offline_places(35.0, -40.0, "gas_station") == []
+
+
+if __name__ == "__main__":
+    test_nearest_matches_brute_force()
+    test_within_radius()
+    test_offline_places_are_radius_bounded_and_tagged()
+    print("POI index: OK")
@@ -0,0 +1,131 @@
+# test_resilience.py - Test token buckets and circuit breaker state transitions
+import asyncio
+
+from resilience import CircuitBreaker, CircuitOpenError, RateLimitedError, TokenBucket, Upstream, UpstreamClientError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=clock)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    clock.now = 0.5
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_breaker_opens_short_circuits_and_recovers():
+    clock = FakeClock()
+    upstream = Upstream("places", rate=100, burst=100, failure_threshold=3, reset_timeout=30, clock=clock)
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        raise ConnectionError("quota exceeded")
+
+    async def healthy():
+        nonlocal calls
+        calls += 1
+        return "ok"
+
+    async def run():
+        for _ in range(3):
+            try:
+                await upstream.call(failing)
+            except ConnectionError:
+                pass
+        assert upstream.breaker.state == CircuitBreaker.OPEN
+
+        # Open: no upstream call at all
+        try:
+            await upstream.call(healthy)
+            raise AssertionError("expected CircuitOpenError")
+        except CircuitOpenError:
+            pass
+        assert calls == 3
+
+        # Half-open probe fails: straight back to open
+        clock.now = 31
+        assert upstream.breaker.state == CircuitBreaker.HALF_OPEN
+        try:
+            await upstream.call(failing)
+        except ConnectionError:
+            pass
+        assert upstream.breaker.state == CircuitBreaker.OPEN
+
+        # Next probe succeeds: closed again
+        clock.now = 62
+        assert await upstream.call(healthy) == "ok"
+        assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(run())
+
+
+def test_rate_limited_calls_do_not_reach_upstream():
+    upstream = Upstream("youtube", rate=0.0, burst=1, clock=FakeClock())
+
+    async def run():
+        assert await upstream.call(lambda: asyncio.sleep(0, result="first")) == "first"
+        try:
+            await upstream.call(lambda: asyncio.sleep(0, result="second"))
+            raise AssertionError("expected RateLimitedError")
+        except RateLimitedError:
+            pass
+        assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(run())
+
+
+def test_background_calls_leave_reserve_for_foreground():
+    upstream = Upstream("places", rate=0.0, burst=4, background_reserve=2, clock=FakeClock())
+
+    async def run():
+        ok = lambda: asyncio.sleep(0, result="ok")
+        assert await upstream.call(ok, background=True) == "ok"
+        assert await upstream.call(ok, background=True) == "ok"
+        try:
+            await upstream.call(ok, background=True)
+            raise AssertionError("expected RateLimitedError")
+        except RateLimitedError:
+            pass
+        # The reserved share is still there for interactive calls
+        assert await upstream.call(ok) == "ok"
+        assert await upstream.call(ok) == "ok"
+
+    asyncio.run(run())
+
+
+def test_client_errors_do_not_open_breaker():
+    upstream = Upstream("directions", rate=100, burst=100, failure_threshold=2, clock=FakeClock())
+
+    async def invalid_request():
+        raise UpstreamClientError("Directions API status INVALID_REQUEST")
+
+    async def run():
+        for _ in range(5):
+            try:
+                await upstream.call(invalid_request)
+                raise AssertionError("expected UpstreamClientError")
+            except UpstreamClientError:
+                pass
+        assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_token_bucket_refills()
+    test_breaker_opens_short_circuits_and_recovers()
+    test_rate_limited_calls_do_not_reach_upstream()
+    test_background_calls_leave_reserve_for_foreground()
+    test_client_errors_do_not_open_breaker()
+    print("Resilience: OK")
@@ -0,0 +1,116 @@
+# test_route_prefetch.py - Test polyline decoding and corridor cache warming
+import asyncio
+
+import numpy as np
+
+from geo_cache import GeoPlacesCache, geohash_encode
+from route_prefetch import RoutePrefetcher, decode_polyline, sample_corridor
+
+# Example from Google's encoded polyline documentation
+EXAMPLE_POLYLINE = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_decode_polyline():
+    points = decode_polyline(EXAMPLE_POLYLINE)
+    assert np.allclose(points, [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]])
+
+
+def test_sample_corridor_spacing():
+    points = decode_polyline(EXAMPLE_POLYLINE)
+    samples = sample_corridor(points, every_km=10, ahead_km=50)
+    assert len(samples) == 6
+    assert np.allclose(samples[0], points[0])
+
+
+def test_prefetch_respects_budget_and_warms_cache():
+    fetched = []
+
+    async def fetch_cell(lat, lng, place_type, radius_m, background=False):
+        fetched.append(place_type)
+        return [{"name": f"{place_type} stop", "address": "", "rating": 4.0, "lat": lat, "lng": lng}]
+
+    async def run():
+        cache = GeoPlacesCache(fetch_cell)
+        prefetcher = RoutePrefetcher(cache, max_requests=12, min_interval=0.0)
+        warmed = await prefetcher.prefetch(EXAMPLE_POLYLINE)
+        assert warmed == 12 and len(fetched) == 12
+
+        # The route start is warm for every type, so this needs no fetch
+        start = geohash_encode(38.5, -120.2, cache.precision)
+        assert all(cache.is_warm(start, t) for t in prefetcher.place_types)
+        assert cache.cached_places(38.5, -120.2, "rest_stop")
+
+    asyncio.run(run())
+
+
+def test_stop_hint_uses_places_and_position_shared_on_disk(tmp_path, monkeypatch):
+    from connectivity_manager import ConnectivityManager
+
+    monkeypatch.setenv("RESPONSE_CACHE_PATH", str(tmp_path / "responses.sqlite3"))
+
+    async def request_places(lat, lng, place_type, radius_m):
+        return [{"place_id": f"{place_type}-{lat:.3f}", "name": f"{place_type} stop", "rating": 4.0,
+                 "address": "", "lat": lat, "lng": lng}]
+
+    async def run():
+        api, voice = ConnectivityManager(), ConnectivityManager()
+        try:
+            api.maps_api_key = "test"
+            api._request_places = request_places
+            assert await voice.nearest_cached_stop() is None  # no position reported yet
+            await api.get_nearby_places(38.5, -120.2, "rest_stop")
+            # The voice process never fetched anything itself
+            stop = await voice.nearest_cached_stop()
+            assert stop and stop["type"] == "rest_stop"
+        finally:
+            await api.aclose()
+            await voice.aclose()
+
+    asyncio.run(run())
+
+
+def test_position_writes_are_throttled_and_cells_reused_across_processes(tmp_path, monkeypatch):
+    from connectivity_manager import ConnectivityManager
+
+    monkeypatch.setenv("RESPONSE_CACHE_PATH", str(tmp_path / "responses.sqlite3"))
+    requests = []
+
+    async def request_places(lat, lng, place_type, radius_m):
+        requests.append((lat, lng, place_type))
+        return [{"place_id": "p1", "name": "Fuel", "rating": 4.0, "address": "", "lat": lat, "lng": lng}]
+
+    async def run():
+        first, second = ConnectivityManager(), ConnectivityManager()
+        try:
+            writes = []
+            real_set = first.response_cache.set
+
+            async def counting_set(endpoint, params, value):
+                writes.append(endpoint)
+                await real_set(endpoint, params, value)
+
+            first.response_cache.set = counting_set
+            for i in range(5):
+                await first.report_position(38.5 + i * 0.0001, -120.2)  # ~10 m steps
+            await first.report_position(38.6, -120.2)  # ~11 km on
+            assert writes == ["car_position", "car_position"]
+
+            first.maps_api_key = second.maps_api_key = "test"
+            first._request_places = second._request_places = request_places
+            await first._fetch_places_cell(38.5, -120.2, "gas_station", 3000)
+            fetched = len(requests)
+            # A fresh process finds the cell on disk instead of spending quota on it
+            assert await second._fetch_places_cell(38.5, -120.2, "gas_station", 3000)
+            assert len(requests) == fetched == 1
+        finally:
+            await first.aclose()
+            await second.aclose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_decode_polyline()
+    test_sample_corridor_spacing()
+    test_prefetch_respects_budget_and_warms_cache()
+    print("Route prefetch: OK")
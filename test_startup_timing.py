@@ -0,0 +1,34 @@
+# test_startup_timing.py - Test per-phase startup timing with overlapping phases
+import asyncio
+
+from startup_timing import StartupTimer
+
+
+def test_overlapping_phases_beat_sequential_sum():
+    async def run():
+        timer = StartupTimer("TEST")
+        await asyncio.gather(
+            timer.phase("connect", asyncio.sleep(0.05)),
+            timer.phase("memory", asyncio.sleep(0.05)),
+        )
+        with timer.measure("agent"):
+            pass
+        return timer
+
+    timer = asyncio.run(run())
+    assert set(timer.durations) == {"connect", "memory", "agent"}
+    assert timer.durations["connect"] >= 0.05
+    assert timer.elapsed() < sum(timer.durations.values())
+    assert "TEST startup: connect" in timer.summary()
+
+
+def test_failed_phase_is_still_recorded():
+    async def boom():
+        raise RuntimeError("room unreachable")
+
+    timer = StartupTimer("TEST")
+    try:
+        asyncio.run(timer.phase("connect", boom()))
+    except RuntimeError:
+        pass
+    assert "connect" in timer.durations
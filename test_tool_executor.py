@@ -0,0 +1,85 @@
+# test_tool_executor.py - Test per-tool concurrency limits, timeouts and error accounting
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tool_executor import TOOL_ERRORS, ToolExecutor
+
+
+def test_concurrency_limit_per_tool():
+    executor = ToolExecutor(max_workers=8, limits={"search_web": {"timeout": 5.0, "concurrency": 2}})
+    lock = threading.Lock()
+    running = peak = 0
+
+    def search():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(*(executor.run("search_web", search) for _ in range(6)))
+
+    try:
+        assert asyncio.run(run()) == ["ok"] * 6
+    finally:
+        executor.shutdown()
+    assert peak == 2
+
+
+def test_timeout_covers_wait_for_a_slot():
+    executor = ToolExecutor(limits={"get_weather": {"timeout": 0.2, "concurrency": 1}})
+    timeouts = TOOL_ERRORS.labels("get_weather", "timeout")
+    before = timeouts.value
+
+    async def slow():
+        await asyncio.sleep(0.15)
+        return "sunny"
+
+    async def run():
+        started = time.monotonic()
+        results = await asyncio.gather(
+            executor.run_async("get_weather", slow),
+            executor.run_async("get_weather", slow),
+            return_exceptions=True,
+        )
+        return results, time.monotonic() - started
+
+    try:
+        (first, second), elapsed = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    # The second call spends its budget queued behind the first and gives up on time
+    assert first == "sunny"
+    assert isinstance(second, asyncio.TimeoutError)
+    assert elapsed < 0.3
+    assert timeouts.value == before + 1
+
+
+def test_errors_propagate_and_are_counted():
+    executor = ToolExecutor()
+    errors = TOOL_ERRORS.labels("diagnose", "error")
+    before = errors.value
+
+    def broken():
+        raise ValueError("no such engine code")
+
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(executor.run("diagnose", broken))
+    finally:
+        executor.shutdown()
+    assert errors.value == before + 1
+
+
+if __name__ == "__main__":
+    test_concurrency_limit_per_tool()
+    test_timeout_covers_wait_for_a_slot()
+    test_errors_propagate_and_are_counted()
+    print("Tool executor: OK")
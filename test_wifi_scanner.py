@@ -0,0 +1,116 @@
+# test_wifi_scanner.py - Test WiFi scan parsers, async subprocess runner and scan coalescing
+import asyncio
+import sys
+
+from wifi_scanner import WifiScanner, parse_iw_interfaces, parse_iw_scan, parse_netsh_profiles, parse_nmcli, run_command
+
+NMCLI_OUTPUT = """\
+HomeNet:82:WPA2
+Cafe\\:Guest:40:
+HomeNet:55:WPA2
+:30:WPA2
+"""
+
+IW_DEV_OUTPUT = """\
+phy#0
+\tInterface wlp2s0
+\t\tifindex 3
+\t\ttype managed
+"""
+
+IW_SCAN_OUTPUT = """\
+BSS aa:bb:cc:dd:ee:01(on wlp2s0)
+\tfreq: 2412
+\tsignal: -48.00 dBm
+\tSSID: HomeNet
+\tRSN:\t * Version: 1
+BSS aa:bb:cc:dd:ee:02(on wlp2s0)
+\tsignal: -81.00 dBm
+\tSSID: Motel WiFi
+"""
+
+NETSH_OUTPUT = """\
+User profiles
+-------------
+    All User Profile     : HomeNet
+    All User Profile     : Office
+"""
+
+
+def test_parsers():
+    assert parse_nmcli(NMCLI_OUTPUT) == [
+        {"ssid": "HomeNet", "signal": 82, "security": "WPA2"},
+        {"ssid": "Cafe:Guest", "signal": 40, "security": "open"},
+    ]
+    assert parse_iw_interfaces(IW_DEV_OUTPUT) == ["wlp2s0"]
+    assert parse_iw_scan(IW_SCAN_OUTPUT) == [
+        {"ssid": "HomeNet", "signal": 100, "security": "WPA2"},
+        {"ssid": "Motel WiFi", "signal": 38, "security": "open"},
+    ]
+    assert [n["ssid"] for n in parse_netsh_profiles(NETSH_OUTPUT)] == ["HomeNet", "Office"]
+
+
+def test_run_command():
+    code, out, _ = asyncio.run(run_command(sys.executable, "-c", "print('ok')"))
+    assert code == 0 and out.strip() == "ok"
+
+
+def test_run_command_input():
+    code, out, _ = asyncio.run(run_command(sys.executable, "-c", "print(input()[::-1])", input="secret\n"))
+    assert code == 0 and out.strip() == "terces"
+
+
+def test_wifi_password_not_in_argv(tmp_path, monkeypatch):
+    import connectivity_manager
+    from connectivity_manager import ConnectivityManager
+
+    monkeypatch.setenv("RESPONSE_CACHE_PATH", str(tmp_path / "responses.sqlite3"))
+    monkeypatch.setattr(connectivity_manager.platform, "system", lambda: "Linux")
+    calls = []
+
+    async def fake_run_command(*cmd, timeout=15.0, input=None):
+        calls.append((cmd, input))
+        return 0, "", ""
+
+    monkeypatch.setattr(connectivity_manager, "run_command", fake_run_command)
+
+    async def run():
+        manager = ConnectivityManager()
+        try:
+            assert await manager.connect_wifi("HomeNet", "hunter22")
+        finally:
+            await manager.aclose()
+
+    asyncio.run(run())
+    (cmd, stdin), = calls
+    assert "--ask" in cmd and "hunter22" not in cmd
+    assert stdin == "hunter22\n"
+
+
+def test_concurrent_scans_are_coalesced():
+    scanner = WifiScanner(ttl=5)
+    runs = 0
+
+    async def fake_scan():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.05)
+        return [{"ssid": "HomeNet", "signal": 82}]
+
+    scanner._scan = fake_scan
+
+    async def run():
+        results = await asyncio.gather(*(scanner.scan() for _ in range(20)))
+        assert all(r == results[0] for r in results)
+        await scanner.scan()  # served from the short-lived cache
+
+    asyncio.run(run())
+    assert runs == 1
+
+
+if __name__ == "__main__":
+    test_parsers()
+    test_run_command()
+    test_run_command_input()
+    test_concurrent_scans_are_coalesced()
+    print("WiFi scanner: OK")
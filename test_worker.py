@@ -0,0 +1,52 @@
+# test_worker.py - Test prewarmed-object lookup and job request -> session start timing
+import asyncio
+import time
+
+import worker
+from worker import prewarmed
+
+
+class FakeProc:
+    def __init__(self):
+        self.userdata = {"intent_router": "router"}
+
+
+class FakeCtx:
+    proc = FakeProc()
+
+
+def test_prewarmed_falls_back_without_prewarm():
+    assert prewarmed(FakeCtx(), "intent_router") == "router"
+    assert prewarmed(FakeCtx(), "realtime_model") is None
+    assert prewarmed(object(), "intent_router", default="fresh") == "fresh"
+
+
+def test_request_fnc_stamps_request_time():
+    class FakeRequest:
+        id = "job-1"
+        attributes = None
+
+        async def accept(self, **kwargs):
+            await asyncio.sleep(0.01)
+            self.attributes = kwargs.get("attributes")
+
+    req = FakeRequest()
+    asyncio.run(worker.request_fnc(req))
+    assert float(req.attributes[worker.REQUESTED_AT_ATTRIBUTE]) > 0
+
+
+def test_session_started_measures_from_request():
+    class Participant:
+        attributes = {worker.REQUESTED_AT_ATTRIBUTE: f"{time.time() - 1.5:.3f}"}
+
+    class Ctx:
+        room = type("Room", (), {"local_participant": Participant()})()
+
+    observed = worker.JOB_START_SECONDS.labels().count
+    elapsed = worker.session_started(Ctx())
+    assert 1.4 < elapsed < 2.0
+    assert worker.JOB_START_SECONDS.labels().count == observed + 1
+
+    # Without the request stamp the entrypoint's own start time is used
+    assert 0.2 < worker.session_started(object(), fallback_start=time.time() - 0.25) < 1.0
+    assert worker.session_started(object()) is None
@@ -0,0 +1,96 @@
+# test_ws_codec.py - Test WebSocket encoding negotiation and batch frames
+import json
+
+import pytest
+
+from ws_codec import CODECS, DEFAULT_CODEC, negotiate, sender
+
+EVENT = {"type": "telemetry", "eyes": "closed", "closed_for": 1.5, "faces": [[10, 20, 30, 40]], "note": "müde"}
+
+
+class FakeWebSocket:
+    def __init__(self, query=None, subprotocols=None):
+        self.query_params = query or {}
+        self.scope = {"subprotocols": subprotocols or []}
+
+    async def send_text(self, data):
+        pass
+
+    async def send_bytes(self, data):
+        pass
+
+
+def test_negotiate_falls_back_to_json():
+    assert negotiate(None) is DEFAULT_CODEC
+    assert negotiate("bson") is DEFAULT_CODEC
+    assert negotiate(["bson", "json"]).name == "json"
+    assert negotiate(" JSON ").name == "json"
+
+
+def test_websocket_codec_prefers_query_then_subprotocols():
+    from ws_codec import websocket_codec
+
+    assert websocket_codec(FakeWebSocket(query={"encoding": "json"}, subprotocols=["orjson"])).name == "json"
+    assert websocket_codec(FakeWebSocket(subprotocols=["bson", "json"])).name == "json"
+    assert websocket_codec(FakeWebSocket()) is DEFAULT_CODEC
+
+
+def test_unavailable_query_encoding_is_refused():
+    import asyncio
+
+    from ws_codec import CLOSE_UNSUPPORTED_ENCODING, UnsupportedEncoding, accept, websocket_codec
+
+    with pytest.raises(UnsupportedEncoding):
+        websocket_codec(FakeWebSocket(query={"encoding": "bson"}))
+
+    class RecordingWebSocket(FakeWebSocket):
+        accepted = closed = None
+
+        async def accept(self, subprotocol=None):
+            self.accepted = subprotocol
+
+        async def close(self, code=1000, reason=""):
+            self.closed = (code, reason)
+
+    refused = RecordingWebSocket(query={"encoding": "bson"})
+    assert asyncio.run(accept(refused)) is None
+    assert refused.closed[0] == CLOSE_UNSUPPORTED_ENCODING and "json" in refused.closed[1]
+
+    # Subprotocol negotiation echoes the pick instead
+    negotiated = RecordingWebSocket(subprotocols=["bson", "json"])
+    assert asyncio.run(accept(negotiated)).name == "json"
+    assert negotiated.accepted == "json" and negotiated.closed is None
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_roundtrip(name):
+    codec = CODECS[name]
+    frame = codec.encode(EVENT)
+    assert isinstance(frame, bytes if codec.binary else str)
+    assert codec.decode(frame) == EVENT
+
+
+def test_json_is_compact_and_keeps_unicode():
+    frame = DEFAULT_CODEC.encode(EVENT)
+    assert ", " not in frame and "müde" in frame
+    assert json.loads(frame) == EVENT
+
+
+def test_single_event_frame_is_unwrapped():
+    assert json.loads(DEFAULT_CODEC.encode_frame([EVENT])) == EVENT
+    batch = json.loads(DEFAULT_CODEC.encode_frame([EVENT, {"type": "hadi_alert"}]))
+    assert batch["type"] == "batch"
+    assert [e["type"] for e in batch["events"]] == ["telemetry", "hadi_alert"]
+
+
+def test_msgpack_is_binary_when_installed():
+    pytest.importorskip("msgpack")
+    codec = negotiate("msgpack")
+    assert codec.binary
+    ws = FakeWebSocket()
+    assert sender(ws, codec) == ws.send_bytes
+
+
+def test_text_codecs_use_send_text():
+    ws = FakeWebSocket()
+    assert sender(ws, DEFAULT_CODEC) == ws.send_text
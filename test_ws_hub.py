@@ -0,0 +1,267 @@
+# test_ws_hub.py - Test shared monitors, fan-out and slow-client handling in the WebSocket hub
+import asyncio
+import json
+
+from ws_hub import EVICT_FIRST, NEVER_EVICT, MonitorHub, Subscriber
+
+
+class FakeModel:
+    instances = []
+
+    def __init__(self, camera):
+        self.camera = camera
+        self.running = False
+        self.callbacks = None
+        FakeModel.instances.append(self)
+
+    async def start(self, hadi_callback=None, huda_callback=None, telemetry_callback=None):
+        self.running = True
+        self.callbacks = (hadi_callback, huda_callback)
+        self.telemetry = telemetry_callback
+        while self.running:
+            await asyncio.sleep(0.01)
+
+
+class Client:
+    def __init__(self, delay=0.0):
+        self.received = []
+        self.delay = delay
+        self.closed = False
+
+    async def send(self, message):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        frame = json.loads(message)
+        self.received.extend(frame["events"] if frame["type"] == "batch" else [frame])
+
+    async def close(self):
+        self.closed = True
+
+
+def test_one_monitor_per_camera_with_refcounting():
+    FakeModel.instances = []
+
+    async def run():
+        hub = MonitorHub(FakeModel)
+        a = await hub.subscribe(Client().send, camera=0)
+        b = await hub.subscribe(Client().send, camera=0)
+        c = await hub.subscribe(Client().send, camera=1)
+        assert hub.monitor_count() == 2 and hub.subscriber_count(0) == 2
+        await hub.unsubscribe(a)
+        assert hub.monitor_count() == 2
+        await hub.unsubscribe(b)
+        assert hub.monitor_count() == 1
+        await hub.unsubscribe(c)
+        assert hub.monitor_count() == 0
+
+    asyncio.run(run())
+    assert [m.camera for m in FakeModel.instances] == [0, 1]
+    assert not any(m.running for m in FakeModel.instances)
+
+
+def test_monitor_events_fan_out_to_all_subscribers():
+    FakeModel.instances = []
+    clients = [Client(), Client(), Client()]
+
+    async def run():
+        hub = MonitorHub(FakeModel)
+        for client in clients:
+            await hub.subscribe(client.send)
+        await asyncio.sleep(0.02)
+        hadi_callback, _ = FakeModel.instances[0].callbacks
+        await hadi_callback()
+        await asyncio.sleep(0.08)  # one tick
+        await hub.aclose()
+
+    asyncio.run(run())
+    assert len(FakeModel.instances) == 1
+    for client in clients:
+        assert [e["type"] for e in client.received] == ["hadi_alert"]
+
+
+def test_slow_client_loses_oldest_messages_without_blocking_others():
+    fast, slow = Client(), Client(delay=0.05)
+
+    async def run():
+        hub = MonitorHub(FakeModel, queue_size=4)
+        await hub.subscribe(fast.send)
+        slow_sub = await hub.subscribe(slow.send)
+        for i in range(20):
+            hub.publish(0, {"type": "tick", "n": i})
+            hub.flush(0)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.3)
+        await hub.aclose()
+        return slow_sub
+
+    slow_sub = asyncio.run(run())
+    assert [e["n"] for e in fast.received] == list(range(20))
+    assert slow_sub.dropped > 0
+    assert slow.received[-1]["n"] == 19  # newest survives
+
+
+def test_telemetry_is_coalesced_per_tick_and_alerts_kept():
+    FakeModel.instances = []
+    client = Client()
+
+    async def run():
+        hub = MonitorHub(FakeModel, tick=0.05)
+        await hub.subscribe(client.send)
+        await asyncio.sleep(0.02)
+        model = FakeModel.instances[0]
+        for i in range(10):
+            model.telemetry({"eyes": "closed", "closed_for": i / 10, "faces": []})
+            if i == 4:
+                await model.callbacks[0]()
+        await asyncio.sleep(0.1)
+        await hub.aclose()
+
+    asyncio.run(run())
+    assert [e["type"] for e in client.received] == ["hadi_alert", "telemetry"]
+    assert client.received[1]["closed_for"] == 0.9  # only the latest reading survives
+
+
+def test_frame_is_encoded_once_per_codec():
+    from ws_codec import Codec
+
+    calls = []
+    counting = Codec("counting", False, lambda obj: calls.append(obj) or json.dumps(obj), json.loads)
+    clients = [Client() for _ in range(5)]
+
+    async def run():
+        hub = MonitorHub(FakeModel)
+        for client in clients:
+            await hub.subscribe(client.send, codec=counting)
+        hub.publish(0, {"type": "a"})
+        hub.publish(0, {"type": "b"})
+        assert hub.flush(0) == 5
+        await asyncio.sleep(0.01)
+        await hub.aclose()
+
+    asyncio.run(run())
+    assert len(calls) == 1 and calls[0]["type"] == "batch"
+    for client in clients:
+        assert [e["type"] for e in client.received] == ["a", "b"]
+
+
+def test_video_viewers_keep_monitor_running_and_get_frames():
+    FakeModel.instances = []
+
+    async def run():
+        from frame_stream import FrameStream
+
+        hub = MonitorHub(FakeModel, stream_factory=lambda: FrameStream(encode=lambda f: bytes(f)))
+        stream = await hub.open_stream(0)
+        assert hub.monitor_count() == 1
+        model = FakeModel.instances[0]
+        viewer = stream.frames("v")
+        pending = asyncio.ensure_future(viewer.__anext__())
+        await asyncio.sleep(0.01)
+        model.frame_sink(b"jpg")
+        frame = await asyncio.wait_for(pending, 1)
+        await viewer.aclose()
+
+        sub = await hub.subscribe(Client().send)
+        await hub.close_stream(0)
+        assert hub.monitor_count() == 1 and model.frame_sink is None
+        await hub.unsubscribe(sub)
+        assert hub.monitor_count() == 0
+        return frame
+
+    assert asyncio.run(run()).jpeg == b"jpg"
+
+
+def test_export_metrics_reports_subscribers_and_queue_depth():
+    from metrics import REGISTRY
+
+    async def never_finishes(message):
+        await asyncio.sleep(10)
+
+    async def run():
+        hub = MonitorHub(FakeModel)
+        await hub.subscribe(Client().send, camera=3)
+        stuck = await hub.subscribe(never_finishes, camera=3)
+        for i in range(5):
+            stuck.offer(str(i))
+        await asyncio.sleep(0.01)
+        hub.export_metrics()
+        text = REGISTRY.render()
+        await hub.aclose()
+        return text
+
+    text = asyncio.run(run())
+    assert 'ws_subscribers{camera="3"} 2' in text
+    assert 'ws_queue_depth{camera="3",stat="max"} 4' in text
+
+
+def test_persistently_slow_client_is_disconnected():
+    async def never_finishes(message):
+        await asyncio.sleep(10)
+
+    async def run():
+        client = Client()
+        sub = Subscriber(never_finishes, close=client.close, queue_size=2, max_dropped=3)
+        sub.start()
+        results = [sub.offer(i) for i in range(10)]
+        await asyncio.sleep(0.01)
+        return sub, client, results
+
+    sub, client, results = asyncio.run(run())
+    assert results[-1] is False
+    assert sub.closed and client.closed
+
+
+def test_full_queue_evicts_telemetry_but_never_an_alert():
+    client = Client()
+    gate = asyncio.Event()
+
+    async def blocked_send(message):
+        await gate.wait()
+        await client.send(message)
+
+    async def run():
+        hub = MonitorHub(FakeModel, queue_size=4)
+        sub = await hub.subscribe(blocked_send)
+        await asyncio.sleep(0.01)
+        model = FakeModel.instances[-1]
+        for i in range(10):
+            model.telemetry({"closed_for": i})
+            hub.flush(0)
+            await asyncio.sleep(0)
+        await model.callbacks[0]()
+        hub.flush(0)
+        for i in range(10, 20):
+            model.telemetry({"closed_for": i})
+            hub.flush(0)
+        gate.set()
+        await asyncio.sleep(0.05)
+        await hub.aclose()
+        return sub
+
+    sub = asyncio.run(run())
+    types = [e["type"] for e in client.received]
+    assert types.count("hadi_alert") == 1
+    assert sub.dropped > 0 and not client.closed
+    assert client.received[-1]["closed_for"] == 19
+
+
+def test_queue_full_of_alerts_disconnects_instead_of_dropping():
+    async def never_finishes(message):
+        await asyncio.sleep(10)
+
+    async def run():
+        client = Client()
+        sub = Subscriber(never_finishes, close=client.close, queue_size=2)
+        sub.start()
+        await asyncio.sleep(0)
+        assert sub.offer("telemetry", EVICT_FIRST)
+        await asyncio.sleep(0)  # taken by the stuck sender
+        assert sub.offer("alert 1", NEVER_EVICT) and sub.offer("alert 2", NEVER_EVICT)
+        assert sub.offer("telemetry", EVICT_FIRST)  # dropped itself, alerts stay queued
+        assert sub.depth() == 2 and sub.dropped == 1
+        assert not sub.offer("alert 3", NEVER_EVICT)
+        await asyncio.sleep(0.01)
+        return sub, client
+
+    sub, client = asyncio.run(run())
+    assert sub.closed and client.closed
@@ -0,0 +1,79 @@
+# tool_executor.py - Bounded, timed execution of tool backends off the event loop
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional
+
+from metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOOL_LIMITS = {"timeout": 10.0, "concurrency": 2}
+
+TOOL_SECONDS = histogram("tool_backend_seconds", "Tool backend call latency, including the wait for a slot", ["tool"])
+TOOL_ERRORS = counter("tool_backend_errors_total", "Tool backend calls that timed out or raised", ["tool", "kind"])
+
+
+class ToolExecutor:
+    """
+    Runs blocking tool backends (e.g. DuckDuckGo) on a bounded thread pool so
+    the event loop — and the realtime audio it drives — keeps running while a
+    tool waits on the network.
+
+    Each tool gets its own semaphore, so a burst of slow web searches can only
+    occupy its share of the pool and never starves the other tools. A tool's
+    timeout covers the wait for a slot as well as the call itself, so the
+    agent never waits longer than that for an answer.
+    """
+
+    def __init__(self, max_workers: int = 8, limits: Optional[Dict[str, Dict[str, float]]] = None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._limits = limits or {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def limits_for(self, tool_name: str) -> Dict[str, float]:
+        return self._limits.get(tool_name, DEFAULT_TOOL_LIMITS)
+
+    def _semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        sem = self._semaphores.get(tool_name)
+        if sem is None:
+            sem = asyncio.Semaphore(int(self.limits_for(tool_name)["concurrency"]))
+            self._semaphores[tool_name] = sem
+        return sem
+
+    async def run(self, tool_name: str, fn: Callable, *args, **kwargs):
+        """
+        Run ``fn(*args, **kwargs)`` on the pool, bounded by the tool's
+        concurrency limit. Raises asyncio.TimeoutError once the tool's timeout
+        elapses; the worker thread is left to finish on its own.
+        """
+        loop = asyncio.get_running_loop()
+        return await self._limited(
+            tool_name, lambda: loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        )
+
+    async def run_async(self, tool_name: str, make_call: Callable[[], Awaitable]):
+        """Same limits as `run`, for tools backed by a native async client."""
+        return await self._limited(tool_name, make_call)
+
+    async def _limited(self, tool_name: str, make_call: Callable[[], Awaitable]):
+        async def acquire_and_call():
+            async with self._semaphore(tool_name):
+                return await make_call()
+
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(acquire_and_call(), timeout=self.limits_for(tool_name)["timeout"])
+        except asyncio.TimeoutError:
+            TOOL_ERRORS.labels(tool_name, "timeout").inc()
+            raise
+        except Exception:
+            TOOL_ERRORS.labels(tool_name, "error").inc()
+            raise
+        finally:
+            TOOL_SECONDS.labels(tool_name).observe(time.perf_counter() - start)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,18 +1,91 @@
+import asyncio
 import logging
 import os
 import re
-import requests
-import smtplib
-from typing import Optional
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+from typing import Callable, Dict, Optional
 
+import httpx
 from livekit.agents import function_tool, RunContext
-from langchain_community.tools import DuckDuckGoSearchRun
+from async_cache import AsyncTTLCache
 from car_diagnostics import CarDiagnostics
+from http_client import http
+from mail_queue import MailQueueFull, STATUS_FAILED, STATUS_SENT, get_mail_queue
+from log_setup import truncate
+from metrics import counter
+from tool_executor import ToolExecutor
 
-# Initialize car diagnostics engine once
-diagnostic_engine = CarDiagnostics()
+# -------------------------------------------------------------------
+# LAZY TOOL BACKENDS
+# -------------------------------------------------------------------
+# Built on first use rather than at import: langchain_community alone adds
+# seconds to every job process start, before Hadi or Huda can say anything.
+_diagnostic_engine: Optional[CarDiagnostics] = None
+_search_backend = None
+
+
+def get_diagnostic_engine() -> CarDiagnostics:
+    """Car diagnostics engine, loaded from car_problems.json once per process."""
+    global _diagnostic_engine
+    if _diagnostic_engine is None:
+        _diagnostic_engine = CarDiagnostics()
+    return _diagnostic_engine
+
+
+def get_search_backend():
+    """DuckDuckGo search runner, imported on the first search_web call."""
+    global _search_backend
+    if _search_backend is None:
+        from langchain_community.tools import DuckDuckGoSearchRun
+        _search_backend = DuckDuckGoSearchRun()
+    return _search_backend
+
+
+# -------------------------------------------------------------------
+# TOOL EXECUTION LAYER
+# -------------------------------------------------------------------
+# Per-tool limits: how long the agent waits for a result and how many calls
+# of the same tool may be in flight at once across all sessions in this worker.
+TOOL_LIMITS: Dict[str, Dict[str, float]] = {
+    "get_weather": {"timeout": 8.0, "concurrency": 4},
+    "search_web": {"timeout": 12.0, "concurrency": 2},
+}
+TOOL_CACHE_REQUESTS = counter("tool_cache_requests_total", "Tool result cache lookups", ["cache", "result"])
+
+tool_executor = ToolExecutor(
+    max_workers=int(os.getenv("TOOL_EXECUTOR_WORKERS", "8")),
+    limits=TOOL_LIMITS,
+)
+
+
+# -------------------------------------------------------------------
+# TOOL RESULT CACHES
+# -------------------------------------------------------------------
+# Fresh for `ttl` seconds, then served stale for up to `stale_ttl` more while a
+# background refresh runs, so repeated voice questions are answered instantly.
+def _count_lookups(cache_name: str) -> Callable[[str], None]:
+    """`on_lookup` hook incrementing TOOL_CACHE_REQUESTS; children are looked up once."""
+    children = {result: TOOL_CACHE_REQUESTS.labels(cache_name, result) for result in ("hit", "stale", "miss")}
+    return lambda result: children[result].inc()
+
+
+weather_cache = AsyncTTLCache(ttl=10 * 60, stale_ttl=20 * 60, maxsize=256, name="weather",
+                              on_lookup=_count_lookups("weather"))
+search_cache = AsyncTTLCache(ttl=60 * 60, stale_ttl=6 * 60 * 60, maxsize=512, name="search",
+                             on_lookup=_count_lookups("search"))
+
+
+# DuckDuckGoSearchRun answers "no results" with this text instead of raising
+NO_SEARCH_RESULTS = "No good DuckDuckGo Search Result was found"
+
+
+class NoSearchResults(Exception):
+    """Raised instead of returning an empty search, so the miss is not cached."""
+
+
+def _normalise(text: str) -> str:
+    """Cache key form of a tool argument: lowercase, single-spaced, no edge punctuation."""
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return text.strip(" .,!?;:'\"")
 
 
 # 🧠 CAR DIAGNOSTIC TOOL
@@ -29,9 +102,9 @@ async def diagnose_car_issue(
         - 'Brakes are not working'
     """
     try:
-        logging.info(f"Diagnosing car issue for query: {query}")
-        result = diagnostic_engine.get_response(query)
-        logging.info(f"Diagnosis result: {result[:150]}...")  # Trim log output
+        logging.info("Diagnosing car issue for query: %s", query)
+        result = get_diagnostic_engine().get_response(query)
+        logging.info("Diagnosis result: %s", truncate(result, 150))
         return result
     except Exception as e:
         logging.error(f"Error diagnosing issue: {e}")
@@ -48,15 +121,23 @@ async def get_weather(
     Get the current weather for a given city using wttr.in
     Example: "What's the weather in London?"
     """
+    async def fetch() -> str:
+        response = await tool_executor.run_async(
+            "get_weather", lambda: http.get(f"https://wttr.in/{city}", params={"format": "3"})
+        )
+        response.raise_for_status()
+        return response.text.strip()
+
     try:
-        response = requests.get(f"https://wttr.in/{city}?format=3")
-        if response.status_code == 200:
-            weather = response.text.strip()
-            logging.info(f"Weather for {city}: {weather}")
-            return weather
-        else:
-            logging.error(f"Weather API failed: {response.status_code}")
-            return f"Could not retrieve weather for {city}."
+        weather = await weather_cache.get_or_fetch(_normalise(city), fetch)
+        logging.info("Weather for %s: %s", city, weather)
+        return weather
+    except httpx.HTTPStatusError as e:
+        logging.error(f"Weather API failed: {e.response.status_code}")
+        return f"Could not retrieve weather for {city}."
+    except asyncio.TimeoutError:
+        logging.error(f"Weather lookup for {city} timed out")
+        return f"The weather service is taking too long to answer for {city}."
     except Exception as e:
         logging.error(f"Error retrieving weather: {e}")
         return f"An error occurred while retrieving weather for {city}."
@@ -72,10 +153,23 @@ async def search_web(
     Perform a quick web search using DuckDuckGo.
     Example: "Search for the history of Tesla Motors"
     """
+    async def fetch() -> str:
+        results = await tool_executor.run("search_web", lambda: get_search_backend().run(tool_input=query))
+        # Failures are never cached; an empty answer must not be cached for hours either
+        if not results or not results.strip() or results.startswith(NO_SEARCH_RESULTS):
+            raise NoSearchResults(query)
+        return results
+
     try:
-        results = DuckDuckGoSearchRun().run(tool_input=query)
-        logging.info(f"Search results for '{query}': {results[:150]}...")
+        results = await search_cache.get_or_fetch(_normalise(query), fetch)
+        logging.info("Search results for %r: %s", query, truncate(results, 150))
         return results
+    except NoSearchResults:
+        logging.info("No search results for %r", query)
+        return f"I couldn't find anything on the web for '{query}'."
+    except asyncio.TimeoutError:
+        logging.error(f"Web search for '{query}' timed out")
+        return f"The web search for '{query}' is taking too long. Please try again in a moment."
     except Exception as e:
         logging.error(f"Error searching web: {e}")
         return f"An error occurred while searching for '{query}'."
@@ -91,45 +185,41 @@ async def send_email(
     cc_email: Optional[str] = None
 ) -> str:
     """
-    Send an email via Gmail SMTP.
+    Send an email via Gmail SMTP. The email is queued and delivered in the
+    background; the reply includes a reference for check_email_status.
     Requires environment variables:
         GMAIL_USER, GMAIL_APP_PASSWORD
     """
     try:
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-        gmail_user = os.getenv("GMAIL_USER")
-        gmail_password = os.getenv("GMAIL_APP_PASSWORD")
-
-        if not gmail_user or not gmail_password:
+        if not os.getenv("GMAIL_USER") or not os.getenv("GMAIL_APP_PASSWORD"):
             return "Email sending failed: Gmail credentials not configured."
 
-        msg = MIMEMultipart()
-        msg["From"] = gmail_user
-        msg["To"] = to_email
-        msg["Subject"] = subject
-        recipients = [to_email]
-
-        if cc_email:
-            msg["Cc"] = cc_email
-            recipients.append(cc_email)
-
-        msg.attach(MIMEText(message, "plain"))
-
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(gmail_user, gmail_password)
-            server.sendmail(gmail_user, recipients, msg.as_string())
+        message_id = get_mail_queue().enqueue(to_email, subject, message, cc_email)
+        logging.info(f"📧 Email to {to_email} queued as {message_id}")
+        return f"Email to {to_email} is on its way (reference {message_id})."
 
-        logging.info(f"✅ Email sent successfully to {to_email}")
-        return f"Email sent successfully to {to_email}"
-
-    except smtplib.SMTPAuthenticationError:
-        logging.error("Gmail authentication failed")
-        return "Authentication error. Please check your Gmail credentials."
-    except smtplib.SMTPException as e:
-        logging.error(f"SMTP error: {e}")
-        return f"SMTP error occurred: {str(e)}"
+    except MailQueueFull:
+        logging.error("Outbound mail queue is full")
+        return "Too many emails are waiting to be sent right now. Please try again shortly."
     except Exception as e:
         logging.error(f"Unexpected error while sending email: {e}")
         return f"An error occurred: {str(e)}"
+
+
+@function_tool()
+async def check_email_status(
+    context: RunContext,  # type: ignore
+    reference: str
+) -> str:
+    """
+    Check whether a previously sent email has been delivered.
+    Use the reference returned by send_email.
+    """
+    status = get_mail_queue().status(reference.strip())
+    if not status:
+        return f"I have no record of an email with reference {reference}."
+    if status["status"] == STATUS_SENT:
+        return f"The email to {status.get('to', 'the recipient')} was delivered."
+    if status["status"] == STATUS_FAILED:
+        return f"The email to {status.get('to', 'the recipient')} could not be sent: {status.get('error')}"
+    return f"The email to {status.get('to', 'the recipient')} is still waiting to be sent."
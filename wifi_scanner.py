@@ -0,0 +1,165 @@
+# wifi_scanner.py - Non-blocking WiFi scans (netsh on Windows, nmcli / iw on Linux)
+import asyncio
+import logging
+import platform
+import re
+import shutil
+from typing import Dict, List, Optional, Tuple
+
+from async_cache import AsyncTTLCache
+
+logger = logging.getLogger(__name__)
+
+
+async def run_command(*cmd: str, timeout: float = 15.0, input: Optional[str] = None) -> Tuple[int, str, str]:
+    """
+    Run a command without blocking the event loop. Returns (returncode, stdout, stderr).
+    `input` is written to the command's stdin, which keeps secrets out of argv.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE if input is not None else None,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            proc.communicate(input.encode() if input is not None else None), timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    return proc.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+
+# -------------------------------------------------------------------
+# Parsers
+# -------------------------------------------------------------------
+def parse_netsh_profiles(output: str) -> List[Dict]:
+    """`netsh wlan show profiles` — saved networks only, no signal information."""
+    networks = []
+    for line in output.splitlines():
+        if "All User Profile" in line:
+            ssid = line.split(":", 1)[1].strip()
+            networks.append({"ssid": ssid, "signal": "Unknown"})
+    return networks
+
+
+def _split_terse(line: str) -> List[str]:
+    """Split an `nmcli -t` line on ':' while honouring '\\:' escapes."""
+    fields = re.split(r"(?<!\\):", line)
+    return [f.replace("\\:", ":").replace("\\\\", "\\") for f in fields]
+
+
+def parse_nmcli(output: str) -> List[Dict]:
+    """`nmcli -t -f SSID,SIGNAL,SECURITY device wifi list`"""
+    networks = []
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        fields = _split_terse(line)
+        if len(fields) < 3:
+            continue
+        ssid, signal, security = fields[0], fields[1], fields[2]
+        networks.append({
+            "ssid": ssid,
+            "signal": int(signal) if signal.isdigit() else "Unknown",
+            "security": security or "open",
+        })
+    return _strongest_per_ssid(networks)
+
+
+def parse_iw_scan(output: str) -> List[Dict]:
+    """`iw dev <iface> scan` — signal in dBm, mapped to a 0-100 quality."""
+    networks = []
+    current: Optional[Dict] = None
+    for raw in output.splitlines():
+        line = raw.strip()
+        if raw.startswith("BSS "):
+            current = {"ssid": "", "signal": "Unknown", "security": "open"}
+            networks.append(current)
+        elif current is None:
+            continue
+        elif line.startswith("SSID:"):
+            current["ssid"] = line[5:].strip()
+        elif line.startswith("signal:"):
+            match = re.search(r"(-?\d+(?:\.\d+)?)\s*dBm", line)
+            if match:
+                current["signal"] = max(0, min(100, int(2 * (float(match.group(1)) + 100))))
+        elif line.startswith("RSN:"):
+            current["security"] = "WPA2"
+        elif line.startswith("WPA:") and current["security"] == "open":
+            current["security"] = "WPA"
+    return _strongest_per_ssid(networks)
+
+
+def parse_iw_interfaces(output: str) -> List[str]:
+    """Wireless interface names from `iw dev`."""
+    return re.findall(r"^\s*Interface\s+(\S+)", output, flags=re.MULTILINE)
+
+
+def _strongest_per_ssid(networks: List[Dict]) -> List[Dict]:
+    """Drop hidden networks, keep the strongest access point per SSID, strongest first."""
+    best: Dict[str, Dict] = {}
+    for net in networks:
+        if not net["ssid"]:
+            continue
+        signal = net["signal"] if isinstance(net["signal"], int) else -1
+        kept = best.get(net["ssid"])
+        if kept is None or signal > (kept["signal"] if isinstance(kept["signal"], int) else -1):
+            best[net["ssid"]] = net
+    return sorted(best.values(), key=lambda n: n["signal"] if isinstance(n["signal"], int) else -1, reverse=True)
+
+
+# -------------------------------------------------------------------
+# Scanner
+# -------------------------------------------------------------------
+class WifiScanner:
+    """
+    Scans through the platform's CLI tools with asyncio subprocesses.
+
+    Results are cached for `ttl` seconds and concurrent callers share one
+    running scan, so a burst of /api/wifi/scan requests runs the tool once.
+    """
+
+    def __init__(self, ttl: float = 10.0, timeout: float = 15.0):
+        self.timeout = timeout
+        self._cache = AsyncTTLCache(ttl=ttl, maxsize=1, name="wifi")
+
+    async def scan(self, force: bool = False) -> List[Dict]:
+        if force:
+            self._cache.invalidate("scan")
+        return await self._cache.get_or_fetch("scan", self._scan)
+
+    def invalidate(self) -> None:
+        self._cache.invalidate("scan")
+
+    async def _scan(self) -> List[Dict]:
+        system = platform.system()
+        if system == "Windows":
+            _, out, _ = await run_command("netsh", "wlan", "show", "profiles", timeout=self.timeout)
+            return parse_netsh_profiles(out)
+        if system == "Linux":
+            if shutil.which("nmcli"):
+                code, out, err = await run_command(
+                    "nmcli", "-t", "-f", "SSID,SIGNAL,SECURITY", "device", "wifi", "list", "--rescan", "auto",
+                    timeout=self.timeout,
+                )
+                if code == 0:
+                    return parse_nmcli(out)
+                logger.warning(f"nmcli scan failed: {err.strip()}")
+            if shutil.which("iw"):
+                return await self._scan_iw()
+        logger.info(f"No WiFi scan backend available on {system}")
+        return []
+
+    async def _scan_iw(self) -> List[Dict]:
+        _, out, _ = await run_command("iw", "dev", timeout=self.timeout)
+        networks: List[Dict] = []
+        for iface in parse_iw_interfaces(out):
+            code, scan_out, err = await run_command("iw", "dev", iface, "scan", timeout=self.timeout)
+            if code != 0:
+                logger.warning(f"iw scan on {iface} failed: {err.strip()}")  # usually needs root
+                continue
+            networks.extend(parse_iw_scan(scan_out))
+        return _strongest_per_ssid(networks)
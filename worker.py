@@ -0,0 +1,141 @@
+# worker.py - LiveKit worker setup: per-process prewarm, idle process pool, job acceptance latency
+#
+#   python worker.py start                       # co-pilot (Hadi + Huda in one session)
+#   AGENT_ENTRYPOINT=huda python worker.py dev   # a single agent
+import logging
+import os
+import time
+from typing import Any, Callable, Optional
+
+from dotenv import load_dotenv
+
+from metrics import histogram
+
+load_dotenv()
+
+# Warmed job processes kept waiting so a burst of cars starting shifts does not wait on spawns
+NUM_IDLE_PROCESSES = int(os.getenv("WORKER_IDLE_PROCESSES", "3"))
+
+# Each job process serves its own /metrics on the first free port of
+# METRICS_PORT .. METRICS_PORT + METRICS_PORT_COUNT - 1 (unset disables it).
+# Scrape every port in that range as a separate target, e.g.
+#   static_configs: [{targets: ["agent-host:9300", ..., "agent-host:9315"]}]
+# Ports with no process behind them only show up as `up == 0`. A process
+# lives for its whole session, so a scrape interval well under a session's
+# length sees each job's `job_session_start_seconds` observation. Percentiles
+# across processes come from the summed buckets:
+#   histogram_quantile(0.95, sum by (le) (rate(job_session_start_seconds_bucket[5m])))
+# Keep the range larger than the idle processes plus the jobs a host runs at once.
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_PORT_COUNT = int(os.getenv("METRICS_PORT_COUNT", "16"))
+
+# Participant attribute carrying the wall-clock time the job request reached the
+# worker, so the job process can time request -> session start across processes
+REQUESTED_AT_ATTRIBUTE = "copilot.requested_at"
+
+JOB_START_SECONDS = histogram(
+    "job_session_start_seconds", "Job request received to agent session started",
+    buckets=(0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0),
+)
+
+
+def prewarm(proc: Any) -> None:
+    """
+    Runs once in each job process before it is given a job: import the agent
+    modules, register plugins and build everything that does not depend on
+    the room, so the entrypoint only does per-session work.
+
+    Process-wide singletons (car diagnostics, the offline POI index) are just
+    loaded here; only objects the entrypoints take from `proc.userdata` via
+    `prewarmed()` are stored there.
+    """
+    start = time.perf_counter()
+    import hadi_agent  # noqa: F401  # agent modules: prompts, tools and their dependencies
+    import huda_agent  # noqa: F401
+    from intent_router import IntentRouter
+    from lazy_plugins import build_realtime_model, load_plugins
+    from poi_index import get_poi_index
+    from tools import get_diagnostic_engine
+
+    load_plugins()
+    get_diagnostic_engine()
+    get_poi_index()
+    proc.userdata["intent_router"] = IntentRouter()
+    proc.userdata["realtime_model"] = build_realtime_model(voice="Aoede")
+    if METRICS_PORT:
+        from metrics import serve
+
+        proc.userdata["metrics_port"] = serve(int(METRICS_PORT), attempts=METRICS_PORT_COUNT)
+    logging.info(f"Job process prewarmed in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+def prewarmed(ctx: Any, key: str, default: Any = None) -> Any:
+    """Object built by `prewarm` for this job's process, or `default` when run without it."""
+    userdata = getattr(getattr(ctx, "proc", None), "userdata", None) or {}
+    return userdata.get(key, default)
+
+
+async def request_fnc(req: Any) -> None:
+    """Accept every job, stamping when the request arrived for `session_started`."""
+    requested_at = time.time()
+    await req.accept(attributes={REQUESTED_AT_ATTRIBUTE: f"{requested_at:.3f}"})
+    logging.info(f"Accepted job {getattr(req, 'id', '?')} in {(time.time() - requested_at) * 1000:.0f}ms")
+
+
+def _requested_at(ctx: Any) -> Optional[float]:
+    participant = getattr(getattr(ctx, "room", None), "local_participant", None)
+    value = (getattr(participant, "attributes", None) or {}).get(REQUESTED_AT_ATTRIBUTE)
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def session_started(ctx: Any, fallback_start: Optional[float] = None) -> Optional[float]:
+    """
+    Call from the entrypoint once `AgentSession.start()` has returned: records
+    how long the job took from request to a running session. Without the
+    request stamp (e.g. console mode) `fallback_start`, a time.time() taken
+    at entrypoint start, is used instead.
+    """
+    start = _requested_at(ctx) or fallback_start
+    if start is None:
+        return None
+    elapsed = max(0.0, time.time() - start)
+    # One job per process: percentiles come from the histogram across processes
+    JOB_START_SECONDS.observe(elapsed)
+    job_id = getattr(getattr(ctx, "job", None), "id", "?")
+    logging.info(f"Job {job_id} session started {elapsed * 1000:.0f}ms after the request")
+    return elapsed
+
+
+def worker_options(entrypoint_fnc: Callable) -> Any:
+    from livekit import agents  # type: ignore
+
+    return agents.WorkerOptions(
+        entrypoint_fnc=entrypoint_fnc,
+        prewarm_fnc=prewarm,
+        request_fnc=request_fnc,
+        num_idle_processes=NUM_IDLE_PROCESSES,
+    )
+
+
+def _entrypoint(name: str) -> Callable:
+    if name == "hadi":
+        from hadi_agent import entrypoint
+    elif name == "huda":
+        from huda_agent import entrypoint
+    else:
+        from agent_manager import entrypoint
+    return entrypoint
+
+
+if __name__ == "__main__":
+    from livekit import agents  # type: ignore
+
+    from lazy_plugins import load_plugins
+    from log_setup import setup_logging
+
+    setup_logging()
+    load_plugins()  # register plugins in the main process for `download-files`
+    agents.cli.run_app(worker_options(_entrypoint(os.getenv("AGENT_ENTRYPOINT", "copilot").lower())))
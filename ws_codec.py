@@ -0,0 +1,101 @@
+# ws_codec.py - Negotiable WebSocket encodings (JSON, orjson, MessagePack) and per-tick event batches
+#
+# Clients pick an encoding with `?encoding=msgpack` or the `Sec-WebSocket-Protocol`
+# header (e.g. "msgpack"). orjson and msgpack are optional installs (see
+# requirements-codecs.txt). An explicit `?encoding=` this server cannot speak is
+# refused with close code 1003 and a reason naming the available ones.
+# Subprotocols negotiate as usual: the server echoes the one it picked and
+# none at all means JSON.
+# A frame carries one event as before, or {"type": "batch", "events": [...]}
+# when several events were coalesced into the same tick.
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+Frame = Union[str, bytes]
+
+
+class Codec:
+    def __init__(self, name: str, binary: bool, encode: Callable[[Any], Frame], decode: Callable[[Frame], Any]):
+        self.name = name
+        self.binary = binary  # send with send_bytes instead of send_text
+        self.encode = encode
+        self.decode = decode
+
+    def encode_frame(self, events: List[Dict]) -> Frame:
+        return self.encode(events[0] if len(events) == 1 else {"type": "batch", "events": events})
+
+
+CODECS: Dict[str, Codec] = {
+    "json": Codec("json", False, lambda obj: json.dumps(obj, separators=(",", ":"), ensure_ascii=False), json.loads),
+}
+
+try:
+    import orjson  # type: ignore
+
+    # Same text frames as "json", several times faster to produce
+    CODECS["orjson"] = Codec("orjson", False, lambda obj: orjson.dumps(obj).decode(), orjson.loads)
+except ImportError:
+    pass
+
+try:
+    import msgpack  # type: ignore
+
+    CODECS["msgpack"] = Codec("msgpack", True, msgpack.packb, msgpack.unpackb)
+except ImportError:
+    pass
+
+DEFAULT_CODEC = CODECS["json"]
+
+# "Unsupported data": the requested encoding is not installed on this server
+CLOSE_UNSUPPORTED_ENCODING = 1003
+
+
+class UnsupportedEncoding(ValueError):
+    """A client asked for an encoding by name that is not available here."""
+
+
+def negotiate(requested: Optional[Union[str, Iterable[str]]]) -> Codec:
+    """First available codec among `requested` (a name or a list in preference order), else JSON."""
+    if requested is None:
+        return DEFAULT_CODEC
+    names = [requested] if isinstance(requested, str) else list(requested)
+    for name in names:
+        codec = CODECS.get(name.strip().lower())
+        if codec is not None:
+            return codec
+    return DEFAULT_CODEC
+
+
+def websocket_codec(websocket: Any) -> Codec:
+    """
+    Codec for a Starlette WebSocket from its query string or offered
+    subprotocols. Raises UnsupportedEncoding for an unavailable `?encoding=`.
+    """
+    requested = websocket.query_params.get("encoding")
+    if requested:
+        codec = CODECS.get(requested.strip().lower())
+        if codec is None:
+            raise UnsupportedEncoding(f"encoding {requested!r} is not available; use one of {', '.join(CODECS)}")
+        return codec
+    return negotiate(websocket.scope.get("subprotocols") or None)
+
+
+async def accept(websocket: Any) -> Optional[Codec]:
+    """
+    Negotiate, then accept the connection (echoing the chosen subprotocol if
+    one was offered). Returns None after closing it if the requested
+    encoding is unavailable.
+    """
+    try:
+        codec = websocket_codec(websocket)
+    except UnsupportedEncoding as e:
+        await websocket.accept()
+        await websocket.close(code=CLOSE_UNSUPPORTED_ENCODING, reason=str(e))
+        return None
+    offered = websocket.scope.get("subprotocols") or []
+    await websocket.accept(subprotocol=codec.name if codec.name in offered else None)
+    return codec
+
+
+def sender(websocket: Any, codec: Codec) -> Callable[[Frame], Any]:
+    return websocket.send_bytes if codec.binary else websocket.send_text
@@ -0,0 +1,369 @@
+# ws_hub.py - One drowsiness monitor per camera, fanned out to every subscribed WebSocket
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from frame_stream import FrameStream
+from metrics import counter, gauge
+from ws_codec import DEFAULT_CODEC, Codec
+
+logger = logging.getLogger(__name__)
+
+WS_DROPPED = counter("ws_dropped_messages_total", "Messages dropped for WebSocket clients that fell behind")
+WS_DISCONNECTED_SLOW = counter("ws_slow_disconnects_total", "WebSocket clients disconnected for falling behind")
+WS_SUBSCRIBERS = gauge("ws_subscribers", "Connected event subscribers", ["camera"])
+WS_QUEUE_DEPTH = gauge("ws_queue_depth", "Queued messages across a camera's subscribers", ["camera", "stat"])
+VIDEO_VIEWERS = gauge("video_viewers", "Connected video viewers", ["camera"])
+VIDEO_FRAMES_ENCODED = gauge("video_frames_encoded", "Frames encoded by the camera's current stream", ["camera"])
+VIDEO_VIEWER_LAG = gauge("video_viewer_lag_seconds", "Worst capture-to-send lag among a camera's viewers", ["camera"])
+VIDEO_FRAMES_SKIPPED = gauge("video_frames_skipped", "Frames skipped by the camera's connected viewers", ["camera"])
+
+
+# Which queued messages a full client queue gives up first: frames of coalesced
+# telemetry, then other events. Frames carrying an alert are never dropped.
+EVICT_FIRST, EVICT_LATER, NEVER_EVICT = 0, 1, 2
+ALERT_EVENT_TYPES = frozenset({"hadi_alert", "huda_conversation"})
+
+
+def event_priority(event: Dict, coalesced: bool = False) -> int:
+    if event.get("type") in ALERT_EVENT_TYPES:
+        return NEVER_EVICT
+    return EVICT_FIRST if coalesced else EVICT_LATER
+
+
+class Subscriber:
+    """
+    One connected client: a bounded queue of encoded messages drained by
+    its own sender task, so a slow socket never holds up the others.
+
+    When the queue is full the oldest message of the lowest priority is
+    dropped (telemetry before other events), so the client only ever falls
+    behind by `queue_size`. Alerts are never dropped: a client whose queue
+    is full of alerts is disconnected instead, as is one that keeps
+    overflowing for `max_dropped` messages without catching up.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Any], Awaitable[None]],
+        close: Optional[Callable[[], Awaitable[None]]] = None,
+        camera: int = 0,
+        queue_size: int = 32,
+        max_dropped: int = 256,
+        codec: Codec = DEFAULT_CODEC,
+    ):
+        self.send = send
+        self.close = close
+        self.camera = camera
+        self.codec = codec
+        self.queue_size = queue_size
+        self.max_dropped = max_dropped
+        self._messages: Deque[Tuple[int, Any]] = deque()
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        self._dropped_since_drain = 0
+        self.closed = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._drain())
+
+    def depth(self) -> int:
+        """Messages queued and not yet handed to the socket."""
+        return len(self._messages)
+
+    def offer_event(self, event: Dict) -> bool:
+        """Encode a message meant for this client only and queue it."""
+        return self.offer(self.codec.encode(event), event_priority(event))
+
+    def offer(self, message: Any, priority: int = EVICT_LATER) -> bool:
+        """Queue without waiting. Returns False once the client has been given up on."""
+        if self.closed:
+            return False
+        if len(self._messages) >= self.queue_size:
+            if not self._evict() and priority == NEVER_EVICT:
+                return self._give_up(f"Dropping WebSocket client with {len(self._messages)} alerts queued")
+            self.dropped += 1
+            self._dropped_since_drain += 1
+            WS_DROPPED.inc()
+            if self._dropped_since_drain > self.max_dropped:
+                return self._give_up(f"Dropping slow WebSocket client after {self._dropped_since_drain} lost messages")
+            if len(self._messages) >= self.queue_size:
+                return True  # nothing evictable queued: this message is the one dropped
+        self._messages.append((priority, message))
+        self._ready.set()
+        return True
+
+    def _evict(self) -> bool:
+        """Remove the oldest queued message of the lowest evictable priority."""
+        victim = None
+        for i, (priority, _) in enumerate(self._messages):
+            if priority == EVICT_FIRST:
+                victim = i
+                break
+            if priority == EVICT_LATER and victim is None:
+                victim = i
+        if victim is None:
+            return False
+        del self._messages[victim]
+        return True
+
+    def _give_up(self, reason: str) -> bool:
+        logger.warning(reason)
+        WS_DISCONNECTED_SLOW.inc()
+        asyncio.create_task(self.aclose())
+        return False
+
+    async def _drain(self) -> None:
+        try:
+            while True:
+                if not self._messages:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                _, message = self._messages.popleft()
+                await self.send(message)
+                if not self._messages:
+                    self._dropped_since_drain = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # socket went away mid-send
+            logger.info(f"WebSocket send failed, closing subscriber: {e}")
+            self.closed = True
+
+    async def aclose(self) -> None:
+        if self.closed and self._task is None:
+            return
+        self.closed = True
+        task, self._task = self._task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self.close is not None:
+            try:
+                await self.close()
+            except Exception:
+                pass
+
+
+class MonitorHub:
+    """
+    Runs at most one DrowsinessModel per camera, started by the first
+    subscriber and stopped when the last one leaves.
+
+    Events published for a camera are buffered for one `tick` and then sent
+    as a single frame, encoded once per codec in use, to every subscriber's
+    queue. Events published with a `coalesce` key replace the pending event
+    with the same key, so frame-rate telemetry costs one message per tick
+    and dashboard viewers add a queue each but no detection work.
+
+    Video viewers (`open_stream`) share one FrameStream per camera, fed by
+    the same monitor, which keeps running while either kind of client is
+    connected.
+    """
+
+    def __init__(
+        self,
+        model_factory: Callable[[int], Any],
+        queue_size: int = 32,
+        tick: float = 0.05,
+        stream_factory: Callable[[], FrameStream] = FrameStream,
+    ):
+        self.model_factory = model_factory
+        self.queue_size = queue_size
+        self.tick = tick
+        self.stream_factory = stream_factory
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self._streams: Dict[int, FrameStream] = {}
+        self._stream_users: Dict[int, int] = {}
+        self._monitors: Dict[int, Any] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._pending: Dict[int, List[Tuple[Optional[str], Dict]]] = {}
+        self._flush_handles: Dict[int, asyncio.TimerHandle] = {}
+
+    async def subscribe(
+        self,
+        send: Callable[[Any], Awaitable[None]],
+        close: Optional[Callable[[], Awaitable[None]]] = None,
+        camera: int = 0,
+        codec: Codec = DEFAULT_CODEC,
+    ) -> Subscriber:
+        subscriber = Subscriber(send, close, camera=camera, queue_size=self.queue_size, codec=codec)
+        subscriber.start()
+        self._subscribers.setdefault(camera, set()).add(subscriber)
+        if camera not in self._tasks:
+            self._start_monitor(camera)
+        return subscriber
+
+    async def unsubscribe(self, subscriber: Subscriber) -> None:
+        await subscriber.aclose()
+        subscribers = self._subscribers.get(subscriber.camera)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[subscriber.camera]
+            await self._release(subscriber.camera)
+
+    async def open_stream(self, camera: int = 0) -> FrameStream:
+        """The camera's shared video stream; pair every call with `close_stream`."""
+        stream = self._streams.get(camera)
+        if stream is None:
+            stream = self._streams[camera] = self.stream_factory()
+            stream.start()
+            model = self._monitors.get(camera)
+            if model is not None:
+                model.frame_sink = stream.submit
+        self._stream_users[camera] = self._stream_users.get(camera, 0) + 1
+        if camera not in self._tasks:
+            self._start_monitor(camera)
+        return stream
+
+    async def close_stream(self, camera: int = 0) -> None:
+        users = self._stream_users.get(camera, 0) - 1
+        if users > 0:
+            self._stream_users[camera] = users
+            return
+        self._stream_users.pop(camera, None)
+        stream = self._streams.pop(camera, None)
+        model = self._monitors.get(camera)
+        if model is not None:
+            model.frame_sink = None
+        if stream is not None:
+            await stream.aclose()
+        await self._release(camera)
+
+    def stream_stats(self) -> Dict[int, Dict]:
+        return {camera: stream.stats() for camera, stream in self._streams.items()}
+
+    def export_metrics(self) -> None:
+        """Metrics collector: queue depths and viewer lag are read at scrape time, not tracked per message."""
+        for metric in (WS_SUBSCRIBERS, WS_QUEUE_DEPTH, VIDEO_VIEWERS, VIDEO_FRAMES_ENCODED,
+                       VIDEO_VIEWER_LAG, VIDEO_FRAMES_SKIPPED):
+            metric.clear()
+        for camera, subscribers in list(self._subscribers.items()):
+            depths = [subscriber.depth() for subscriber in list(subscribers)]
+            WS_SUBSCRIBERS.labels(camera).set(len(depths))
+            WS_QUEUE_DEPTH.labels(camera, "total").set(sum(depths))
+            WS_QUEUE_DEPTH.labels(camera, "max").set(max(depths, default=0))
+        for camera, stream in list(self._streams.items()):
+            viewers = list(stream.viewers)
+            VIDEO_VIEWERS.labels(camera).set(len(viewers))
+            VIDEO_FRAMES_ENCODED.labels(camera).set(stream.encoded)
+            VIDEO_VIEWER_LAG.labels(camera).set(max((v.lag for v in viewers), default=0.0))
+            VIDEO_FRAMES_SKIPPED.labels(camera).set(sum(v.skipped for v in viewers))
+
+    def publish(self, camera: int, event: Dict, coalesce: Optional[str] = None) -> None:
+        """Buffer `event` for the next tick; a `coalesce` key keeps only the latest such event."""
+        if not self._subscribers.get(camera):
+            return
+        pending = self._pending.setdefault(camera, [])
+        if coalesce is not None:
+            pending[:] = [(key, e) for key, e in pending if key != coalesce]
+        pending.append((coalesce, event))
+        if camera not in self._flush_handles:
+            loop = asyncio.get_running_loop()
+            self._flush_handles[camera] = loop.call_later(self.tick, self.flush, camera)
+
+    def flush(self, camera: int) -> int:
+        """Send the buffered events for `camera` now. Returns how many subscribers took the frame."""
+        handle = self._flush_handles.pop(camera, None)
+        if handle is not None:
+            handle.cancel()
+        pending = self._pending.pop(camera, [])
+        events = [event for _, event in pending]
+        subscribers = self._subscribers.get(camera)
+        if not events or not subscribers:
+            return 0
+        priority = max(event_priority(event, key is not None) for key, event in pending)
+        frames: Dict[str, Any] = {}
+        delivered = 0
+        for subscriber in list(subscribers):
+            codec = subscriber.codec
+            if codec.name not in frames:
+                frames[codec.name] = codec.encode_frame(events)
+            if subscriber.offer(frames[codec.name], priority):
+                delivered += 1
+            else:
+                subscribers.discard(subscriber)
+        return delivered
+
+    def subscriber_count(self, camera: Optional[int] = None) -> int:
+        if camera is not None:
+            return len(self._subscribers.get(camera, ()))
+        return sum(len(s) for s in self._subscribers.values())
+
+    def monitor(self, camera: int) -> Optional[Any]:
+        """The running monitor for `camera`, if any."""
+        return self._monitors.get(camera)
+
+    def monitor_count(self) -> int:
+        return len(self._tasks)
+
+    async def aclose(self) -> None:
+        for handle in self._flush_handles.values():
+            handle.cancel()
+        self._flush_handles.clear()
+        self._pending.clear()
+        for subscribers in list(self._subscribers.values()):
+            for subscriber in list(subscribers):
+                await subscriber.aclose()
+        self._subscribers.clear()
+        for stream in self._streams.values():
+            await stream.aclose()
+        self._streams.clear()
+        self._stream_users.clear()
+        for camera in list(self._tasks):
+            await self._stop_monitor(camera)
+
+    # ---------- monitors ----------
+    async def _release(self, camera: int) -> None:
+        if not self._subscribers.get(camera) and camera not in self._stream_users:
+            await self._stop_monitor(camera)
+
+    def _start_monitor(self, camera: int) -> None:
+        model = self.model_factory(camera)
+        loop = asyncio.get_running_loop()
+
+        async def hadi_callback():
+            self.publish(camera, {"type": "hadi_alert", "message": "⚠️ WAKE UP! Stay alert and focused!",
+                                  "timestamp": loop.time()})
+
+        async def huda_callback():
+            self.publish(camera, {"type": "huda_conversation",
+                                  "message": "💖 Hey! You seem tired. Need music, snacks, or a rest stop?",
+                                  "timestamp": loop.time()})
+
+        def telemetry_callback(telemetry: Dict):
+            self.publish(camera, dict(telemetry, type="telemetry", timestamp=loop.time()), coalesce="telemetry")
+
+        stream = self._streams.get(camera)
+        model.frame_sink = stream.submit if stream is not None else None
+        self._monitors[camera] = model
+        self._tasks[camera] = asyncio.create_task(model.start(
+            hadi_callback=hadi_callback,
+            huda_callback=huda_callback,
+            telemetry_callback=telemetry_callback,
+        ))
+        logger.info(f"Started drowsiness monitor for camera {camera}")
+
+    async def _stop_monitor(self, camera: int) -> None:
+        handle = self._flush_handles.pop(camera, None)
+        if handle is not None:
+            handle.cancel()
+        self._pending.pop(camera, None)
+        model = self._monitors.pop(camera, None)
+        task = self._tasks.pop(camera, None)
+        if model is not None:
+            model.running = False  # lets the frame loop release the camera
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        logger.info(f"Stopped drowsiness monitor for camera {camera}")